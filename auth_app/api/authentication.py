@@ -1,4 +1,58 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def user_cache_key(user_id):
+    """
+    Returns the cache key under which the claims of a user are kept.
+    """
+    return f"auth:user:{user_id}"
+
+
+def user_claims(user):
+    """
+    Returns the fields of a user that authenticated requests need.
+
+    Args:
+        user (User): An active user.
+
+    Returns:
+        dict: Claims for a `TokenUser`: ID, username, email and the staff and superuser flags.
+    """
+    return {
+        api_settings.USER_ID_CLAIM: getattr(user, api_settings.USER_ID_FIELD),
+        "username": user.get_username(),
+        "email": user.email,
+        "is_staff": user.is_staff,
+        "is_superuser": user.is_superuser,
+    }
+
+
+def forget_user(user_id):
+    """
+    Removes a user from the authentication cache.
+
+    Called when a user is saved or deleted, e.g. deactivated or given a new
+    password, and on logout, so the next request loads the user again.
+    """
+    cache.delete(user_cache_key(user_id))
+
+
+def use_user_cache():
+    """
+    Returns whether users are resolved through the cache.
+
+    Token revocation on password change needs the password hash, so users
+    are always loaded from the database if `CHECK_REVOKE_TOKEN` is on.
+    """
+    return bool(settings.AUTH_USER_CACHE_TTL) and not api_settings.CHECK_REVOKE_TOKEN
+
 """
     Custom JWT authentication that reads tokens from cookies.
 
@@ -9,21 +63,97 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
     Useful for web apps where JWTs are stored securely in cookies instead of
     being sent manually in headers.
 
+    `aauthenticate` does the same for async views without blocking the event
+    loop: the token is validated in place and the user is loaded with the
+    async ORM.
+
+    Users are resolved through the cache: the first request loads the user
+    from the database and keeps its claims for `AUTH_USER_CACHE_TTL` seconds;
+    later requests get a `TokenUser` built from these claims without any
+    query. Saving or deleting a user and logging out drop the entry.
+
     Returns:
         (user, validated_token): If authentication succeeds.
         None: If no valid token is found.
 """
 class CookieJWTAuthentication(JWTAuthentication):
     def authenticate(self, request):
+        raw_token = self.get_request_token(request)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return self.get_user(validated_token), validated_token
+
+    async def aauthenticate(self, request):
+        raw_token = self.get_request_token(request)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        """
+        Returns the user of a token, from the cache if possible.
+        """
+        if not use_user_cache():
+            return super().get_user(validated_token)
+        key = user_cache_key(self.get_user_id(validated_token))
+        claims = cache.get(key)
+        if claims is None:
+            claims = user_claims(super().get_user(validated_token))
+            cache.set(key, claims, settings.AUTH_USER_CACHE_TTL)
+        return TokenUser(claims)
+
+    def get_user_id(self, validated_token):
+        """
+        Returns the user ID claim of a token.
+        """
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def get_request_token(self, request):
+        """
+        Returns the raw token from the Authorization header or the `access_token` cookie.
+        """
         header = self.get_header(request)
         if header is not None:
-            raw_token = self.get_raw_token(header)
-        else:
-            raw_token = request.COOKIES.get('access_token')
+            return self.get_raw_token(header)
+        return request.COOKIES.get('access_token')
+
+    async def aget_user(self, validated_token):
+        """
+        Async variant of `get_user`, with the same cache and checks.
+        """
+        user_id = self.get_user_id(validated_token)
+        if use_user_cache():
+            key = user_cache_key(user_id)
+            claims = await cache.aget(key)
+            if claims is None:
+                claims = user_claims(await self.aload_user(user_id, validated_token))
+                await cache.aset(key, claims, settings.AUTH_USER_CACHE_TTL)
+            return TokenUser(claims)
+        return await self.aload_user(user_id, validated_token)
+
+    async def aload_user(self, user_id, validated_token):
+        """
+        Loads the user of a token from the database with the checks of `get_user`.
+        """
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
 
-            if raw_token is None:
-                return None
-            
-            validated_token = self.get_validated_token(raw_token)
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
 
-            return self.get_user(validated_token), validated_token
\ No newline at end of file
+        return user
@@ -1,6 +1,9 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 import django_rq
 from rq import Retry
+from .authentication import forget_user
 from .signals import user_registered, password_reset_requested
 from .tasks import send_activation_email_task, send_password_reset_email
 
@@ -9,10 +12,10 @@ def enqueue_activation_email(sender, user, **kwargs):
     """
     Enqueues a background job to send an account activation email.
 
-    Triggered when a new user registers. The task is added to the default RQ queue
+    Triggered when a new user registers. The task is added to the `emails` RQ queue
     and automatically retried up to 3 times (after 10, 30, and 60 seconds) if it fails.
     """
-    queue = django_rq.get_queue('default')
+    queue = django_rq.get_queue('emails')
     queue.enqueue(send_activation_email_task, user.pk, user.email, retry=Retry(max=3,interval=[10,30,60]))
 
 @receiver(password_reset_requested)
@@ -23,5 +26,17 @@ def enqueue_password_reset_email(sender, user, **kwargs):
     Triggered when a password reset is requested. Uses RQ to run asynchronously
     and retries the task up to 3 times on failure.
     """
-    queue = django_rq.get_queue('default')
-    queue.enqueue(send_password_reset_email, user.pk, user.email, retry=Retry(max=3,interval=[10,30,60]))
\ No newline at end of file
+    queue = django_rq.get_queue('emails')
+    queue.enqueue(send_password_reset_email, user.pk, user.email, retry=Retry(max=3,interval=[10,30,60]))
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def forget_cached_user(sender, instance, **kwargs):
+    """
+    Removes a saved or deleted user from the authentication cache.
+
+    Deactivating a user, changing the password or any other change goes
+    through `save`, so the next authenticated request loads the user from
+    the database again and sees the change at once. Bulk `update` calls
+    bypass this signal and take effect after `AUTH_USER_CACHE_TTL`.
+    """
+    forget_user(instance.pk)
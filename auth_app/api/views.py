@@ -9,6 +9,7 @@ from rest_framework import status
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.tokens import RefreshToken
 from .serializers import RegistrationSerializer, PasswordResetSerializer, ConfirmNewPasswordSerializer, CustomTokenObtainPairSerializer
+from .authentication import forget_user
 from .receivers import password_reset_requested, user_registered
 
 class RegistrationView(APIView):
@@ -301,8 +302,9 @@ class LogoutView(APIView):
     2. If missing, return 400 Bad Request.
     3. Attempt to blacklist the refresh token using the RefreshToken class.
     4. If invalid, return 400 Bad Request.
-    5. Delete the access and refresh token cookies from the client.
-    6. Return a 200 OK response confirming logout.
+    5. Remove the user from the authentication cache.
+    6. Delete the access and refresh token cookies from the client.
+    7. Return a 200 OK response confirming logout.
 
     Permissions:
     - Requires authentication (IsAuthenticated).
@@ -324,7 +326,8 @@ class LogoutView(APIView):
             token.blacklist()
         except Exception as e:
             return Response({"detail": "Invalid refresh token."}, status=status.HTTP_400_BAD_REQUEST)
-        
+
+        forget_user(request.user.id)
         response = Response({"detail": "Logout successful! All Tokens will be deleted. Refresh token is now invalid."}, status=status.HTTP_200_OK)
         response.delete_cookie("access_token")
         response.delete_cookie("refresh_token")
@@ -0,0 +1,105 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import AccessToken
+from auth_app.api.authentication import CookieJWTAuthentication, user_cache_key
+
+class CookieJWTAuthenticationTestCase(APITestCase):
+    """
+    Test case for resolving the user of an access token.
+
+    This suite verifies:
+    - Tokens are read from the Authorization header and the access_token cookie
+    - The user is loaded once and then resolved from the cache without queries
+    - Deactivation, password change and logout drop the cached user
+    - AUTH_USER_CACHE_TTL=0 loads the user on every request
+    """
+    def setUp(self):
+        """
+        Set up an active user with an access token and an empty cache.
+        """
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.email = "test@example.com"
+        self.password = "securepassword123"
+        self.user = User.objects.create_user(username=self.email, email=self.email, password=self.password, is_active=True)
+        self.token = str(AccessToken.for_user(self.user))
+        self.authentication = CookieJWTAuthentication()
+
+    def authenticate(self):
+        """
+        Helper method to authenticate a request carrying the access token cookie.
+        """
+        request = RequestFactory().get("/api/video/")
+        request.COOKIES["access_token"] = self.token
+        return self.authentication.authenticate(request)
+
+    def test_header_and_cookie(self):
+        """
+        Test that the token is accepted from the Authorization header as well as from the cookie.
+        """
+        request = RequestFactory().get("/api/video/", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        user, _ = self.authentication.authenticate(request)
+        self.assertEqual(user.id, self.user.id)
+        user, _ = self.authenticate()
+        self.assertEqual(user.id, self.user.id)
+
+    def test_cached_user(self):
+        """
+        Test that only the first request queries the user and later ones get a TokenUser from the cache.
+        """
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertIsInstance(user, TokenUser)
+        self.assertEqual((user.id, user.username, user.email), (self.user.id, self.email, self.email))
+        self.assertFalse(user.is_staff)
+        self.assertTrue(user.is_authenticated)
+
+    def test_deactivation(self):
+        """
+        Test that a deactivated user is rejected at once, even though the user was cached.
+        """
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_password_change(self):
+        """
+        Test that changing the password drops the cached user.
+        """
+        self.authenticate()
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.id)))
+        self.user.set_password("anotherpassword123")
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.id)))
+
+    def test_logout(self):
+        """
+        Test that logging out drops the cached user.
+        """
+        response = self.client.post(reverse('token_obtain_pair'), {'email': self.email, 'password': self.password}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.authenticate()
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.id)))
+        response = self.client.post(reverse('logout'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(cache.get(user_cache_key(self.user.id)))
+
+    @override_settings(AUTH_USER_CACHE_TTL=0)
+    def test_cache_disabled(self):
+        """
+        Test that the user model is loaded on every request when the cache is off.
+        """
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                user, _ = self.authenticate()
+        self.assertIsInstance(user, User)
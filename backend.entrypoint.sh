@@ -38,6 +38,12 @@ else:
     print(f"Superuser '{username}' already exists.")
 EOF
 
-python manage.py rqworker default &
+# Worker-Pools für E-Mails, Thumbnails und Transcodes starten (siehe RQ_WORKER_POOLS)
+python manage.py start_workers &
+
+# SERVER_MODE=asgi startet Gunicorn mit Uvicorn-Workern (async Views für Playlists und Segmente)
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    exec gunicorn core.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:8000 --reload
+fi
 
 exec gunicorn core.wsgi:application --bind 0.0.0.0:8000 --reload
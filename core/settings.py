@@ -85,6 +85,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 
@@ -131,16 +132,107 @@ CACHES = {
     }
 }
 
+REDIS_QUEUE_CONNECTION = {
+    'HOST': os.environ.get("REDIS_HOST", default="redis"),
+    'PORT': os.environ.get("REDIS_PORT", default=6379),
+    'DB': os.environ.get("REDIS_DB", default=0),
+    'REDIS_CLIENT_KWARGS': {},
+}
+
+# Transactional emails, thumbnails/trickplay and transcodes use separate queues
+# with their own timeouts, so a burst of uploads never delays signup emails.
 RQ_QUEUES = {
-    'default': {
-        'HOST': os.environ.get("REDIS_HOST", default="redis"),
-        'PORT': os.environ.get("REDIS_PORT", default=6379),
-        'DB': os.environ.get("REDIS_DB", default=0),
-        'DEFAULT_TIMEOUT': 900,
-        'REDIS_CLIENT_KWARGS': {},
+    'default': {**REDIS_QUEUE_CONNECTION, 'DEFAULT_TIMEOUT': 900},
+    'emails': {**REDIS_QUEUE_CONNECTION, 'DEFAULT_TIMEOUT': 60},
+    'thumbnails': {**REDIS_QUEUE_CONNECTION, 'DEFAULT_TIMEOUT': 1800},
+    'transcode': {**REDIS_QUEUE_CONNECTION, 'DEFAULT_TIMEOUT': 14400},
+}
+
+# Worker pools started by `python manage.py start_workers`. Every worker of a
+# pool listens to its queues in order, so the first queue has priority.
+RQ_WORKER_POOLS = {
+    'emails': {
+        'queues': ['emails', 'default'],
+        'count': int(os.getenv("RQ_EMAIL_WORKERS", 1)),
+    },
+    'thumbnails': {
+        'queues': ['thumbnails', 'emails'],
+        'count': int(os.getenv("RQ_THUMBNAIL_WORKERS", 1)),
+    },
+    'transcode': {
+        'queues': ['transcode'],
+        'count': int(os.getenv("RQ_TRANSCODE_WORKERS", 3)),
+    },
+}
+
+# Largest file accepted by the resumable upload API, in bytes (default 50 GiB).
+VIDEO_UPLOAD_MAX_SIZE = int(os.getenv("VIDEO_UPLOAD_MAX_SIZE", 50 * 1024 ** 3))
+
+# CPU cores ffmpeg may use on this node; 0 uses all cores available to the
+# container. Encodes are capped at FFMPEG_MAX_ENCODES at once per node (0
+# derives it from the budget, about 4 threads per encode) and the budget is
+# split evenly between them. Slot lock files live in FFMPEG_SLOT_DIR, which
+# must be local to the node.
+FFMPEG_CPU_BUDGET = int(os.getenv("FFMPEG_CPU_BUDGET", 0))
+FFMPEG_MAX_ENCODES = int(os.getenv("FFMPEG_MAX_ENCODES", 0))
+FFMPEG_SLOT_DIR = os.getenv("FFMPEG_SLOT_DIR", "/tmp/videoflix-encode-slots")
+
+# Named HLS encoding profiles a video can pick. Each profile may set `ladder`
+# and `mobile_ladder` ([label, width, height, max kbit/s] rungs), `preset`,
+# `crf`, `gop` and `segment_duration` (seconds) and `mobile`; unset keys use
+# the defaults in video_app/api/utils.py (the 480p/720p/1080p ladder, preset
+# medium, 5 s GOP and segments) and `HLS_MOBILE_RENDITIONS`.
+HLS_ENCODING_PROFILES = {
+    'default': {},
+    # News clips: published quickly, so encode speed matters more than size.
+    'fast': {
+        'preset': 'veryfast',
+        'gop': 2,
+        'segment_duration': 4,
+    },
+    # Catalogue titles: encoded once and streamed often, so spend CPU on compression.
+    'catalogue': {
+        'preset': 'slow',
+        'crf': 21,
     },
 }
 
+# Profile used for videos that do not pick one.
+HLS_DEFAULT_PROFILE = os.getenv("HLS_DEFAULT_PROFILE", "default")
+
+# Add the 240p/360p rungs to the HLS encoding ladder for mobile clients.
+HLS_MOBILE_RENDITIONS = os.getenv(
+    "HLS_MOBILE_RENDITIONS", "False").lower() in ("true", "1", "yes")
+
+# Target chunk length in seconds for split-encode-stitch transcoding of long
+# sources. 0 disables chunking.
+HLS_CHUNK_DURATION = int(os.getenv("HLS_CHUNK_DURATION", 120))
+
+# Write one media file per rendition with EXT-X-BYTERANGE playlists instead of
+# one file per segment.
+HLS_SINGLE_FILE = os.getenv(
+    "HLS_SINGLE_FILE", "False").lower() in ("true", "1", "yes")
+
+# Hand the delivery of playlists, segments and trickplay files to the front
+# proxy after the permission check: "x-accel-redirect" (nginx) points it at
+# MEDIA_OFFLOAD_PREFIX, an internal location mapped to MEDIA_ROOT;
+# "x-sendfile" (Apache mod_xsendfile, lighttpd) passes the file path. Empty
+# streams the files through Django.
+MEDIA_OFFLOAD = os.getenv("MEDIA_OFFLOAD", "").lower()
+MEDIA_OFFLOAD_PREFIX = os.getenv("MEDIA_OFFLOAD_PREFIX", "/protected-media/")
+
+# Seconds for which the signed segment URLs in media playlists stay valid.
+# Segment requests with a valid signature skip JWT and database lookups;
+# expired URLs fall back to JWT authentication. 0 disables signing.
+SEGMENT_URL_MAX_AGE = int(os.getenv("SEGMENT_URL_MAX_AGE", 3600))
+
+# "wsgi" runs Gunicorn with sync workers, "asgi" with Uvicorn workers (see
+# backend.entrypoint.sh). Under ASGI, playlists and segments are served by
+# async views unless MEDIA_ASYNC_VIEWS is turned off.
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi").lower()
+MEDIA_ASYNC_VIEWS = os.getenv(
+    "MEDIA_ASYNC_VIEWS", str(SERVER_MODE == "asgi")).lower() in ("true", "1", "yes")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -217,4 +309,9 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
-}
\ No newline at end of file
+}
+
+# Seconds for which CookieJWTAuthentication keeps a user's claims in the
+# cache, so authenticated requests need no user query. Saving a user and
+# logging out drop the entry. 0 loads the user on every request.
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 60))
@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Video
+from .models import Video, VideoRendition, VideoUpload
 
 # Register your models here.
 
-admin.site.register(Video)
\ No newline at end of file
+admin.site.register(Video)
+admin.site.register(VideoRendition)
+admin.site.register(VideoUpload)
\ No newline at end of file
@@ -0,0 +1,202 @@
+import asyncio
+import gzip
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from .segments import partial_response, requested_ranges, unsatisfiable_response
+
+MANIFEST_CONTENT_TYPE = "application/vnd.apple.mpegurl"
+
+# Upper bound of the manifest cache per process, counting plain and gzipped bodies.
+MANIFEST_CACHE_SIZE = 16 * 1024 * 1024
+
+MANIFEST_GZIP_LEVEL = 6
+
+_ACCEPTS_GZIP_RE = re.compile(r"\bgzip\b")
+
+Manifest = namedtuple("Manifest", ["body", "gzipped", "etag", "last_modified"])
+
+
+def version_segment_uris(playlist, version, query=""):
+    """
+    Appends a version to every segment URI of a media playlist.
+
+    Re-encoding a rendition writes new segments under the same file names.
+    With the version of the playlist in their URLs, segments of different
+    encodes never share a URL, so clients may cache segments for good.
+
+    Args:
+        playlist (str): Media playlist text.
+        version (str): Version of the playlist file.
+        query (str, optional): Further query parameters for every URI, e.g. a URL signature.
+
+    Returns:
+        str: The playlist with `?v=<version>` appended to every URI line.
+    """
+    params = f"v={version}" + (f"&{query}" if query else "")
+    lines = []
+    for line in playlist.splitlines():
+        if line and not line.startswith("#"):
+            line += ("&" if "?" in line else "?") + params
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+class ManifestCache:
+    """
+    Keeps parsed and gzip-compressed playlists in memory.
+
+    Players poll playlists, so they are read, rewritten and compressed once
+    and then served from memory. Every lookup compares inode, modification
+    time and size of the file with the cached entry, so a playlist replaced
+    by a re-transcode is picked up at once by every worker process without
+    any invalidation message. Playlists with signed segment URIs are cached
+    per query string. The least recently used entries are dropped once the
+    cache holds more than `max_bytes`.
+    """
+    def __init__(self, max_bytes=MANIFEST_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, versioned=False, query=""):
+        """
+        Returns the cached manifest of the given playlist file, loading it if needed.
+
+        Args:
+            path (str): Path to the playlist.
+            versioned (bool): Append the playlist's version to its segment URIs.
+            query (str, optional): Further query parameters for the segment
+                URIs of a versioned playlist, e.g. from `sign_segment_urls`.
+
+        Returns:
+            Manifest: `body`, `gzipped`, `etag` and `last_modified` (Unix timestamp).
+
+        Raises:
+            FileNotFoundError: If the playlist does not exist.
+        """
+        stat = os.stat(path)
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size, versioned)
+        with self._lock:
+            entry = self._entries.get((path, query))
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end((path, query))
+                return entry[1]
+
+        with open(path, "rb") as playlist:
+            body = playlist.read()
+        if versioned:
+            body = version_segment_uris(body.decode("utf-8"), f"{stat.st_mtime_ns:x}", query).encode("utf-8")
+        etag = f"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        if query:
+            etag += f"-{zlib.crc32(query.encode()):x}"
+        manifest = Manifest(
+            body=body,
+            gzipped=gzip.compress(body, MANIFEST_GZIP_LEVEL, mtime=0),
+            etag=f'"{etag}"',
+            last_modified=int(stat.st_mtime),
+        )
+
+        entry_size = len(manifest.body) + len(manifest.gzipped)
+        with self._lock:
+            stale = self._entries.pop((path, query), None)
+            if stale is not None:
+                self.size -= stale[2]
+            if entry_size <= self.max_bytes:
+                self._entries[(path, query)] = (key, manifest, entry_size)
+                self.size += entry_size
+            while self.size > self.max_bytes:
+                self.size -= self._entries.popitem(last=False)[1][2]
+        return manifest
+
+    def clear(self):
+        """
+        Drops all cached manifests.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+manifests = ManifestCache()
+
+
+def manifest_response(request, path, versioned=False, query=""):
+    """
+    Serves a playlist from the manifest cache.
+
+    Clients accepting gzip get the compressed body, which has its own ETag.
+    Conditional and `Range` requests are handled like for other media files;
+    ranges always refer to the uncompressed body.
+
+    Args:
+        request (HttpRequest): The request.
+        path (str): Path to the playlist.
+        versioned (bool): Append the playlist's version to its segment URIs.
+        query (str, optional): Further query parameters for the segment URIs.
+
+    Returns:
+        HttpResponse: The response.
+
+    Raises:
+        FileNotFoundError: If the playlist does not exist.
+    """
+    return _manifest_response(request, manifests.get(path, versioned, query))
+
+
+async def amanifest_response(request, path, versioned=False, query=""):
+    """
+    Async variant of `manifest_response` for ASGI deployments.
+
+    The cache lookup stats the playlist and, on a miss, reads and compresses
+    it, so it runs in a worker thread and keeps the event loop free.
+
+    Args:
+        request (HttpRequest): The request.
+        path (str): Path to the playlist.
+        versioned (bool): Append the playlist's version to its segment URIs.
+        query (str, optional): Further query parameters for the segment URIs.
+
+    Returns:
+        HttpResponse: The response.
+
+    Raises:
+        FileNotFoundError: If the playlist does not exist.
+    """
+    manifest = await asyncio.to_thread(manifests.get, path, versioned, query)
+    return _manifest_response(request, manifest)
+
+
+def _manifest_response(request, manifest):
+    """
+    Builds the response for a cached manifest.
+    """
+    use_gzip = "Range" not in request.headers and bool(
+        _ACCEPTS_GZIP_RE.search(request.headers.get("Accept-Encoding", "")))
+    etag = manifest.etag[:-1] + '-gzip"' if use_gzip else manifest.etag
+
+    response = get_conditional_response(request, etag=etag, last_modified=manifest.last_modified)
+    if response is None:
+        size = len(manifest.body)
+        ranges = requested_ranges(request, size, manifest)
+        if ranges == []:
+            response = unsatisfiable_response(size)
+        elif ranges:
+            response = partial_response(
+                lambda offset, length: manifest.body[offset:offset + length], size, ranges, MANIFEST_CONTENT_TYPE)
+        else:
+            response = HttpResponse(manifest.gzipped if use_gzip else manifest.body, content_type=MANIFEST_CONTENT_TYPE)
+            if use_gzip:
+                response["Content-Encoding"] = "gzip"
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(manifest.last_modified)
+    response["Accept-Ranges"] = "bytes"
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
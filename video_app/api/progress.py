@@ -0,0 +1,181 @@
+import subprocess
+import time
+from django.core.cache import cache
+
+# Progress entries expire a day after their last update.
+PROGRESS_TTL = 60 * 60 * 24
+
+# Minimum number of seconds between two progress writes of the same unit.
+PROGRESS_INTERVAL = 1.0
+
+
+def progress_key(video_id, unit=None):
+    """
+    Builds the cache key of a video's progress units or of a single unit.
+    """
+    if unit is None:
+        return f"video-progress:{video_id}:units"
+    return f"video-progress:{video_id}:{unit}"
+
+
+def set_progress_units(video_id, units):
+    """
+    Records which encoding units (renditions or chunks) make up a video's transcode.
+
+    Every unit's progress is stored under its own key, so concurrent jobs
+    never overwrite each other.
+
+    Args:
+        video_id (int): ID of the Video instance.
+        units (list): Unit names, e.g. ["480p", "720p"] or ["chunk-0", "chunk-1"].
+    """
+    cache.delete_many([progress_key(video_id, unit) for unit in cache.get(progress_key(video_id)) or []])
+    cache.set(progress_key(video_id), list(units), PROGRESS_TTL)
+
+
+def set_progress(video_id, unit, out_time, duration, speed=None, state="running"):
+    """
+    Stores the progress of one encoding unit.
+
+    Args:
+        video_id (int): ID of the Video instance.
+        unit (str): Unit name.
+        out_time (float): Seconds of media encoded so far.
+        duration (float): Total seconds of media in the unit, 0 if unknown.
+        speed (float, optional): Encode speed as a realtime factor.
+        state (str): "running", "done" or "failed".
+    """
+    percent = min(100.0, out_time / duration * 100) if duration else None
+    eta = (duration - out_time) / speed if duration and speed else None
+    cache.set(progress_key(video_id, unit), {
+        "state": state,
+        "out_time": round(out_time, 3),
+        "duration": round(duration, 3) if duration else None,
+        "percent": round(percent, 1) if percent is not None else None,
+        "speed": speed,
+        "eta": round(max(0.0, eta), 1) if eta is not None else None,
+        "updated_at": time.time(),
+    }, PROGRESS_TTL)
+
+
+def get_progress(video_id):
+    """
+    Reads the progress of all encoding units of a video.
+
+    Overall percent is the share of encoded seconds over all units and the
+    overall ETA is that of the slowest unit, because units run in parallel.
+
+    Args:
+        video_id (int): ID of the Video instance.
+
+    Returns:
+        dict: `percent`, `eta` and `units` (unit name to progress dict), or
+        None if no transcode has been recorded for the video.
+    """
+    units = cache.get(progress_key(video_id))
+    if units is None:
+        return None
+    entries = cache.get_many([progress_key(video_id, unit) for unit in units])
+    progress = {unit: entries.get(progress_key(video_id, unit)) for unit in units}
+
+    known = [entry for entry in progress.values() if entry and entry["duration"]]
+    total = sum(entry["duration"] for entry in known)
+    percent = None
+    if known and len(known) == len(units):
+        percent = round(sum(min(entry["out_time"], entry["duration"]) for entry in known) / total * 100, 1)
+    etas = [entry["eta"] for entry in progress.values() if entry and entry["state"] == "running" and entry["eta"] is not None]
+    return {
+        "percent": percent,
+        "eta": max(etas) if etas else None,
+        "units": progress,
+    }
+
+
+def describe_progress(video):
+    """
+    Builds the progress report of a video for the progress endpoint.
+
+    Combines the stored ffmpeg progress with the rendition states from the
+    database, so finished, failed and never-started transcodes are reported
+    as well.
+
+    Args:
+        video (Video): The Video instance, ideally with `renditions` prefetched.
+
+    Returns:
+        dict: `id`, `hls_ready`, `percent`, `eta`, `renditions` (label to state)
+        and `units` (unit name to progress dict).
+    """
+    progress = get_progress(video.id) or {"percent": None, "eta": None, "units": {}}
+    if video.hls_ready:
+        progress["percent"], progress["eta"] = 100.0, None
+    return {
+        "id": video.id,
+        "hls_ready": video.hls_ready,
+        "percent": progress["percent"],
+        "eta": progress["eta"],
+        "renditions": {rendition.label: rendition.state for rendition in video.renditions.all()},
+        "units": progress["units"],
+    }
+
+
+def parse_progress_block(block):
+    """
+    Extracts encoded seconds and speed from one block of ffmpeg `-progress` output.
+
+    Args:
+        block (dict): Key/value pairs of one progress block.
+
+    Returns:
+        tuple: `(out_time, speed)`; either may be None if ffmpeg reported N/A.
+    """
+    out_time = None
+    value = block.get("out_time_us") or block.get("out_time_ms")
+    if value and value != "N/A":
+        out_time = max(0.0, int(value) / 1_000_000)
+    speed = None
+    value = block.get("speed", "").rstrip("x").strip()
+    if value and value != "N/A":
+        speed = float(value)
+    return out_time, speed
+
+
+def run_ffmpeg_with_progress(cmd, video_id, unit, duration):
+    """
+    Runs an ffmpeg command and continuously stores its progress.
+
+    ffmpeg writes `-progress` blocks to stdout, which are read line by line.
+    Progress is written at most every `PROGRESS_INTERVAL` seconds and once
+    more when ffmpeg finishes.
+
+    Args:
+        cmd (list): ffmpeg argument list, starting with "ffmpeg".
+        video_id (int): ID of the Video instance.
+        unit (str): Unit name the progress is stored under.
+        duration (float): Seconds of media the command encodes, 0 if unknown.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg exits with a non-zero status.
+    """
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats"] + cmd[1:]
+    set_progress(video_id, unit, 0.0, duration)
+    last_write = 0.0
+    out_time, speed = 0.0, None
+    block = {}
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) as process:
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            block[key] = value
+            if key != "progress":
+                continue
+            parsed_time, parsed_speed = parse_progress_block(block)
+            out_time = parsed_time if parsed_time is not None else out_time
+            speed = parsed_speed if parsed_speed is not None else speed
+            block = {}
+            if value == "end" or time.monotonic() - last_write >= PROGRESS_INTERVAL:
+                set_progress(video_id, unit, out_time, duration, speed)
+                last_write = time.monotonic()
+    if process.returncode != 0:
+        set_progress(video_id, unit, out_time, duration, speed, state="failed")
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+    set_progress(video_id, unit, duration or out_time, duration, speed, state="done")
@@ -0,0 +1,98 @@
+import fcntl
+import logging
+import os
+import time
+from contextlib import contextmanager
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Threads per encode the default budget split aims for. x264 scales well up
+# to a few threads per encode; beyond that, running more encodes side by side
+# encodes more minutes of video per wall-clock minute.
+TARGET_THREADS_PER_ENCODE = 4
+
+# Seconds between two attempts to get a free encode slot.
+SLOT_POLL_INTERVAL = 1.0
+
+# ffmpeg thread count of the thumbnail extraction. It decodes a fixed few
+# dozen frames, so it runs outside the encode slots instead of queueing for
+# up to hours behind transcodes, and is capped to stay out of their way.
+THUMBNAIL_THREADS = 2
+
+
+def available_cpus():
+    """
+    Counts the CPU cores this process may run on.
+
+    Respects CPU affinity (e.g. `docker --cpuset-cpus`) and a cgroup v2 CPU
+    quota (e.g. `docker --cpus`), both of which `os.cpu_count()` ignores.
+
+    Returns:
+        int: Number of usable cores, at least 1.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="utf-8") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def encode_budget():
+    """
+    Splits the node's CPU budget into concurrent encodes and threads per encode.
+
+    The budget is `FFMPEG_CPU_BUDGET` cores, or all available cores if it is
+    0. Unless `FFMPEG_MAX_ENCODES` fixes the number of concurrent encodes, it
+    is chosen so that every encode gets about `TARGET_THREADS_PER_ENCODE`
+    threads. The budget is then divided evenly between the encodes.
+
+    Returns:
+        tuple: `(slots, threads)`, the maximum number of concurrent encodes on
+        this node and the ffmpeg thread count of each.
+    """
+    budget = settings.FFMPEG_CPU_BUDGET or available_cpus()
+    slots = settings.FFMPEG_MAX_ENCODES or max(1, budget // TARGET_THREADS_PER_ENCODE)
+    slots = min(slots, budget)
+    return slots, max(1, budget // slots)
+
+
+@contextmanager
+def encode_slot():
+    """
+    Waits for one of the node's encode slots and holds it while ffmpeg runs.
+
+    Slots are lock files in `FFMPEG_SLOT_DIR` locked with `flock`, so they
+    are shared by all worker processes on the node and released by the
+    kernel if a worker dies.
+
+    Yields:
+        int: ffmpeg thread count to use while holding the slot.
+    """
+    slots, threads = encode_budget()
+    os.makedirs(settings.FFMPEG_SLOT_DIR, exist_ok=True)
+    waiting_since = None
+    while True:
+        for index in range(slots):
+            slot = open(os.path.join(settings.FFMPEG_SLOT_DIR, f"slot{index}.lock"), "w")
+            try:
+                fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                slot.close()
+                continue
+            if waiting_since is not None:
+                logger.info("ℹ️ Encode-Slot %s nach %.0fs frei", index, time.monotonic() - waiting_since)
+            try:
+                yield threads
+            finally:
+                fcntl.flock(slot, fcntl.LOCK_UN)
+                slot.close()
+            return
+        if waiting_since is None:
+            waiting_since = time.monotonic()
+            logger.info("ℹ️ Alle %s Encode-Slots belegt, warte", slots)
+        time.sleep(SLOT_POLL_INTERVAL)
@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from .utils import parse_media_playlist
+
+SEGMENT_INDEX_NAME = "segments.json"
+
+# Media file of single-file renditions, which serves every segment's byte range.
+SINGLE_FILE_NAME = "index.ts"
+
+# Maximum number of rendition indexes kept in memory per process.
+SEGMENT_INDEX_CACHE_SIZE = 256
+
+# Seconds after which an index is reloaded from disk.
+SEGMENT_INDEX_MAX_AGE = 60
+
+# A request for another playlist version reloads the index at most this often,
+# so made-up versions cannot force a disk read per request.
+SEGMENT_INDEX_RELOAD_INTERVAL = 1
+
+SegmentIndex = namedtuple("SegmentIndex", ["version", "segments"])
+SegmentEntry = namedtuple("SegmentEntry", ["path", "size", "etag", "last_modified"])
+
+
+def build_segment_index(rendition_dir):
+    """
+    Describes every media file a rendition's playlist references.
+
+    Only plain file names inside the rendition directory are indexed, and
+    files that do not exist are left out. Byte range segments of single-file
+    renditions share one entry for their `index.ts`; the ranges themselves
+    come from the players' `Range` headers.
+
+    Args:
+        rendition_dir (str): Directory containing the rendition's `index.m3u8` and segments.
+
+    Returns:
+        dict: `version` of the playlist, as appended to its segment URIs, and
+        `segments`, mapping every file name to its `size`, `etag` and
+        `last_modified`.
+
+    Raises:
+        FileNotFoundError: If the playlist does not exist.
+    """
+    playlist_path = os.path.join(rendition_dir, "index.m3u8")
+    version = f"{os.stat(playlist_path).st_mtime_ns:x}"
+    segments = {}
+    for _, uri, _, _ in parse_media_playlist(playlist_path, byteranges=True):
+        if uri in segments or "/" in uri or "\\" in uri or uri.startswith("."):
+            continue
+        try:
+            stat = os.stat(os.path.join(rendition_dir, uri))
+        except FileNotFoundError:
+            continue
+        segments[uri] = {
+            "size": stat.st_size,
+            "etag": f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+            "last_modified": int(stat.st_mtime),
+        }
+    return {"version": version, "segments": segments}
+
+
+def write_segment_index(rendition_dir):
+    """
+    Writes `segments.json` of a finished rendition.
+
+    Args:
+        rendition_dir (str): Directory containing the rendition's `index.m3u8` and segments.
+    """
+    index_path = os.path.join(rendition_dir, SEGMENT_INDEX_NAME)
+    with open(index_path + ".tmp", "w", encoding="utf-8") as index_file:
+        json.dump(build_segment_index(rendition_dir), index_file)
+    os.replace(index_path + ".tmp", index_path)
+
+
+def read_segment_index(rendition_dir):
+    """
+    Loads the segment index of a rendition.
+
+    Renditions encoded before indexes were written have no `segments.json`;
+    their index is built from the playlist instead.
+
+    Args:
+        rendition_dir (str): Directory of the rendition.
+
+    Returns:
+        SegmentIndex: The playlist version and a `SegmentEntry` per file name.
+
+    Raises:
+        FileNotFoundError: If the rendition does not exist.
+    """
+    try:
+        with open(os.path.join(rendition_dir, SEGMENT_INDEX_NAME), encoding="utf-8") as index_file:
+            data = json.load(index_file)
+    except FileNotFoundError:
+        data = build_segment_index(rendition_dir)
+    return SegmentIndex(data["version"], {
+        name: SegmentEntry(os.path.join(rendition_dir, name), entry["size"], entry["etag"], entry["last_modified"])
+        for name, entry in data["segments"].items()
+    })
+
+
+class SegmentIndexCache:
+    """
+    Keeps segment indexes in memory.
+
+    A segment request is resolved by looking its name up in the index of its
+    rendition, so the file is never looked for on disk and names that are not
+    in the playlist, such as `../master.m3u8`, cannot reach any file. Segment
+    URIs carry the version of their playlist (`?v=`); a request for another
+    version than the cached one, e.g. after a re-encode, reloads the index.
+    Indexes are reloaded after `SEGMENT_INDEX_MAX_AGE` as well.
+    """
+    def __init__(self, max_size=SEGMENT_INDEX_CACHE_SIZE, max_age=SEGMENT_INDEX_MAX_AGE):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, rendition_dir, version=None):
+        """
+        Returns the cached index of a rendition if it is fresh, without any I/O.
+
+        Args:
+            rendition_dir (str): Directory of the rendition.
+            version (str, optional): Playlist version the client asks for.
+
+        Returns:
+            SegmentIndex: The cached index, or None if it has to be loaded.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._indexes.get(rendition_dir)
+            if entry is None:
+                return None
+            index, loaded_at = entry
+            if now - loaded_at >= self.max_age:
+                return None
+            if version and version != index.version and now - loaded_at >= SEGMENT_INDEX_RELOAD_INTERVAL:
+                return None
+            self._indexes.move_to_end(rendition_dir)
+            return index
+
+    def get(self, rendition_dir, version=None):
+        """
+        Returns the index of a rendition, loading it if needed.
+
+        Args:
+            rendition_dir (str): Directory of the rendition.
+            version (str, optional): Playlist version the client asks for.
+
+        Returns:
+            SegmentIndex: The index.
+
+        Raises:
+            FileNotFoundError: If the rendition does not exist.
+        """
+        index = self.lookup(rendition_dir, version)
+        if index is not None:
+            return index
+        index = read_segment_index(rendition_dir)
+        with self._lock:
+            self._indexes.pop(rendition_dir, None)
+            self._indexes[rendition_dir] = (index, time.monotonic())
+            while len(self._indexes) > self.max_size:
+                self._indexes.popitem(last=False)
+        return index
+
+    def clear(self):
+        """
+        Drops all cached indexes.
+        """
+        with self._lock:
+            self._indexes.clear()
+
+
+segment_indexes = SegmentIndexCache()
+
+
+def check_segment_version(index, version):
+    """
+    Rejects segment requests for an older version of a rendition.
+
+    A re-encoded rendition keeps its segment names, so without this check a
+    URL of the old playlist, which clients may cache for good, would be
+    answered with the new bytes. Versions are the playlists' modification
+    times, so an outdated one is smaller than the index's. A newer one means
+    the cached index has not been reloaded yet, since reloads are rate
+    limited; the segment's files are already published then, but the
+    index's sizes and ETags are not theirs.
+
+    Args:
+        index (SegmentIndex): Index of the rendition.
+        version (str): Playlist version from the segment URL (`?v=`), or None.
+
+    Returns:
+        bool: True if the index describes the requested version, so its
+        entries can be used instead of a path stat. The opened files are
+        still checked against them, since a re-encode may have replaced
+        them before the index is reloaded.
+
+    Raises:
+        FileNotFoundError: If the version is older than the index or malformed.
+    """
+    if version is None:
+        return False
+    try:
+        outdated = int(version, 16) < int(index.version, 16)
+    except ValueError:
+        raise FileNotFoundError(version) from None
+    if outdated:
+        raise FileNotFoundError(version)
+    return version == index.version
+
+
+def find_segment(index, name):
+    """
+    Looks up a segment in the index of its rendition.
+
+    Args:
+        index (SegmentIndex): Index of the rendition.
+        name (str): Segment name from the URL.
+
+    Returns:
+        SegmentEntry: Path, size and validators of the segment's file.
+
+    Raises:
+        FileNotFoundError: If the playlist does not reference the name.
+    """
+    try:
+        return index.segments[name]
+    except KeyError:
+        raise FileNotFoundError(name) from None
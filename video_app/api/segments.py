@@ -0,0 +1,640 @@
+import asyncio
+import os
+import re
+import threading
+import time
+import uuid
+from stat import S_ISREG
+from collections import OrderedDict, namedtuple
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+# Maximum number of media files kept open per process.
+SEGMENT_FILE_CACHE_SIZE = 64
+
+# Seconds after which an open media file is reopened, so a re-transcoded
+# rendition is picked up without a stat on every request.
+SEGMENT_FILE_MAX_AGE = 60
+
+# Range requests asking for more ranges than this are answered with the whole file.
+MAX_RANGES = 16
+
+# Partial responses up to this many bytes are read in one go; larger ones are
+# streamed in blocks of RANGE_BLOCK_SIZE.
+RANGE_BUFFER_SIZE = 8 * 1024 * 1024
+RANGE_BLOCK_SIZE = 1024 * 1024
+
+# Block size of async responses. Every block is one pread in a worker thread,
+# so blocks are smaller than RANGE_BLOCK_SIZE to keep memory per stream low.
+ASYNC_READ_BLOCK_SIZE = 256 * 1024
+
+_RANGE_SPEC_RE = re.compile(r"^(\d*)-(\d*)$")
+
+MediaFile = namedtuple("MediaFile", ["fd", "size", "etag", "last_modified"])
+
+
+def media_file(fd):
+    """
+    Describes an open media file by its size and validators.
+
+    The strong ETag is built from inode, modification time and size. A
+    re-encoded rendition is written to a staging directory and its files are
+    moved over the old ones (see `move_into_place`), so a new version has a
+    new inode and ETag. The bytes behind a segment name still change then;
+    versioned segment URLs of an older playlist are therefore rejected by
+    `check_segment_version` instead of being served the new file.
+
+    Args:
+        fd (int): Open file descriptor.
+
+    Returns:
+        MediaFile: `fd`, `size`, `etag` and `last_modified` (Unix timestamp).
+
+    Raises:
+        FileNotFoundError: If `fd` is not a regular file, e.g. a directory;
+            the descriptor is closed.
+    """
+    stat = os.fstat(fd)
+    if not S_ISREG(stat.st_mode):
+        os.close(fd)
+        raise FileNotFoundError("Not a regular file")
+    etag = f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    return MediaFile(fd, stat.st_size, etag, int(stat.st_mtime))
+
+
+def open_media_file(path, entry=None):
+    """
+    Opens a media file for reading.
+
+    With an index entry, the opened descriptor must be the file the entry
+    describes. A re-encode publishes its files under the same names before
+    the cached index is reloaded, so a path can already lead to new bytes
+    while the index still describes the old ones; those must not be sent
+    under the old version's URL and ETag. The check is an `fstat` of the
+    open descriptor, so it sees exactly the file that is read.
+
+    Args:
+        path (str): Path to the media file.
+        entry (SegmentEntry, optional): Size and validators of the file from
+            its segment index.
+
+    Returns:
+        MediaFile: The open file, as returned by `media_file`.
+
+    Raises:
+        FileNotFoundError: If the file does not exist, or has been replaced
+            since `entry` was indexed.
+    """
+    media = media_file(os.open(path, os.O_RDONLY))
+    if entry is not None and media.etag != entry.etag:
+        os.close(media.fd)
+        raise FileNotFoundError(path)
+    return media
+
+
+class SegmentFileCache:
+    """
+    Keeps media files open between requests.
+
+    Single-file renditions serve every segment from the same `index.ts`, so
+    the file is opened once and each request only reads its byte range with
+    `os.pread`, which does not move a shared file offset and is safe to use
+    from several threads. The least recently used file is evicted once the
+    cache is full, and files are reopened after `SEGMENT_FILE_MAX_AGE`.
+
+    Every file handed out by `lookup` or `open` holds a reference until it is
+    given back with `release`, typically when its response is closed. An
+    evicted file is closed once its last reference is released, so a slow
+    download never has its descriptor closed, or reused for another file,
+    under it.
+    """
+    def __init__(self, max_size=SEGMENT_FILE_CACHE_SIZE, max_age=SEGMENT_FILE_MAX_AGE):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._files = OrderedDict()
+        self._readers = {}
+        self._evicted = set()
+        self._lock = threading.Lock()
+
+    def lookup(self, path, etag=None):
+        """
+        Returns the open file if it is cached and fresh, without any I/O.
+
+        Args:
+            path (str): Path to the media file.
+            etag (str, optional): ETag the file must have, e.g. from a segment
+                index; a cached file with another ETag is stale.
+
+        Returns:
+            MediaFile: The cached file with a reference taken, or None if it
+            has to be opened.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is not None and now - entry[1] < self.max_age and etag in (None, entry[0].etag):
+                self._files.move_to_end(path)
+                self._readers[entry[0].fd] = self._readers.get(entry[0].fd, 0) + 1
+                return entry[0]
+        return None
+
+    def open(self, path, entry=None):
+        """
+        Returns the open file descriptor, size and validators of the given file.
+
+        Args:
+            path (str): Path to the media file.
+            entry (SegmentEntry, optional): Size and validators of the file
+                from its segment index; a cached file with other validators
+                is reopened and checked as by `open_media_file`.
+
+        Returns:
+            MediaFile: `(fd, size, etag, last_modified)`, as returned by
+            `media_file`, with a reference taken.
+
+        Raises:
+            FileNotFoundError: If the file does not exist or has been replaced
+                since `entry` was indexed.
+        """
+        media = self.lookup(path, entry.etag if entry else None)
+        if media is not None:
+            return media
+
+        now = time.monotonic()
+        media = open_media_file(path, entry)
+        with self._lock:
+            self._readers[media.fd] = 1
+            stale = self._files.pop(path, None)
+            self._files[path] = (media, now)
+            evicted = [stale] if stale else []
+            while len(self._files) > self.max_size:
+                evicted.append(self._files.popitem(last=False)[1])
+            closing = self._evict(old_media for old_media, _ in evicted)
+        for old_fd in closing:
+            os.close(old_fd)
+        return media
+
+    def release(self, media):
+        """
+        Gives back a reference taken by `lookup` or `open`.
+
+        The file is closed if it has been evicted and this was its last reference.
+
+        Args:
+            media (MediaFile): The file as returned by `lookup` or `open`.
+        """
+        with self._lock:
+            readers = self._readers.pop(media.fd) - 1
+            if readers:
+                self._readers[media.fd] = readers
+                return
+            if media.fd not in self._evicted:
+                return
+            self._evicted.remove(media.fd)
+        os.close(media.fd)
+
+    def clear(self):
+        """
+        Evicts all open files; files still being read are closed on their last release.
+        """
+        with self._lock:
+            files, self._files = self._files, OrderedDict()
+            closing = self._evict(media for media, _ in files.values())
+        for fd in closing:
+            os.close(fd)
+
+    def _evict(self, files):
+        """
+        Marks files removed from the cache as evicted. Must be called with the lock held.
+
+        Returns:
+            list: Descriptors without readers, to be closed by the caller.
+        """
+        closing = []
+        for media in files:
+            if self._readers.get(media.fd):
+                self._evicted.add(media.fd)
+            else:
+                closing.append(media.fd)
+        return closing
+
+
+segment_files = SegmentFileCache()
+
+
+def parse_range_header(header, size):
+    """
+    Parses an HTTP `Range` header with one or more byte ranges.
+
+    Args:
+        header (str): Value of the `Range` header, e.g. "bytes=0-1023" or "bytes=0-99,200-299".
+        size (int): Size of the file in bytes.
+
+    Returns:
+        list: `(offset, length)` of every satisfiable range in the requested
+        order, empty if none can be satisfied. None if the header is malformed,
+        uses another unit or asks for more than `MAX_RANGES` ranges; it is then
+        ignored and the whole file is sent.
+    """
+    unit, _, specs = header.strip().partition("=")
+    specs = [spec.strip() for spec in specs.split(",")]
+    if unit.strip().lower() != "bytes" or len(specs) > MAX_RANGES:
+        return None
+    ranges = []
+    for spec in specs:
+        match = _RANGE_SPEC_RE.match(spec)
+        if match is None:
+            return None
+        first, last = match.groups()
+        if first:
+            offset = int(first)
+            if last and int(last) < offset:
+                return None
+            if offset >= size:
+                continue
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            if int(last) == 0 or size == 0:
+                continue
+            offset, end = max(0, size - int(last)), size - 1
+        else:
+            return None
+        ranges.append((offset, end - offset + 1))
+    return ranges
+
+
+def if_range_matches(header, validators):
+    """
+    Checks whether an `If-Range` header still matches the file.
+
+    Only a strong ETag or the exact Last-Modified date match; otherwise the
+    client's partial copy is outdated and the whole file must be sent.
+
+    Args:
+        header (str): Value of the `If-Range` header.
+        validators: The file's `etag` and `last_modified`, e.g. a `MediaFile`.
+
+    Returns:
+        bool: True if the `Range` header may be honoured.
+    """
+    header = header.strip()
+    if header.startswith(('"', "W/")):
+        return header == validators.etag
+    return parse_http_date_safe(header) == validators.last_modified
+
+
+def requested_ranges(request, size, validators):
+    """
+    Reads the byte ranges a request asks for.
+
+    Args:
+        request (HttpRequest): The request.
+        size (int): Size of the file in bytes.
+        validators: The file's `etag` and `last_modified`, e.g. a `MediaFile`.
+
+    Returns:
+        list: Ranges as returned by `parse_range_header`, or None if the whole
+        file is to be sent because there is no usable `Range` header or
+        `If-Range` does not match.
+    """
+    range_header = request.headers.get("Range")
+    if not range_header:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range is not None and not if_range_matches(if_range, validators):
+        return None
+    return parse_range_header(range_header, size)
+
+
+def unsatisfiable_response(size):
+    """
+    Builds the 416 response for a `Range` header no range of which can be satisfied.
+    """
+    response = HttpResponse(status=416)
+    response["Content-Range"] = f"bytes */{size}"
+    return response
+
+
+def _read_ranges(read, parts):
+    """
+    Yields the body of a partial response block by block.
+
+    Args:
+        read (callable): `read(offset, length)` returning up to `length` bytes.
+        parts (list): `(prefix, offset, length)` per range; `prefix` is written
+            before the range's bytes, e.g. its multipart headers. A part with
+            length 0 only writes its prefix.
+    """
+    for prefix, offset, length in parts:
+        yield prefix
+        end = offset + length
+        while offset < end:
+            block = read(offset, min(RANGE_BLOCK_SIZE, end - offset))
+            if not block:
+                return
+            yield block
+            offset += len(block)
+
+
+class _ClosingBody:
+    """
+    Streaming response body that calls `close` when the response is closed.
+
+    Django closes a streaming body with its response once it has been sent
+    or the client has gone away, even if it was never iterated, which a
+    `finally` in a generator would miss. `close` is called at most once.
+
+    Args:
+        blocks (iterator): The body's blocks.
+        close (callable): Called when the response is closed, or None.
+    """
+    def __init__(self, blocks, close):
+        self.blocks = blocks
+        self._close = close
+
+    def close(self):
+        close, self._close = self._close, None
+        if close:
+            close()
+
+
+class _ClosingIterator(_ClosingBody):
+    def __iter__(self):
+        return self.blocks
+
+
+class _ClosingAsyncIterator(_ClosingBody):
+    def __aiter__(self):
+        return self.blocks
+
+
+def _range_parts(size, ranges, content_type):
+    """
+    Lays out the body of a partial response.
+
+    Args:
+        size (int): Size of the file in bytes.
+        ranges (list): `(offset, length)` pairs as returned by `parse_range_header`.
+        content_type (str): Content type of the file.
+
+    Returns:
+        tuple: `(parts, response_type, content_length)`; `parts` as taken by
+        `_read_ranges`, a single range without prefix or every range with its
+        `multipart/byteranges` headers.
+    """
+    if len(ranges) == 1:
+        offset, length = ranges[0]
+        return [(b"", offset, length)], content_type, length
+    boundary = uuid.uuid4().hex
+    parts = [
+        ((b"\r\n" if index else b"") + (
+            f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Range: bytes {offset}-{offset + length - 1}/{size}\r\n\r\n"
+        ).encode(), offset, length)
+        for index, (offset, length) in enumerate(ranges)
+    ]
+    parts.append((f"\r\n--{boundary}--\r\n".encode(), 0, 0))
+    content_length = sum(len(prefix) + length for prefix, _, length in parts)
+    return parts, f"multipart/byteranges; boundary={boundary}", content_length
+
+
+async def _aread_ranges(fd, parts):
+    """
+    Yields the body of a response block by block without blocking the event loop.
+
+    Every block is read with `os.pread` in a worker thread, so one slow disk
+    read does not hold up the other requests served by the event loop.
+
+    Args:
+        fd (int): Open file descriptor.
+        parts (list): `(prefix, offset, length)` per range, as for `_read_ranges`.
+    """
+    for prefix, offset, length in parts:
+        if prefix:
+            yield prefix
+        end = offset + length
+        while offset < end:
+            block = await asyncio.to_thread(os.pread, fd, min(ASYNC_READ_BLOCK_SIZE, end - offset), offset)
+            if not block:
+                return
+            yield block
+            offset += len(block)
+
+
+def _body_response(read, parts, content_length, content_type, close=None, status=200):
+    """
+    Builds a response whose body is read with `read`, at once up to
+    `RANGE_BUFFER_SIZE` bytes and streamed beyond that. `close` is called
+    once the body has been read, or for a streamed body when the response
+    is closed.
+    """
+    if content_length <= RANGE_BUFFER_SIZE:
+        try:
+            body = b"".join(_read_ranges(read, parts))
+        finally:
+            if close:
+                close()
+        return HttpResponse(body, status=status, content_type=content_type)
+    response = StreamingHttpResponse(_ClosingIterator(_read_ranges(read, parts), close), status=status, content_type=content_type)
+    response["Content-Length"] = str(content_length)
+    return response
+
+
+def partial_response(read, size, ranges, content_type, close=None):
+    """
+    Builds the 206 response for one or more byte ranges.
+
+    A single range is sent as is with `Content-Range`; several ranges are sent
+    as `multipart/byteranges`. Bodies up to `RANGE_BUFFER_SIZE` are read at
+    once, larger ones are streamed.
+
+    Args:
+        read (callable): `read(offset, length)` returning up to `length` bytes of the file.
+        size (int): Size of the file in bytes.
+        ranges (list): `(offset, length)` pairs as returned by `parse_range_header`.
+        content_type (str): Content type of the file.
+        close (callable, optional): Called once the body has been read or
+            the response is closed.
+
+    Returns:
+        HttpResponse: The partial response.
+    """
+    parts, response_type, content_length = _range_parts(size, ranges, content_type)
+    response = _body_response(read, parts, content_length, response_type, close, status=206)
+    if len(ranges) == 1:
+        offset, length = ranges[0]
+        response["Content-Range"] = f"bytes {offset}-{offset + length - 1}/{size}"
+    return response
+
+
+def media_file_response(request, path, content_type, cached=False, entry=None):
+    """
+    Serves a media file with conditional GET and byte-range support.
+
+    Every response carries a strong `ETag`, `Last-Modified` and
+    `Accept-Ranges`. `If-None-Match` and `If-Modified-Since` are answered
+    with 304 and failed `If-Match`/`If-Unmodified-Since` with 412. `Range`
+    requests (single or multiple ranges, honouring `If-Range`) are answered
+    with 206, unsatisfiable ones with 416. Other requests get the whole file,
+    read from the cached descriptor or else as a `FileResponse`, which the
+    WSGI server can send with sendfile. With `MEDIA_OFFLOAD`, all of this is
+    left to the front proxy.
+
+    Args:
+        request (HttpRequest): The request.
+        path (str): Path to the media file.
+        content_type (str): Content type of the file.
+        cached (bool): Keep the file open in `segment_files` between requests.
+            Only for files that are read by many requests, such as the
+            `index.ts` of a single-file rendition; per-segment files are
+            opened per request, so they do not crowd it out of the cache.
+        entry (SegmentEntry, optional): The file's entry in its segment index.
+            It is known to exist then, and is opened without a path stat;
+            the opened descriptor must still match the entry.
+
+    Returns:
+        HttpResponse: The response.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    if settings.MEDIA_OFFLOAD:
+        if entry is None and not os.path.isfile(path):
+            raise FileNotFoundError(path)
+        return offload_response(path, content_type)
+
+    if cached:
+        media = segment_files.open(path, entry)
+        close = lambda: segment_files.release(media)
+    else:
+        media = open_media_file(path, entry)
+        close = lambda: os.close(media.fd)
+    try:
+        response = get_conditional_response(request, etag=media.etag, last_modified=media.last_modified)
+        if response is None:
+            ranges = requested_ranges(request, media.size, media)
+            if ranges == []:
+                response = unsatisfiable_response(media.size)
+            elif ranges:
+                response = partial_response(
+                    lambda offset, length: os.pread(media.fd, length, offset), media.size, ranges, content_type,
+                    close=close)
+                close = None
+            elif cached:
+                response = _body_response(
+                    lambda offset, length: os.pread(media.fd, length, offset), [(b"", 0, media.size)], media.size,
+                    content_type, close=close)
+                close = None
+            else:
+                response = FileResponse(os.fdopen(media.fd, "rb"), content_type=content_type)
+                close = None
+    finally:
+        if close:
+            close()
+
+    response["ETag"] = media.etag
+    response["Last-Modified"] = http_date(media.last_modified)
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+async def amedia_file_response(request, path, content_type, cached=False, entry=None):
+    """
+    Async variant of `media_file_response` for ASGI deployments.
+
+    Answers the same conditional and `Range` requests with the same headers.
+    Opening, stat and every read run in worker threads, and bodies are
+    streamed from an async iterator, so a worker process can serve many
+    segments at once on one event loop. A file cached in `segment_files` is
+    served without any blocking call before its first read.
+
+    Args:
+        request (HttpRequest): The request.
+        path (str): Path to the media file.
+        content_type (str): Content type of the file.
+        cached (bool): Keep the file open in `segment_files` between requests.
+        entry (SegmentEntry, optional): The file's entry in its segment index.
+
+    Returns:
+        HttpResponse: The response.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    if settings.MEDIA_OFFLOAD:
+        if entry is None and not await asyncio.to_thread(os.path.isfile, path):
+            raise FileNotFoundError(path)
+        return offload_response(path, content_type)
+
+    if cached:
+        media = (segment_files.lookup(path, entry.etag if entry else None)
+                 or await asyncio.to_thread(segment_files.open, path, entry))
+        close = lambda: segment_files.release(media)
+    else:
+        media = await asyncio.to_thread(open_media_file, path, entry)
+        close = lambda: os.close(media.fd)
+    try:
+        response = get_conditional_response(request, etag=media.etag, last_modified=media.last_modified)
+        if response is None:
+            ranges = requested_ranges(request, media.size, media)
+            if ranges == []:
+                response = unsatisfiable_response(media.size)
+            else:
+                if ranges:
+                    parts, response_type, content_length = _range_parts(media.size, ranges, content_type)
+                else:
+                    parts, response_type, content_length = [(b"", 0, media.size)], content_type, media.size
+                response = StreamingHttpResponse(
+                    _ClosingAsyncIterator(_aread_ranges(media.fd, parts), close),
+                    status=206 if ranges else 200, content_type=response_type)
+                response["Content-Length"] = str(content_length)
+                close = None
+                if ranges and len(ranges) == 1:
+                    offset, length = ranges[0]
+                    response["Content-Range"] = f"bytes {offset}-{offset + length - 1}/{media.size}"
+    finally:
+        if close:
+            close()
+
+    response["ETag"] = media.etag
+    response["Last-Modified"] = http_date(media.last_modified)
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def offload_response(path, content_type):
+    """
+    Hands the delivery of a media file over to the front proxy.
+
+    Returns an empty response whose `X-Accel-Redirect` (nginx) or
+    `X-Sendfile` (Apache, lighttpd) header tells the proxy which file to send.
+    The proxy then serves the bytes with sendfile, including `Range`
+    requests, and keeps the headers set on this response, so the worker is
+    free again as soon as the permission check has passed.
+
+    Args:
+        path (str): Path to the media file below MEDIA_ROOT.
+        content_type (str): Content type of the file.
+
+    Returns:
+        HttpResponse: The offload response, or None if `MEDIA_OFFLOAD` is off.
+
+    Raises:
+        ImproperlyConfigured: If `MEDIA_OFFLOAD` names an unknown mode.
+    """
+    if not settings.MEDIA_OFFLOAD:
+        return None
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_OFFLOAD == "x-accel-redirect":
+        relative_path = os.path.relpath(path, settings.MEDIA_ROOT)
+        response["X-Accel-Redirect"] = settings.MEDIA_OFFLOAD_PREFIX.rstrip("/") + "/" + quote(relative_path)
+    elif settings.MEDIA_OFFLOAD == "x-sendfile":
+        response["X-Sendfile"] = os.fspath(path)
+    else:
+        raise ImproperlyConfigured(
+            f"MEDIA_OFFLOAD must be 'x-accel-redirect', 'x-sendfile' or empty, not '{settings.MEDIA_OFFLOAD}'.")
+    return response
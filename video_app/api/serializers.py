@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from ..models import Video
+from ..models import Video, VideoRendition
+from .utils import HLS_AUDIO_LABEL
 
 class VideoSerializer(serializers.ModelSerializer):
     """
@@ -12,18 +13,46 @@ class VideoSerializer(serializers.ModelSerializer):
         description (str): Description of the video.
         thumbnail_url (str): Absolute URL of the video's thumbnail.
         category (str): Category of the video.
+        resolutions (list): Labels of the renditions that are ready for playback.
 
     Methods:
         get_thumbnail_url(obj): Returns the absolute URL of the thumbnail if it exists.
+        get_resolutions(obj): Returns the labels of the ready renditions, lowest first.
     """
     thumbnail_url = serializers.SerializerMethodField()
+    resolutions = serializers.SerializerMethodField()
 
     class Meta:
         model = Video
-        fields = ['id', 'created_at', 'title', 'description', 'thumbnail_url', 'category']
+        fields = ['id', 'created_at', 'title', 'description', 'thumbnail_url', 'category', 'resolutions']
 
     def get_thumbnail_url(self, obj):
         request = self.context.get('request')
         if obj.thumbnail and request:
             return request.build_absolute_uri(obj.thumbnail.url)
-        return None
\ No newline at end of file
+        return None
+
+    def get_resolutions(self, obj):
+        renditions = getattr(obj, 'ready_renditions', None)
+        if renditions is None:
+            renditions = obj.renditions.filter(state=VideoRendition.STATE_READY).exclude(label=HLS_AUDIO_LABEL)
+        return [rendition.label for rendition in sorted(renditions, key=lambda rendition: rendition.height or 0)]
+
+
+class VideoUploadSerializer(serializers.ModelSerializer):
+    """
+    Serializer that validates the metadata of a resumable upload.
+
+    Validated at the start of an upload, so a client learns about a missing
+    title or an invalid category before sending any bytes, and used again to
+    create the Video once the upload is complete.
+
+    Fields:
+        title (str): Title of the video.
+        description (str): Description of the video.
+        category (str): Category of the video.
+        encoding_profile (str, optional): Name of the encoding profile.
+    """
+    class Meta:
+        model = Video
+        fields = ['title', 'description', 'category', 'encoding_profile']
@@ -2,16 +2,21 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from ..models import Video
 import django_rq
-from video_app.api.tasks import generate_thumbnail, generate_hls
+from video_app.api.tasks import ingest_video
 
 @receiver(post_save, sender=Video)
 def generate_thumbnail_and_hls_signal(sender, instance, created, **kwargs):
     """
-    Signal handler that triggers background tasks after a Video instance is created.
+    Signal handler that triggers background processing after a Video instance is created.
 
-    When a new Video with a file is saved, this signal enqueues:
+    When a new Video with a file is saved, this signal enqueues `ingest_video`
+    on the `thumbnails` queue. It hashes the upload and either reuses the
+    output of an identical, already encoded video or enqueues:
         - `generate_thumbnail`: Creates a thumbnail for the video.
-        - `generate_hls`: Generates HLS streaming files.
+        - `generate_trickplay`: Creates scrubbing preview sprites and their WebVTT track.
+        - `plan_hls` (on the `transcode` queue): Probes the source, builds its
+          encoding ladder and fans out the rendition jobs, which are encoded in
+          parallel, followed by `finalize_hls`, which marks the video as HLS-ready.
 
     Args:
         sender (Model): The model class (Video).
@@ -20,6 +25,4 @@ def generate_thumbnail_and_hls_signal(sender, instance, created, **kwargs):
         **kwargs: Additional keyword arguments.
     """
     if created and instance.video_file:
-        queue = django_rq.get_queue("default")
-        queue.enqueue(generate_thumbnail, instance.id)
-        queue.enqueue(generate_hls, instance.id)
\ No newline at end of file
+        django_rq.get_queue("thumbnails").enqueue(ingest_video, instance.id)
\ No newline at end of file
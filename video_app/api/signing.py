@@ -0,0 +1,108 @@
+import time
+from urllib.parse import urlencode
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework.authentication import BaseAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from auth_app.api.authentication import CookieJWTAuthentication
+
+SEGMENT_SIGNATURE_SALT = "video_app.api.signing.segment"
+
+# Expiry times are rounded up to this many seconds, so a player reloading a
+# playlist gets the same signed URLs, and the same cached playlist, for a while.
+SEGMENT_URL_RENEWAL = 300
+
+
+def rendition_url(path):
+    """
+    Returns the URL path of the rendition a playlist or segment URL belongs to.
+
+    Args:
+        path (str): URL path, e.g. "/api/video/1/720p/index.m3u8" or "/api/video/1/720p/index0.ts/".
+
+    Returns:
+        str: The rendition's URL path, e.g. "/api/video/1/720p".
+    """
+    return path.rstrip("/").rsplit("/", 1)[0]
+
+
+def segment_signature(user_id, rendition, expires):
+    """
+    Computes the signature of a user's segment URLs of a rendition.
+
+    Args:
+        user_id: ID of the user the URLs are issued to.
+        rendition (str): URL path of the rendition, as returned by `rendition_url`.
+        expires (int): Unix timestamp after which the URLs are no longer accepted.
+
+    Returns:
+        str: Hex HMAC-SHA256 keyed with SECRET_KEY, shortened to 128 bits.
+    """
+    return salted_hmac(
+        SEGMENT_SIGNATURE_SALT, f"{user_id}:{rendition}:{expires}", algorithm="sha256").hexdigest()[:32]
+
+
+def sign_segment_urls(user_id, rendition, now=None):
+    """
+    Builds the query string that authorizes a user's segment requests of a rendition.
+
+    Args:
+        user_id: ID of the user the URLs are issued to.
+        rendition (str): URL path of the rendition, as returned by `rendition_url`.
+        now (float, optional): Current Unix time.
+
+    Returns:
+        str: `u=<user>&e=<expires>&s=<signature>`, valid for at least
+        `SEGMENT_URL_MAX_AGE` seconds.
+    """
+    now = time.time() if now is None else now
+    expires = -(-int(now + settings.SEGMENT_URL_MAX_AGE) // SEGMENT_URL_RENEWAL) * SEGMENT_URL_RENEWAL
+    return urlencode({"u": user_id, "e": expires, "s": segment_signature(user_id, rendition, expires)})
+
+
+def verify_segment_url(params, rendition, now=None):
+    """
+    Checks the signature of a segment URL.
+
+    Args:
+        params (QueryDict): Query parameters of the request.
+        rendition (str): URL path of the requested segment's rendition.
+        now (float, optional): Current Unix time.
+
+    Returns:
+        str: ID of the user the URL was issued to, or None if the URL is not
+        signed, has expired or its signature does not match.
+    """
+    user_id, expires, signature = params.get("u"), params.get("e"), params.get("s")
+    if not (user_id and user_id.isdigit() and signature and expires and expires.isdigit()):
+        return None
+    if int(expires) < (time.time() if now is None else now):
+        return None
+    if not constant_time_compare(signature, segment_signature(user_id, rendition, int(expires))):
+        return None
+    return user_id
+
+
+class SignedSegmentAuthentication(BaseAuthentication):
+    """
+    Authenticates segment requests by their signed URL.
+
+    Media playlists are served with signed segment URLs (see
+    `sign_segment_urls`), bound to the user, the rendition and an expiry time.
+    A valid signature authenticates the request as a `TokenUser` without any
+    database query or JWT decoding. Unsigned or expired URLs fall through to
+    the next authentication class, usually `CookieJWTAuthentication`.
+    Deactivating a user takes effect for signed URLs once they expire.
+    """
+    def authenticate(self, request):
+        user_id = verify_segment_url(request.GET, rendition_url(request.path))
+        if user_id is None:
+            return None
+        return TokenUser({api_settings.USER_ID_CLAIM: user_id}), None
+
+    async def aauthenticate(self, request):
+        return self.authenticate(request)
+
+    def authenticate_header(self, request):
+        return CookieJWTAuthentication().authenticate_header(request)
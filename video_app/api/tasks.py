@@ -1,17 +1,194 @@
 import os
+import json
+import shutil
 import subprocess
 import logging
+import tempfile
+from contextlib import contextmanager
+import django_rq
+from rq import Retry
 from django.conf import settings
-from ..models import Video
+from django.utils import timezone
+from ..models import Video, VideoRendition
+from .progress import run_ffmpeg_with_progress, set_progress, set_progress_units
+from .scheduler import THUMBNAIL_THREADS, encode_slot
+from .segment_index import write_segment_index
+from .utils import (
+    HLS_AUDIO_LABEL, build_audio_hls_command, build_hls_command, build_ladder, build_thumbnail_command,
+    build_trickplay_command, hash_file, link_file, link_tree, master_playlist_lock, move_into_place,
+    parse_media_playlist, pick_thumbnail_time, plan_chunks, probe_keyframes, probe_video, render_trickplay_vtt,
+    resolve_encoding_profile, stitch_chunks, trickplay_tile_size, write_master_playlist,
+)
 
 logger = logging.getLogger(__name__)
 
+# Transcode jobs re-raise errors and are retried with backoff. Finished
+# renditions and chunks are kept as checkpoints, so a retry resumes from there.
+TRANSCODE_RETRY = Retry(max=3, interval=[60, 300, 900])
+
+
+@contextmanager
+def staging_directory(base_output_dir):
+    """
+    Provides a fresh directory to encode into, next to the published output.
+
+    Output is encoded into the staging directory and published with
+    `move_into_place`, so published files, which duplicates may share
+    through hard links, are never rewritten. The directory is hidden, so
+    `link_tree` skips it, and whatever is left of it is removed afterwards.
+
+    Args:
+        base_output_dir (str): Directory of the video's output.
+
+    Yields:
+        str: Path of the staging directory.
+    """
+    os.makedirs(base_output_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix=".staging-", dir=base_output_dir)
+    try:
+        yield staging_dir
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+def encoding_profile_for(video):
+    """
+    Resolves the encoding profile of the given video.
+
+    Videos without a profile, or with one that is no longer configured, use
+    `HLS_DEFAULT_PROFILE`.
+
+    Args:
+        video (Video): The Video instance.
+
+    Returns:
+        tuple: `(name, profile)`, with the profile as returned by `resolve_encoding_profile`.
+    """
+    name = video.encoding_profile or settings.HLS_DEFAULT_PROFILE
+    if name not in settings.HLS_ENCODING_PROFILES:
+        logger.warning("⚠️ Unbekanntes Encoding-Profil %s für Video %s, nutze %s",
+                       name, video.id, settings.HLS_DEFAULT_PROFILE)
+        name = settings.HLS_DEFAULT_PROFILE
+    return name, resolve_encoding_profile(settings.HLS_ENCODING_PROFILES, name)
+
+
+def build_video_ladder(video, probe):
+    """
+    Builds the encoding ladder of the given video from its encoding profile.
+
+    Args:
+        video (Video): The Video instance.
+        probe (dict): Result of `probe_video`.
+
+    Returns:
+        tuple: `(profile_name, profile, ladder)`.
+    """
+    name, profile = encoding_profile_for(video)
+    include_mobile = profile.get("mobile", settings.HLS_MOBILE_RENDITIONS)
+    return name, profile, build_ladder(probe, include_mobile, profile)
+
+
+def ingest_video(video_id):
+    """
+    Hashes the uploaded file of the given Video instance and starts its processing.
+
+    The file is hashed in one streaming pass. If an already encoded video has
+    the same content and encoding profile, its HLS output, trickplay files and thumbnail are
+    reused via hard links and no ffmpeg work is done; the new upload itself
+    is replaced by a hard link to the existing source. Otherwise the
+    thumbnail, trickplay and HLS jobs are enqueued.
+
+    Args:
+        video_id (int): ID of the Video instance.
+    """
+    try:
+        video = Video.objects.get(id=video_id)
+        video.source_hash = hash_file(video.video_file.path)
+        video.save(update_fields=["source_hash"])
+
+        profile_name = encoding_profile_for(video)[0]
+        candidates = (
+            Video.objects
+            .filter(source_hash=video.source_hash, hls_ready=True)
+            .exclude(id=video.id)
+            .order_by("id")
+        )
+        original = next(
+            (candidate for candidate in candidates if encoding_profile_for(candidate)[0] == profile_name), None)
+        if original is None:
+            enqueue_processing(video.id)
+            return
+
+        reuse_encoded_output(original, video)
+        logger.info("✅ Video %s ist identisch mit Video %s, Ausgabe wiederverwendet", video.id, original.id)
+
+    except Exception as e:
+        logger.exception("❌ Fehler beim Einlesen von Video %s: %s", video_id, e)
+        raise
+
+
+def enqueue_processing(video_id):
+    """
+    Enqueues thumbnail, trickplay and HLS processing for the given video.
+
+    Args:
+        video_id (int): ID of the Video instance.
+    """
+    thumbnail_queue = django_rq.get_queue("thumbnails")
+    thumbnail_queue.enqueue(generate_thumbnail, video_id)
+    thumbnail_queue.enqueue(generate_trickplay, video_id)
+    django_rq.get_queue("transcode").enqueue(plan_hls, video_id, retry=TRANSCODE_RETRY)
+
+
+def reuse_encoded_output(original, video):
+    """
+    Makes `video` share the encoded output of `original`, which has the same source content.
+
+    Args:
+        original (Video): Fully encoded video with the same `source_hash`.
+        video (Video): Newly uploaded duplicate.
+    """
+    if os.path.exists(original.video_file.path) and not os.path.samefile(original.video_file.path, video.video_file.path):
+        link_file(original.video_file.path, video.video_file.path)
+
+    original_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(original.id))
+    video_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(video.id))
+    link_tree(original_dir, video_dir)
+
+    plan_renditions(video, {
+        rendition.label: {"width": rendition.width, "height": rendition.height}
+        for rendition in original.renditions.all()
+    }, profile_name=encoding_profile_for(video)[0])
+    for rendition in original.renditions.all():
+        video.renditions.filter(label=rendition.label).update(
+            state=rendition.state,
+            segment_count=rendition.segment_count,
+            started_at=rendition.started_at,
+            finished_at=rendition.finished_at,
+        )
+
+    video.hls_ready = True
+    video.duration = original.duration
+    update_fields = ["hls_ready", "duration"]
+    if original.thumbnail:
+        video.thumbnail.name = original.thumbnail.name
+        update_fields.append("thumbnail")
+    else:
+        django_rq.get_queue("thumbnails").enqueue(generate_thumbnail, video.id)
+    if not os.path.exists(os.path.join(video_dir, "trickplay", "thumbnails.vtt")):
+        django_rq.get_queue("thumbnails").enqueue(generate_trickplay, video.id)
+    video.save(update_fields=update_fields)
+
+
 def generate_thumbnail(video_id):
     """
     Generates a thumbnail for the given Video instance.
 
-    Uses ffmpeg to capture a frame at 5 seconds and saves it as a JPEG
-    in MEDIA_ROOT/thumbnails/. Updates the Video instance's `thumbnail` field.
+    Picks a timestamp from the probed duration, seeks there on the input and
+    lets ffmpeg choose the most representative of a few candidate frames,
+    scaled in the same pass. This takes about constant time, so it does not
+    wait for an encode slot behind long transcodes but runs right away with
+    `THUMBNAIL_THREADS` threads. The result is saved as a JPEG in
+    MEDIA_ROOT/thumbnails/. Updates the Video instance's `thumbnail` field.
 
     Args:
         video_id (int): ID of the Video instance.
@@ -26,15 +203,11 @@ def generate_thumbnail(video_id):
         filename = os.path.splitext(os.path.basename(input_path))[0] + ".jpg"
         output_path = os.path.join(output_dir, filename)
 
-        cmd = [
-            "ffmpeg",
-            "-y",              
-            "-i", input_path,   
-            "-ss", "00:00:05", 
-            "-vframes", "1",    
-            output_path,        
-        ]
+        timestamp = pick_thumbnail_time(probe_video(input_path)["duration"])
+        cmd = build_thumbnail_command(input_path, output_path, timestamp, THUMBNAIL_THREADS)
         subprocess.run(cmd, check=True)
+        if not os.path.exists(output_path):
+            raise RuntimeError(f"ffmpeg did not write a thumbnail at {timestamp}s")
 
         video.thumbnail.name = f"thumbnails/{filename}"  
         video.save(update_fields=["thumbnail"])  
@@ -45,13 +218,55 @@ def generate_thumbnail(video_id):
         logger.exception("❌ Fehler bei Thumbnail-Erstellung für Video: %s: %s", video_id, e)
 
 
+def generate_trickplay(video_id):
+    """
+    Generates trickplay sprite sheets and their WebVTT track for the given Video instance.
+
+    A single ffmpeg pass samples one frame per interval, scales it and packs
+    the frames into tiled JPEG sprite sheets. A `thumbnails.vtt` track maps
+    every interval to its tile. Output is saved under
+    MEDIA_ROOT/videos/<video_id>/trickplay/.
+
+    Args:
+        video_id (int): ID of the Video instance.
+    """
+    try:
+        video = Video.objects.get(id=video_id)
+        input_path = video.video_file.path
+
+        base_output_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(video.id))
+        output_dir = os.path.join(base_output_dir, "trickplay")
+
+        probe = probe_video(input_path)
+        tile_width, tile_height = trickplay_tile_size(probe)
+        with staging_directory(base_output_dir) as staging_dir:
+            with encode_slot() as threads:
+                cmd = build_trickplay_command(input_path, staging_dir, tile_width, tile_height, threads)
+                subprocess.run(cmd, check=True)
+            with open(os.path.join(staging_dir, "thumbnails.vtt"), "w", encoding="utf-8") as track:
+                track.write(render_trickplay_vtt(probe["duration"], tile_width, tile_height))
+            move_into_place(staging_dir, output_dir)
+
+        logger.info("✅ Trickplay für Video %s erstellt unter %s", video.id, output_dir)
+
+    except Exception as e:
+        logger.exception("❌ Fehler bei Trickplay-Erstellung für Video %s: %s", video_id, e)
+
+
 def generate_hls(video_id):
     """
     Generates HLS streaming files for the given Video instance.
 
-    Uses ffmpeg to create HLS playlists in multiple resolutions
-    (480p, 720p, 1080p) and saves them under MEDIA_ROOT/videos/<video_id>/. 
-    Updates the Video instance's `hls_ready` field upon success.
+    Probes the source and builds its encoding ladder, then uses a single
+    ffmpeg run to create one HLS playlist per rendition: the source is decoded
+    once and split into one scaled branch per rendition, and the audio is
+    encoded once into the shared audio rendition. Output is encoded into a
+    staging directory and moved to MEDIA_ROOT/videos/<video_id>/<label>/
+    (see `staging_directory`), together with a `master.m3u8` referencing all
+    renditions.
+    Records every rendition as a `VideoRendition` and updates the Video
+    instance's `hls_ready` field upon success. Renditions that are already
+    ready are not encoded again, and errors are re-raised so RQ can retry.
 
     Args:
         video_id (int): ID of the Video instance.
@@ -63,28 +278,35 @@ def generate_hls(video_id):
         base_output_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(video.id))
         os.makedirs(base_output_dir, exist_ok=True)
 
-        resolutions = {
-            "480p": "854:480",
-            "720p": "1280:720",
-            "1080p": "1920:1080"
-        }
+        probe = probe_video(input_path)
+        video.duration = probe["duration"]
+        video.save(update_fields=["duration"])
+        profile_name, profile, ladder = build_video_ladder(video, probe)
+        plan_renditions(video, ladder, audio=probe["audio"], profile_name=profile_name)
+        set_progress_units(video.id, ["hls"])
+        labels = list(ladder) + ([HLS_AUDIO_LABEL] if probe["audio"] else [])
 
-        for label, size in resolutions.items():
-            output_dir = os.path.join(base_output_dir, label)
-            os.makedirs(output_dir, exist_ok=True)
-        
-            cmd = [
-                "ffmpeg",
-                "-y",
-                "-i", input_path,
-                "-vf", f"scale={size}",
-                "-c:v", "h264",
-                "-c:a", "aac",
-                "-hls_time", "5", 
-                "-hls_playlist_type", "vod",
-                os.path.join(output_dir, "index.m3u8")
-            ]
-            subprocess.run(cmd, check=True)
+        pending = [label for label in labels if not rendition_is_ready(video.id, label, base_output_dir)]
+        if pending:
+            video.renditions.filter(label__in=pending).update(
+                state=VideoRendition.STATE_PROCESSING, started_at=timezone.now())
+            pending_ladder = {label: ladder[label] for label in pending if label in ladder}
+            with staging_directory(base_output_dir) as staging_dir:
+                for label in pending:
+                    os.makedirs(os.path.join(staging_dir, label))
+                with encode_slot() as threads:
+                    if pending_ladder:
+                        cmd = build_hls_command(
+                            input_path, staging_dir, pending_ladder, single_file=settings.HLS_SINGLE_FILE,
+                            audio=HLS_AUDIO_LABEL in pending, threads=threads)
+                    else:
+                        cmd = build_audio_hls_command(
+                            input_path, staging_dir, settings.HLS_SINGLE_FILE, profile["segment_duration"], threads)
+                    run_ffmpeg_with_progress(cmd, video.id, "hls", video.duration)
+                for label in pending:
+                    publish_rendition(video.id, label, staging_dir, base_output_dir)
+        with master_playlist_lock(base_output_dir):
+            write_master_playlist(base_output_dir, labels)
 
         video.hls_ready = True
         video.save(update_fields=["hls_ready"])
@@ -92,4 +314,432 @@ def generate_hls(video_id):
         logger.info("✅ HLS-Dateien für Video %s erstellt unter %s", video.id, base_output_dir)
 
     except Exception as e:
-         logger.exception("❌ Fehler bei HLS-Erstellung für Video %s: %s", video_id, e)
\ No newline at end of file
+         VideoRendition.objects.filter(video_id=video_id).exclude(state=VideoRendition.STATE_READY).update(
+             state=VideoRendition.STATE_FAILED, finished_at=timezone.now())
+         logger.exception("❌ Fehler bei HLS-Erstellung für Video %s: %s", video_id, e)
+         raise
+
+
+def plan_hls(video_id):
+    """
+    Probes the source of the given Video instance and fans out its HLS jobs.
+
+    Reads resolution, frame rate, duration and bitrate with ffprobe, builds
+    the encoding ladder from them and the video's encoding profile, records one pending `VideoRendition` per
+    rung and enqueues one `generate_hls_rendition` job per rung, a
+    `generate_hls_audio` job for the shared audio rendition if the source has
+    audio, plus the dependent `finalize_hls` job. The video's progress units (renditions or
+    chunks) are recorded so the progress endpoint can report on them.
+
+    Sources longer than twice `HLS_CHUNK_DURATION` are instead split at
+    keyframes into chunks that are encoded in parallel and stitched back
+    together (see `enqueue_chunked_hls_jobs`).
+
+    Args:
+        video_id (int): ID of the Video instance.
+    """
+    try:
+        video = Video.objects.get(id=video_id)
+        probe = probe_video(video.video_file.path)
+        video.duration = probe["duration"]
+        video.save(update_fields=["duration"])
+        profile_name, profile, ladder = build_video_ladder(video, probe)
+
+        logger.info("ℹ️ Video %s: %sx%s @ %.2f fps, Profil %s, Leiter: %s",
+                    video.id, probe["width"], probe["height"], probe["fps"], profile_name, ", ".join(ladder))
+
+        plan_renditions(video, ladder, audio=probe["audio"], profile_name=profile_name)
+        audio_units = [HLS_AUDIO_LABEL] if probe["audio"] else []
+        queue = django_rq.get_queue("transcode")
+        chunk_duration = settings.HLS_CHUNK_DURATION
+        if chunk_duration and probe["duration"] > 2 * chunk_duration:
+            chunks = plan_chunks(
+                probe_keyframes(video.video_file.path), probe["duration"], chunk_duration, profile["segment_duration"])
+            set_progress_units(video.id, [f"chunk-{index}" for index in range(len(chunks))] + audio_units)
+            enqueue_chunked_hls_jobs(queue, video.id, ladder, chunks, audio=probe["audio"])
+        else:
+            set_progress_units(video.id, list(ladder) + audio_units)
+            enqueue_hls_jobs(queue, video.id, ladder, audio=probe["audio"])
+
+    except Exception as e:
+        logger.exception("❌ Fehler bei HLS-Planung für Video %s: %s", video_id, e)
+        raise
+
+
+def generate_hls_rendition(video_id, label, rendition):
+    """
+    Generates the HLS playlist for a single rendition of the given Video instance.
+
+    Used by the fan-out pipeline: one job per rendition is enqueued so that
+    every rendition can be encoded on its own worker. The encode waits for a
+    free slot of the node's CPU budget (see `encode_slot`). Output is staged
+    and moved to MEDIA_ROOT/videos/<video_id>/<label>/. The rendition's `VideoRendition`
+    state is updated as it progresses, ffmpeg's progress is stored in the
+    cache while it runs, and once it is ready the master
+    playlist is rewritten to include it, so playback can start before the
+    remaining renditions are done. A rendition that is already ready is
+    skipped. Errors are re-raised so that RQ retries the job and the
+    dependent `finalize_hls` job only runs once it has succeeded.
+
+    Args:
+        video_id (int): ID of the Video instance.
+        label (str): Rendition label (e.g. "720p").
+        rendition (dict): Rendition settings as returned by `build_ladder`.
+    """
+    try:
+        video = Video.objects.get(id=video_id)
+        input_path = video.video_file.path
+
+        base_output_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(video.id))
+        if rendition_is_ready(video.id, label, base_output_dir):
+            set_progress(video.id, label, video.duration or 0.0, video.duration, state="done")
+            logger.info("ℹ️ HLS-Rendition %s für Video %s bereits fertig, übersprungen", label, video.id)
+            return
+        with staging_directory(base_output_dir) as staging_dir:
+            os.makedirs(os.path.join(staging_dir, label))
+            with encode_slot() as threads:
+                VideoRendition.objects.filter(video_id=video.id, label=label).update(
+                    state=VideoRendition.STATE_PROCESSING, started_at=timezone.now())
+                cmd = build_hls_command(
+                    input_path, staging_dir, {label: rendition}, single_file=settings.HLS_SINGLE_FILE, threads=threads)
+                run_ffmpeg_with_progress(cmd, video.id, label, video.duration)
+            publish_rendition(video.id, label, staging_dir, base_output_dir)
+
+        write_partial_master_playlist(video.id, base_output_dir)
+
+        logger.info("✅ HLS-Rendition %s für Video %s erstellt", label, video.id)
+
+    except Exception as e:
+        VideoRendition.objects.filter(video_id=video_id, label=label).update(
+            state=VideoRendition.STATE_FAILED, finished_at=timezone.now())
+        logger.exception("❌ Fehler bei HLS-Rendition %s für Video %s: %s", label, video_id, e)
+        raise
+
+
+def generate_hls_audio(video_id):
+    """
+    Encodes the shared audio rendition of the given Video instance.
+
+    The audio is encoded once over the whole source into
+    MEDIA_ROOT/videos/<video_id>/audio/, and every video rendition references
+    it as an audio group in the master playlist. The encode waits for a free
+    slot of the node's CPU budget like every other encode. It is tracked as a
+    `VideoRendition` with the label `audio` and is skipped if already ready.
+    Errors are re-raised so that RQ retries the job.
+
+    Args:
+        video_id (int): ID of the Video instance.
+    """
+    try:
+        video = Video.objects.get(id=video_id)
+        base_output_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(video.id))
+        if rendition_is_ready(video.id, HLS_AUDIO_LABEL, base_output_dir):
+            set_progress(video.id, HLS_AUDIO_LABEL, video.duration or 0.0, video.duration, state="done")
+            logger.info("ℹ️ HLS-Audio für Video %s bereits fertig, übersprungen", video.id)
+            return
+        segment_duration = encoding_profile_for(video)[1]["segment_duration"]
+        with staging_directory(base_output_dir) as staging_dir:
+            os.makedirs(os.path.join(staging_dir, HLS_AUDIO_LABEL))
+            with encode_slot() as threads:
+                VideoRendition.objects.filter(video_id=video.id, label=HLS_AUDIO_LABEL).update(
+                    state=VideoRendition.STATE_PROCESSING, started_at=timezone.now())
+                cmd = build_audio_hls_command(
+                    video.video_file.path, staging_dir, settings.HLS_SINGLE_FILE, segment_duration, threads)
+                run_ffmpeg_with_progress(cmd, video.id, HLS_AUDIO_LABEL, video.duration)
+            publish_rendition(video.id, HLS_AUDIO_LABEL, staging_dir, base_output_dir)
+        write_partial_master_playlist(video.id, base_output_dir)
+
+        logger.info("✅ HLS-Audio für Video %s erstellt", video.id)
+
+    except Exception as e:
+        VideoRendition.objects.filter(video_id=video_id, label=HLS_AUDIO_LABEL).update(
+            state=VideoRendition.STATE_FAILED, finished_at=timezone.now())
+        logger.exception("❌ Fehler bei HLS-Audio für Video %s: %s", video_id, e)
+        raise
+
+
+def write_partial_master_playlist(video_id, base_output_dir):
+    """
+    Rewrites the master playlist with the renditions that are ready so far.
+
+    Nothing is written until at least one video rendition and, if the video
+    has one, the shared audio rendition are ready, so the playlist never
+    offers variants without their audio. The rendition states are read
+    under `master_playlist_lock`, so of two jobs finishing together the one
+    that writes last also has the newer view.
+
+    Args:
+        video_id (int): ID of the Video instance.
+        base_output_dir (str): Directory containing one subdirectory per rendition.
+    """
+    with master_playlist_lock(base_output_dir):
+        renditions = dict(VideoRendition.objects.filter(video_id=video_id).values_list("label", "state"))
+        ready_labels = [label for label, state in renditions.items() if state == VideoRendition.STATE_READY]
+        if renditions.get(HLS_AUDIO_LABEL, VideoRendition.STATE_READY) != VideoRendition.STATE_READY:
+            return
+        if not any(label != HLS_AUDIO_LABEL for label in ready_labels):
+            return
+        write_master_playlist(base_output_dir, ready_labels)
+
+
+def finalize_hls(video_id, labels):
+    """
+    Writes the master playlist and marks the given Video instance as HLS-ready.
+
+    The master playlist is built from the encoded output, so its BANDWIDTH,
+    RESOLUTION and CODECS attributes describe the actual renditions.
+    Enqueued with a dependency on every `generate_hls_rendition` job, so RQ
+    only runs it after all of them have finished successfully.
+
+    Args:
+        video_id (int): ID of the Video instance.
+        labels (list): Labels of all renditions in the video's ladder, plus
+            `HLS_AUDIO_LABEL` if the video has a shared audio rendition.
+    """
+    base_output_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(video_id))
+    missing = [
+        label for label in labels
+        if not os.path.exists(os.path.join(base_output_dir, label, "index.m3u8"))
+    ]
+    if missing:
+        raise RuntimeError(f"Missing HLS renditions for video {video_id}: {', '.join(missing)}")
+
+    with master_playlist_lock(base_output_dir):
+        write_master_playlist(base_output_dir, labels)
+    Video.objects.filter(id=video_id).update(hls_ready=True)
+    logger.info("✅ HLS-Dateien für Video %s erstellt unter %s", video_id, base_output_dir)
+
+
+def enqueue_hls_jobs(queue, video_id, ladder, audio=False):
+    """
+    Enqueues the fan-out/fan-in HLS pipeline for the given video.
+
+    One `generate_hls_rendition` job is enqueued per rendition so that idle
+    workers can pick them up in parallel, followed by a `finalize_hls` job
+    that depends on all of them. With `audio`, a `generate_hls_audio` job is
+    enqueued first, since it is short and gates playback.
+
+    Args:
+        queue (rq.Queue): Queue to enqueue the jobs on.
+        video_id (int): ID of the Video instance.
+        ladder (dict): Encoding ladder as returned by `build_ladder`.
+        audio (bool): Whether the source has audio.
+
+    Returns:
+        rq.job.Job: The `finalize_hls` job.
+    """
+    jobs = [queue.enqueue(generate_hls_audio, video_id, retry=TRANSCODE_RETRY)] if audio else []
+    jobs += [
+        queue.enqueue(generate_hls_rendition, video_id, label, rendition, retry=TRANSCODE_RETRY)
+        for label, rendition in ladder.items()
+    ]
+    labels = list(ladder) + ([HLS_AUDIO_LABEL] if audio else [])
+    return queue.enqueue(finalize_hls, video_id, labels, depends_on=jobs, retry=TRANSCODE_RETRY)
+
+
+def plan_renditions(video, ladder, audio=False, profile_name=""):
+    """
+    Records one pending `VideoRendition` per rung of the given ladder.
+
+    Renditions that are already ready with the same size and encoding profile
+    are kept as checkpoints. Renditions left over from an earlier ladder of
+    the same video are removed.
+
+    Args:
+        video (Video): The Video instance.
+        ladder (dict): Encoding ladder as returned by `build_ladder`.
+        audio (bool): Also record the shared audio rendition.
+        profile_name (str): Name of the encoding profile the ladder was built from.
+    """
+    if audio:
+        ladder = {**ladder, HLS_AUDIO_LABEL: {"width": None, "height": None}}
+    video.renditions.exclude(label__in=list(ladder)).delete()
+    existing = {rendition.label: rendition for rendition in video.renditions.all()}
+    for label, rendition in ladder.items():
+        current = existing.get(label)
+        if (current and current.state == VideoRendition.STATE_READY
+                and (current.width, current.height) == (rendition["width"], rendition["height"])
+                and current.encoding_profile == profile_name):
+            continue
+        VideoRendition.objects.update_or_create(
+            video=video,
+            label=label,
+            defaults={
+                "width": rendition["width"],
+                "height": rendition["height"],
+                "encoding_profile": profile_name,
+                "state": VideoRendition.STATE_PENDING,
+                "segment_count": 0,
+                "started_at": None,
+                "finished_at": None,
+            },
+        )
+
+
+def rendition_is_ready(video_id, label, base_output_dir):
+    """
+    Checks whether a rendition has already been encoded completely.
+
+    Args:
+        video_id (int): ID of the Video instance.
+        label (str): Rendition label.
+        base_output_dir (str): Directory containing one subdirectory per rendition.
+
+    Returns:
+        bool: True if the rendition is marked ready and its playlist exists.
+    """
+    return (
+        VideoRendition.objects.filter(video_id=video_id, label=label, state=VideoRendition.STATE_READY).exists()
+        and os.path.exists(os.path.join(base_output_dir, label, "index.m3u8"))
+    )
+
+
+def publish_rendition(video_id, label, staging_dir, base_output_dir):
+    """
+    Publishes a rendition encoded into a staging directory and marks it ready.
+
+    The segment index is written before the files are moved into place, so
+    it is never older than the playlist next to it.
+
+    Args:
+        video_id (int): ID of the Video instance.
+        label (str): Rendition label.
+        staging_dir (str): Staging directory containing the rendition's subdirectory.
+        base_output_dir (str): Directory containing one subdirectory per rendition.
+    """
+    write_segment_index(os.path.join(staging_dir, label))
+    move_into_place(os.path.join(staging_dir, label), os.path.join(base_output_dir, label))
+    mark_rendition_ready(video_id, label, base_output_dir)
+
+
+def mark_rendition_ready(video_id, label, base_output_dir):
+    """
+    Marks a rendition as ready and records its segment count.
+
+    Args:
+        video_id (int): ID of the Video instance.
+        label (str): Rendition label.
+        base_output_dir (str): Directory containing one subdirectory per rendition.
+    """
+    segments = parse_media_playlist(os.path.join(base_output_dir, label, "index.m3u8"))
+    VideoRendition.objects.filter(video_id=video_id, label=label).update(
+        state=VideoRendition.STATE_READY,
+        segment_count=len(segments),
+        finished_at=timezone.now(),
+    )
+
+
+def generate_hls_chunk(video_id, index, start, duration, ladder):
+    """
+    Encodes one time chunk of the given Video instance into every rendition.
+
+    Used by the chunked pipeline for long sources, within one of the node's
+    encode slots like every other encode. The chunk starts at a source
+    keyframe, is decoded once and split into all renditions, and is written
+    to MEDIA_ROOT/videos/<video_id>/chunks/<index>/<label>/.
+    Progress is stored in the cache under the unit `chunk-<index>`.
+    A `checkpoint.json` is written once the chunk is complete, and a chunk
+    with a matching checkpoint is not encoded again. Errors are re-raised so
+    that RQ retries the job and the dependent `stitch_hls` job only runs once
+    it has succeeded.
+
+    Args:
+        video_id (int): ID of the Video instance.
+        index (int): Position of the chunk in the source.
+        start (float): Chunk start in seconds.
+        duration (float): Chunk duration in seconds.
+        ladder (dict): Encoding ladder as returned by `build_ladder`.
+    """
+    try:
+        video = Video.objects.get(id=video_id)
+        input_path = video.video_file.path
+
+        chunk_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(video.id), "chunks", str(index))
+        checkpoint = {"start": start, "duration": duration, "labels": list(ladder)}
+        checkpoint_path = os.path.join(chunk_dir, "checkpoint.json")
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, encoding="utf-8") as checkpoint_file:
+                if json.load(checkpoint_file) == checkpoint:
+                    set_progress(video.id, f"chunk-{index}", duration, duration, state="done")
+                    logger.info("ℹ️ HLS-Chunk %s für Video %s bereits fertig, übersprungen", index, video.id)
+                    return
+        for label in ladder:
+            os.makedirs(os.path.join(chunk_dir, label), exist_ok=True)
+
+        with encode_slot() as threads:
+            VideoRendition.objects.filter(
+                video_id=video.id, label__in=list(ladder),
+                state__in=[VideoRendition.STATE_PENDING, VideoRendition.STATE_FAILED],
+            ).update(state=VideoRendition.STATE_PROCESSING, started_at=timezone.now())
+            cmd = build_hls_command(
+                input_path, chunk_dir, ladder, start=start, duration=duration,
+                single_file=settings.HLS_SINGLE_FILE, threads=threads)
+            run_ffmpeg_with_progress(cmd, video.id, f"chunk-{index}", duration)
+        with open(checkpoint_path, "w", encoding="utf-8") as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+
+        logger.info("✅ HLS-Chunk %s (%.1fs - %.1fs) für Video %s erstellt", index, start, start + duration, video.id)
+
+    except Exception as e:
+        VideoRendition.objects.filter(video_id=video_id, label__in=list(ladder)).exclude(
+            state=VideoRendition.STATE_READY).update(state=VideoRendition.STATE_FAILED, finished_at=timezone.now())
+        logger.exception("❌ Fehler bei HLS-Chunk %s für Video %s: %s", index, video_id, e)
+        raise
+
+
+def stitch_hls(video_id, labels, chunk_count):
+    """
+    Stitches the encoded chunks of the given Video instance into its renditions.
+
+    Enqueued with a dependency on every `generate_hls_chunk` job. Each
+    rendition's segments are renumbered into one continuous playlist and the
+    rendition is marked ready; renditions that are already ready are
+    skipped. The chunk directory is removed at the end.
+
+    Args:
+        video_id (int): ID of the Video instance.
+        labels (list): Labels of all renditions in the video's ladder.
+        chunk_count (int): Number of encoded chunks.
+    """
+    base_output_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(video_id))
+    for label in labels:
+        if rendition_is_ready(video_id, label, base_output_dir):
+            continue
+        with staging_directory(base_output_dir) as staging_dir:
+            stitch_chunks(base_output_dir, label, chunk_count, output_dir=os.path.join(staging_dir, label))
+            publish_rendition(video_id, label, staging_dir, base_output_dir)
+
+    shutil.rmtree(os.path.join(base_output_dir, "chunks"), ignore_errors=True)
+    logger.info("✅ %s HLS-Chunks für Video %s zusammengefügt", chunk_count, video_id)
+
+
+def enqueue_chunked_hls_jobs(queue, video_id, ladder, chunks, audio=False):
+    """
+    Enqueues the split-encode-stitch HLS pipeline for the given video.
+
+    One `generate_hls_chunk` job is enqueued per chunk so that the encode of
+    a single long source is spread across all workers. A `stitch_hls` job
+    depends on all chunk jobs and a `finalize_hls` job on the stitch job.
+    With `audio`, the shared audio rendition is encoded by a single
+    `generate_hls_audio` job over the whole source, which `finalize_hls`
+    also depends on.
+
+    Args:
+        queue (rq.Queue): Queue to enqueue the jobs on.
+        video_id (int): ID of the Video instance.
+        ladder (dict): Encoding ladder as returned by `build_ladder`.
+        chunks (list): `(start, duration)` tuples as returned by `plan_chunks`.
+        audio (bool): Whether the source has audio.
+
+    Returns:
+        rq.job.Job: The `finalize_hls` job.
+    """
+    audio_jobs = [queue.enqueue(generate_hls_audio, video_id, retry=TRANSCODE_RETRY)] if audio else []
+    chunk_jobs = [
+        queue.enqueue(generate_hls_chunk, video_id, index, start, duration, ladder, retry=TRANSCODE_RETRY)
+        for index, (start, duration) in enumerate(chunks)
+    ]
+    stitch_job = queue.enqueue(
+        stitch_hls, video_id, list(ladder), len(chunks), depends_on=chunk_jobs, retry=TRANSCODE_RETRY)
+    labels = list(ladder) + ([HLS_AUDIO_LABEL] if audio else [])
+    return queue.enqueue(finalize_hls, video_id, labels, depends_on=[stitch_job] + audio_jobs, retry=TRANSCODE_RETRY)
@@ -0,0 +1,249 @@
+import os
+import base64
+import fcntl
+import hashlib
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils.text import get_valid_filename
+from .serializers import VideoUploadSerializer
+
+# Resumable uploads follow the tus protocol (https://tus.io/protocols/resumable-upload).
+TUS_VERSION = "1.0.0"
+TUS_EXTENSIONS = "creation,checksum,termination"
+TUS_CHECKSUM_ALGORITHMS = ("sha1", "sha256", "md5")
+
+# Chunks are copied from the request to disk in blocks of this size.
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+# tus status code for a chunk whose Upload-Checksum does not match.
+HTTP_460_CHECKSUM_MISMATCH = 460
+
+
+class UploadError(Exception):
+    """
+    Raised when an upload request cannot be processed.
+
+    Attributes:
+        status (int): HTTP status code to answer with.
+        detail (str): Human-readable reason.
+    """
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def upload_path(upload):
+    """
+    Returns the path of the partial file of the given upload.
+    """
+    return os.path.join(settings.MEDIA_ROOT, "uploads", f"{upload.id}.part")
+
+
+def parse_upload_metadata(header):
+    """
+    Parses a tus `Upload-Metadata` header.
+
+    Args:
+        header (str): Comma-separated `key base64value` pairs.
+
+    Returns:
+        dict: Decoded metadata.
+
+    Raises:
+        UploadError: If a value is not valid base64-encoded UTF-8.
+    """
+    metadata = {}
+    for pair in filter(None, (pair.strip() for pair in (header or "").split(","))):
+        key, _, value = pair.partition(" ")
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode("utf-8")
+        except ValueError:
+            raise UploadError(400, f"Invalid Upload-Metadata value for '{key}'.")
+    return metadata
+
+
+def parse_upload_checksum(header):
+    """
+    Parses a tus `Upload-Checksum` header.
+
+    Args:
+        header (str): `<algorithm> <base64 digest>`, e.g. "sha256 47DEQpj8...".
+
+    Returns:
+        tuple: `(algorithm, digest)` with the raw digest bytes, or None if no header was sent.
+
+    Raises:
+        UploadError: If the algorithm is not supported or the digest is malformed.
+    """
+    if not header:
+        return None
+    algorithm, _, digest = header.strip().partition(" ")
+    if algorithm not in TUS_CHECKSUM_ALGORITHMS:
+        raise UploadError(400, f"Unsupported checksum algorithm '{algorithm}'.")
+    try:
+        return algorithm, base64.b64decode(digest, validate=True)
+    except ValueError:
+        raise UploadError(400, "Invalid Upload-Checksum digest.")
+
+
+def open_upload_file(upload, mode):
+    """
+    Opens and locks the partial file of an upload.
+
+    The lock is held until the file is closed. It is taken without waiting,
+    so a second request for the same upload is rejected instead of queued.
+
+    Args:
+        upload (VideoUpload): The upload.
+        mode (str): File mode, e.g. "r+b".
+
+    Returns:
+        file: The open, locked partial file.
+
+    Raises:
+        UploadError: With 409 if another request holds the lock, or if the
+            file is gone because the upload has been completed.
+    """
+    try:
+        part = open(upload_path(upload), mode)
+    except FileNotFoundError:
+        raise UploadError(409, "Upload is already complete.")
+    try:
+        fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        part.close()
+        raise UploadError(409, "Another request is writing to this upload.")
+    return part
+
+
+def create_upload_file(upload):
+    """
+    Creates the empty partial file of a new upload.
+
+    Args:
+        upload (VideoUpload): The new upload.
+    """
+    os.makedirs(os.path.dirname(upload_path(upload)), exist_ok=True)
+    open(upload_path(upload), "wb").close()
+
+
+def append_chunk(upload, stream, content_length, checksum=None):
+    """
+    Appends one chunk of an upload from the request stream to disk.
+
+    The request body is copied in `UPLOAD_BLOCK_SIZE` blocks straight into
+    the partial file, so it is never buffered in memory or in Django's upload
+    handlers. The file is locked while writing, so concurrent requests for
+    the same upload are rejected, and the offset is checked again under the
+    lock in case another request has moved it on. If a checksum is given and
+    does not match, the chunk is discarded. Without a checksum, bytes
+    received before a dropped connection are kept and the client resumes
+    from there.
+
+    Args:
+        upload (VideoUpload): The upload to append to.
+        stream: Readable request body.
+        content_length (int): Number of bytes in the request body.
+        checksum (tuple, optional): `(algorithm, digest)` as returned by `parse_upload_checksum`.
+
+    Returns:
+        int: The new upload offset.
+
+    Raises:
+        UploadError: If the chunk exceeds the upload length, the upload is
+            locked by another request, has moved on or is already complete, or
+            the checksum does not match.
+    """
+    if upload.offset + content_length > upload.length:
+        raise UploadError(413, "Chunk exceeds Upload-Length.")
+    digest = hashlib.new(checksum[0]) if checksum else None
+
+    with open_upload_file(upload, "r+b") as part:
+        offset = upload.offset
+        upload.refresh_from_db(fields=["offset", "video"])
+        if upload.video_id:
+            raise UploadError(409, "Upload is already complete.")
+        if upload.offset != offset:
+            raise UploadError(409, f"Upload-Offset must be {upload.offset}.")
+        # The database offset is authoritative; drop bytes of a chunk that was
+        # written but never acknowledged.
+        part.truncate(upload.offset)
+        part.seek(upload.offset)
+
+        remaining = content_length
+        while remaining:
+            block = stream.read(min(UPLOAD_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            part.write(block)
+            if digest:
+                digest.update(block)
+            remaining -= len(block)
+
+        if digest and (remaining or digest.digest() != checksum[1]):
+            part.truncate(upload.offset)
+            raise UploadError(HTTP_460_CHECKSUM_MISMATCH, "Upload-Checksum does not match the chunk.")
+        part.flush()
+        os.fsync(part.fileno())
+        # Saved under the lock, so a retried request cannot read the old
+        # offset and truncate the bytes just written.
+        upload.offset += content_length - remaining
+        upload.save(update_fields=["offset", "updated_at"])
+    return upload.offset
+
+
+def complete_upload(upload):
+    """
+    Turns a fully received upload into a Video.
+
+    The metadata is validated again first, since e.g. an encoding profile
+    may have been removed since the upload started; an invalid upload keeps
+    its partial file. The partial file is then moved into
+    `MEDIA_ROOT/videos/` without copying, and the Video is created from the
+    upload's metadata. Creating the Video triggers the usual ingest and
+    processing jobs. All of this happens under the upload's lock, so a
+    concurrent request for the final chunk cannot complete it twice.
+
+    Args:
+        upload (VideoUpload): An upload whose offset has reached its length.
+
+    Returns:
+        Video: The created Video instance.
+
+    Raises:
+        UploadError: With 400 if the metadata is no longer valid, or with 409
+            if another request holds the upload or has already completed it.
+    """
+    with open_upload_file(upload, "rb"):
+        upload.refresh_from_db(fields=["video"])
+        if upload.video_id:
+            raise UploadError(409, "Upload is already complete.")
+        serializer = VideoUploadSerializer(data=upload.metadata)
+        if not serializer.is_valid():
+            errors = "; ".join(f"{field}: {' '.join(map(str, messages))}" for field, messages in serializer.errors.items())
+            raise UploadError(400, f"Invalid Upload-Metadata: {errors}")
+
+        filename = get_valid_filename(os.path.basename(upload.metadata.get("filename") or "")) or f"{upload.id}.mp4"
+        name = default_storage.get_available_name(f"videos/{filename}")
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, "videos"), exist_ok=True)
+        os.replace(upload_path(upload), os.path.join(settings.MEDIA_ROOT, name))
+
+        video = serializer.save(video_file=name)
+        upload.video = video
+        upload.save(update_fields=["video", "updated_at"])
+    return video
+
+
+def delete_upload(upload):
+    """
+    Deletes an unfinished upload and its partial file.
+
+    Args:
+        upload (VideoUpload): The upload to delete.
+    """
+    try:
+        os.remove(upload_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
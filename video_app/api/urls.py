@@ -1,8 +1,31 @@
+from django.conf import settings
 from django.urls import path
-from .views import VideoListAPIView, VideoStreamAPIView, VideoSegmentAPIView
+from .views import (
+    VideoListAPIView, VideoMasterPlaylistAPIView, VideoStreamAPIView, VideoSegmentAPIView,
+    AsyncVideoMasterPlaylistAPIView, AsyncVideoStreamAPIView, AsyncVideoSegmentAPIView,
+    VideoTrickplayTrackAPIView, VideoTrickplaySpriteAPIView, VideoProgressAPIView,
+    VideoUploadCreateAPIView, VideoUploadAPIView,
+)
+
+# Under ASGI, playlists and segments are served by async views.
+if settings.MEDIA_ASYNC_VIEWS:
+    master_view, stream_view, segment_view = (
+        AsyncVideoMasterPlaylistAPIView, AsyncVideoStreamAPIView, AsyncVideoSegmentAPIView)
+else:
+    master_view, stream_view, segment_view = VideoMasterPlaylistAPIView, VideoStreamAPIView, VideoSegmentAPIView
 
 urlpatterns = [
     path('video/', VideoListAPIView.as_view(), name='video-list'),
-    path('video/<int:movie_id>/<str:resolution>/index.m3u8', VideoStreamAPIView.as_view(), name='video-stream'),
-    path('video/<int:movie_id>/<str:resolution>/<str:segment>/', VideoSegmentAPIView.as_view(), name='video-segment'),
+    path('video/uploads/', VideoUploadCreateAPIView.as_view(), name='video-upload-create'),
+    path('video/uploads/<uuid:upload_id>/', VideoUploadAPIView.as_view(), name='video-upload'),
+    path('video/progress/', VideoProgressAPIView.as_view(), name='video-progress-list'),
+    path('video/<int:movie_id>/progress/', VideoProgressAPIView.as_view(), name='video-progress'),
+    path('video/<int:movie_id>/master.m3u8', master_view.as_view(), name='video-master'),
+    path('video/<int:movie_id>/trickplay/thumbnails.vtt', VideoTrickplayTrackAPIView.as_view(), name='video-trickplay-track'),
+    path('video/<int:movie_id>/trickplay/sprite<int:index>.jpg', VideoTrickplaySpriteAPIView.as_view(), name='video-trickplay-sprite'),
+    path('video/<int:movie_id>/<slug:resolution>/index.m3u8', stream_view.as_view(), name='video-stream'),
+    # Playlists reference segments by bare name (`index0.ts`), so the route has
+    # no trailing slash; the old form is kept for clients with cached URLs.
+    path('video/<int:movie_id>/<slug:resolution>/<str:segment>', segment_view.as_view(), name='video-segment'),
+    path('video/<int:movie_id>/<slug:resolution>/<str:segment>/', segment_view.as_view()),
 ]
\ No newline at end of file
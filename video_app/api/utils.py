@@ -0,0 +1,1009 @@
+import os
+import json
+import math
+import fcntl
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from django.core.exceptions import ImproperlyConfigured
+
+# Rungs of the encoding ladder: (label, bounding box width, bounding box height, max video bitrate in kbit/s).
+HLS_LADDER = [
+    ("480p", 854, 480, 1400),
+    ("720p", 1280, 720, 2800),
+    ("1080p", 1920, 1080, 5000),
+]
+
+# Additional low rungs for mobile clients, enabled with `HLS_MOBILE_RENDITIONS`.
+HLS_MOBILE_LADDER = [
+    ("240p", 426, 240, 400),
+    ("360p", 640, 360, 800),
+]
+
+HLS_SEGMENT_DURATION = 5
+
+# Encoding settings used for every key a profile in `HLS_ENCODING_PROFILES`
+# does not set. `gop` and `segment_duration` are in seconds; a `crf` of None
+# leaves rate control to the encoder within the rung's bitrate cap.
+DEFAULT_ENCODING_PROFILE = {
+    "ladder": HLS_LADDER,
+    "mobile_ladder": HLS_MOBILE_LADDER,
+    "preset": "medium",
+    "crf": None,
+    "gop": HLS_SEGMENT_DURATION,
+    "segment_duration": HLS_SEGMENT_DURATION,
+}
+
+# Audio is encoded once into its own rendition that every video rendition
+# references as an EXT-X-MEDIA audio group.
+HLS_AUDIO_LABEL = "audio"
+HLS_AUDIO_BITRATE = 128
+
+# Maximum width of generated thumbnails; smaller sources are not upscaled.
+THUMBNAIL_WIDTH = 640
+
+# Number of consecutive frames the `thumbnail` filter picks the most representative one from.
+THUMBNAIL_CANDIDATES = 30
+
+# Trickplay previews: one tile every TRICKPLAY_INTERVAL seconds, TRICKPLAY_WIDTH
+# pixels wide, packed into sprite sheets of TRICKPLAY_COLUMNS x TRICKPLAY_ROWS tiles.
+TRICKPLAY_INTERVAL = 10
+TRICKPLAY_WIDTH = 160
+TRICKPLAY_COLUMNS = 10
+TRICKPLAY_ROWS = 10
+
+# RFC 6381 profile/constraint bytes for the H.264 profiles reported by ffprobe.
+H264_PROFILE_CODES = {
+    "Constrained Baseline": "42E0",
+    "Baseline": "4200",
+    "Main": "4D40",
+    "High": "6400",
+    "High 10": "6E00",
+    "High 4:2:2": "7A00",
+}
+
+# RFC 6381 object types for the AAC profiles reported by ffprobe.
+AAC_PROFILE_CODES = {
+    "LC": "mp4a.40.2",
+    "HE-AAC": "mp4a.40.5",
+    "HE-AACv2": "mp4a.40.29",
+}
+
+
+def _parse_rate(rate):
+    """
+    Parses an ffprobe frame rate such as "30000/1001" into a float.
+
+    Returns:
+        float: The frame rate, or 0.0 if it is missing or invalid.
+    """
+    try:
+        num, _, den = (rate or "").partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def probe_video(input_path):
+    """
+    Reads the properties of a source video with ffprobe.
+
+    Rotated sources (e.g. portrait phone recordings) report their display
+    orientation, so width and height are swapped for 90/270 degree rotations.
+
+    Args:
+        input_path (str): Path to the source video file.
+
+    Returns:
+        dict: `width`, `height` (int), `fps` (float), `duration` (float, seconds),
+        `bitrate` (int, bit/s, 0 if unknown) and `audio` (bool, True if the
+        source has an audio stream).
+    """
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "stream=codec_type,width,height,avg_frame_rate,r_frame_rate,bit_rate:stream_tags=rotate"
+                         ":stream_side_data=rotation:format=duration,bit_rate",
+        "-of", "json",
+        input_path,
+    ]
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    data = json.loads(result.stdout)
+    stream = next(stream for stream in data["streams"] if stream.get("codec_type") == "video")
+    fmt = data.get("format", {})
+
+    width, height = int(stream["width"]), int(stream["height"])
+    rotation = stream.get("tags", {}).get("rotate", 0)
+    for side_data in stream.get("side_data_list", []):
+        rotation = side_data.get("rotation", rotation)
+    if abs(int(rotation)) % 180 == 90:
+        width, height = height, width
+
+    return {
+        "width": width,
+        "height": height,
+        "fps": _parse_rate(stream.get("avg_frame_rate")) or _parse_rate(stream.get("r_frame_rate")) or 25.0,
+        "duration": float(fmt.get("duration") or 0),
+        "bitrate": int(stream.get("bit_rate") or fmt.get("bit_rate") or 0),
+        "audio": any(stream.get("codec_type") == "audio" for stream in data["streams"]),
+    }
+
+
+def resolve_encoding_profile(profiles, name):
+    """
+    Looks up a named encoding profile and fills in the defaults.
+
+    Args:
+        profiles (dict): Mapping of profile name to profile dict, usually
+            `settings.HLS_ENCODING_PROFILES`.
+        name (str): Name of the profile.
+
+    Returns:
+        dict: The profile with every key of `DEFAULT_ENCODING_PROFILE`.
+
+    Raises:
+        KeyError: If no profile with this name exists.
+        ImproperlyConfigured: If the segment duration is not a multiple of
+            the GOP length, so segments could not be cut at keyframes.
+    """
+    profile = {**DEFAULT_ENCODING_PROFILE, **profiles[name]}
+    if profile["segment_duration"] % profile["gop"]:
+        raise ImproperlyConfigured(
+            f"Encoding profile {name!r}: segment_duration {profile['segment_duration']} "
+            f"is not a multiple of gop {profile['gop']}."
+        )
+    return profile
+
+
+def build_ladder(probe, include_mobile=False, profile=None):
+    """
+    Builds the encoding ladder for a probed source.
+
+    Each rung is a bounding box; the source is scaled to fit inside it while
+    keeping its aspect ratio. Rungs that would upscale the source are skipped,
+    and a source smaller than every rung is encoded once at its native size.
+    Bitrates are capped at the source bitrate, and the GOP length is derived
+    from the source frame rate so keyframes line up with segment boundaries.
+    Rungs, GOP, preset, CRF and segment duration come from the encoding
+    profile, and are copied into every rendition dict.
+
+    Args:
+        probe (dict): Result of `probe_video`.
+        include_mobile (bool): Whether to add the profile's mobile rungs.
+        profile (dict, optional): Result of `resolve_encoding_profile`;
+            `DEFAULT_ENCODING_PROFILE` if omitted.
+
+    Returns:
+        dict: Mapping of label to rendition dict with `width`, `height`,
+        `maxrate` (kbit/s), `gop` (frames), `preset`, `crf` and
+        `segment_duration` (seconds), ordered from lowest to highest.
+    """
+    profile = profile or DEFAULT_ENCODING_PROFILE
+    rungs = [tuple(rung) for rung in profile["ladder"]]
+    if include_mobile:
+        rungs += [tuple(rung) for rung in profile["mobile_ladder"]]
+    rungs = sorted(rungs, key=lambda rung: rung[2])
+    src_width, src_height = probe["width"], probe["height"]
+    source_kbps = probe["bitrate"] // 1000
+    gop = max(1, round(probe["fps"] * profile["gop"]))
+    encoding = {
+        "preset": profile["preset"],
+        "crf": profile["crf"],
+        "segment_duration": profile["segment_duration"],
+    }
+
+    ladder = {}
+    for label, box_width, box_height, maxrate in rungs:
+        scale = min(box_width / src_width, box_height / src_height)
+        if scale > 1:
+            continue
+        ladder[label] = {
+            "width": max(2, round(src_width * scale / 2) * 2),
+            "height": max(2, round(src_height * scale / 2) * 2),
+            "maxrate": min(maxrate, source_kbps) if source_kbps else maxrate,
+            "gop": gop,
+            **encoding,
+        }
+
+    if not ladder:
+        label, _, _, maxrate = rungs[0]
+        ladder[label] = {
+            "width": src_width - src_width % 2,
+            "height": src_height - src_height % 2,
+            "maxrate": min(maxrate, source_kbps) if source_kbps else maxrate,
+            "gop": gop,
+            **encoding,
+        }
+    return ladder
+
+
+def build_hls_command(
+    input_path, base_output_dir, ladder, start=None, duration=None, single_file=False, audio=False, threads=None,
+):
+    """
+    Builds a single ffmpeg command that encodes every HLS rendition in one run.
+
+    The source is decoded once and the video stream is fanned out with a
+    `split` filter into one scaled branch per rendition. Each branch is written
+    as its own output to `<base_output_dir>/<label>/index.m3u8`, so the layout
+    matches the one served by `VideoStreamAPIView`.
+
+    When `start` is given, only the chunk from `start` to `start + duration`
+    is encoded. The seek happens on the input, so decoding begins at the
+    chunk's keyframe, and output timestamps are offset by `start`. Since no
+    output shifts its timestamps by the encoder delay, a frame gets the same
+    timestamp whether it is encoded in a chunk or in one run, so stitched
+    chunks join without overlap and stay in sync with the audio rendition.
+
+    With `single_file`, every rendition is written as one `index.ts` and its
+    playlist addresses the segments with `EXT-X-BYTERANGE`.
+
+    Video renditions carry no audio. With `audio`, the first audio stream is
+    encoded once into the shared audio rendition in the same run.
+
+    With `threads`, decoding and filtering use that many threads and the
+    thread count is split evenly between the video encoders, so the whole
+    run stays within the budget it was given.
+
+    Args:
+        input_path (str): Path to the source video file.
+        base_output_dir (str): Directory that receives one subdirectory per rendition.
+        ladder (dict): Mapping of rendition label to rendition dict, as returned by `build_ladder`.
+        start (float, optional): Chunk start in seconds.
+        duration (float, optional): Chunk duration in seconds.
+        single_file (bool): Write one media file per rendition instead of one per segment.
+        audio (bool): Also write the shared audio rendition.
+        threads (int, optional): Thread budget of the run; ffmpeg's default if omitted.
+
+    Returns:
+        list: The ffmpeg argument list, ready for `subprocess.run`.
+    """
+    labels = list(ladder)
+    split = f"[0:v]split={len(labels)}" + "".join(f"[v{i}]" for i in range(len(labels)))
+    scales = [
+        f"[v{i}]scale={ladder[label]['width']}:{ladder[label]['height']}[out{i}]"
+        for i, label in enumerate(labels)
+    ]
+
+    cmd = ["ffmpeg", "-y"]
+    output_options = []
+    encoder_options = []
+    if threads:
+        cmd += ["-filter_complex_threads", str(threads), "-threads", str(threads)]
+        encoder_options = ["-threads", str(max(1, threads // len(labels)))]
+    if start is not None:
+        cmd += ["-ss", f"{start:.3f}"]
+        output_options += ["-output_ts_offset", f"{start:.3f}"]
+    if duration is not None:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += [
+        "-i", input_path,
+        "-filter_complex", ";".join([split] + scales),
+    ]
+    for i, label in enumerate(labels):
+        rendition = ladder[label]
+        cmd += output_options + encoder_options + [
+            "-map", f"[out{i}]",
+            "-an",
+            "-c:v", "h264",
+            "-preset", rendition.get("preset", DEFAULT_ENCODING_PROFILE["preset"]),
+        ] + (["-crf", str(rendition["crf"])] if rendition.get("crf") is not None else []) + [
+            "-maxrate", f"{rendition['maxrate']}k",
+            "-bufsize", f"{rendition['maxrate'] * 2}k",
+            "-g", str(rendition["gop"]),
+            "-keyint_min", str(rendition["gop"]),
+            "-sc_threshold", "0",
+        ] + _hls_output_options(
+            base_output_dir, label, single_file, rendition.get("segment_duration", HLS_SEGMENT_DURATION))
+    if audio:
+        segment_duration = next(iter(ladder.values()), {}).get("segment_duration", HLS_SEGMENT_DURATION)
+        cmd += output_options + _audio_output_options(base_output_dir, single_file, segment_duration)
+    return cmd
+
+
+def build_audio_hls_command(
+    input_path, base_output_dir, single_file=False, segment_duration=HLS_SEGMENT_DURATION, threads=None,
+):
+    """
+    Builds an ffmpeg command that encodes the shared audio rendition on its own.
+
+    The first audio stream is encoded to stereo AAC at `HLS_AUDIO_BITRATE`
+    over the whole source and written to `<base_output_dir>/audio/index.m3u8`.
+    Audio is never split into chunks, so there are no gaps at chunk borders.
+
+    Args:
+        input_path (str): Path to the source video file.
+        base_output_dir (str): Directory that receives one subdirectory per rendition.
+        single_file (bool): Write one media file instead of one per segment.
+        segment_duration (int): Target segment length in seconds.
+        threads (int, optional): Thread budget of the run; ffmpeg's default if omitted.
+
+    Returns:
+        list: The ffmpeg argument list, ready for `subprocess.run`.
+    """
+    thread_options = ["-threads", str(threads)] if threads else []
+    return ["ffmpeg", "-y", *thread_options, "-i", input_path] + _audio_output_options(
+        base_output_dir, single_file, segment_duration)
+
+
+def _audio_output_options(base_output_dir, single_file, segment_duration):
+    """
+    Builds the output options of the shared audio rendition.
+    """
+    return [
+        "-map", "0:a:0",
+        "-vn",
+        "-c:a", "aac",
+        "-b:a", f"{HLS_AUDIO_BITRATE}k",
+        "-ac", "2",
+    ] + _hls_output_options(base_output_dir, HLS_AUDIO_LABEL, single_file, segment_duration)
+
+
+def _hls_output_options(base_output_dir, label, single_file, segment_duration):
+    """
+    Builds the HLS muxer options of one rendition output.
+    """
+    options = [
+        "-hls_time", str(segment_duration),
+        "-hls_playlist_type", "vod",
+        # Keep timestamps as encoded: shifting negative decode timestamps
+        # (the encoder's B-frame delay) would move a rendition or chunk that
+        # starts at 0 by that delay, but not one starting later.
+        "-avoid_negative_ts", "disabled",
+        "-hls_segment_options", "avoid_negative_ts=disabled",
+    ]
+    if single_file:
+        options += [
+            "-hls_flags", "single_file",
+            "-hls_segment_filename", os.path.join(base_output_dir, label, "index.ts"),
+        ]
+    return options + [os.path.join(base_output_dir, label, "index.m3u8")]
+
+
+def parse_media_playlist(playlist_path, byteranges=False):
+    """
+    Reads the segments of an HLS media playlist.
+
+    Args:
+        playlist_path (str): Path to a rendition's `index.m3u8`.
+        byteranges (bool): Also return the `EXT-X-BYTERANGE` of every segment.
+
+    Returns:
+        list: One `(duration, uri)` tuple per segment, in playlist order. With
+        `byteranges`, one `(duration, uri, offset, length)` tuple instead;
+        offset and length are None for segments stored in their own file.
+    """
+    segments = []
+    duration = None
+    byterange = None
+    next_offset = {}
+    with open(playlist_path, encoding="utf-8") as playlist:
+        for line in playlist:
+            line = line.strip()
+            if line.startswith("#EXTINF:"):
+                duration = float(line[len("#EXTINF:"):].split(",")[0])
+            elif line.startswith("#EXT-X-BYTERANGE:"):
+                length, _, offset = line[len("#EXT-X-BYTERANGE:"):].partition("@")
+                byterange = (int(offset) if offset else None, int(length))
+            elif line and not line.startswith("#") and duration is not None:
+                if not byteranges:
+                    segments.append((duration, line))
+                elif byterange is None:
+                    segments.append((duration, line, None, None))
+                else:
+                    offset, length = byterange
+                    if offset is None:
+                        offset = next_offset.get(line, 0)
+                    next_offset[line] = offset + length
+                    segments.append((duration, line, offset, length))
+                duration = None
+                byterange = None
+    return segments
+
+
+def probe_streams(media_path):
+    """
+    Reads codec, profile, level, resolution and frame rate of every stream in a media file.
+
+    Args:
+        media_path (str): Path to an encoded segment.
+
+    Returns:
+        list: One ffprobe stream dict per stream.
+    """
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "stream=codec_type,codec_name,profile,level,width,height,avg_frame_rate",
+        "-of", "json",
+        media_path,
+    ]
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    return json.loads(result.stdout).get("streams", [])
+
+
+def codecs_attribute(streams):
+    """
+    Builds the CODECS attribute of an EXT-X-STREAM-INF tag from probed streams.
+
+    Args:
+        streams (list): Stream dicts as returned by `probe_streams`.
+
+    Returns:
+        str: Comma separated RFC 6381 codec strings, e.g. "avc1.64001F,mp4a.40.2".
+    """
+    codecs = []
+    for stream in streams:
+        if stream.get("codec_name") == "h264":
+            profile = H264_PROFILE_CODES.get(stream.get("profile"), "4D40")
+            codecs.append(f"avc1.{profile}{int(stream.get('level') or 31):02X}")
+        elif stream.get("codec_name") == "aac":
+            codecs.append(AAC_PROFILE_CODES.get(stream.get("profile"), "mp4a.40.2"))
+    return ",".join(codecs)
+
+
+def measure_rendition(rendition_dir):
+    """
+    Measures an encoded rendition for its master playlist entry.
+
+    BANDWIDTH is the peak segment bitrate and AVERAGE-BANDWIDTH the mean
+    bitrate over the whole rendition, both computed from the segment sizes on
+    disk or, for single-file renditions, from their byte ranges. Resolution,
+    frame rate and codecs are probed from the first segment.
+
+    Args:
+        rendition_dir (str): Directory containing the rendition's `index.m3u8` and segments.
+
+    Returns:
+        dict: `bandwidth`, `average_bandwidth` (bit/s), `width`, `height`,
+        `frame_rate` and `codecs`. Resolution and frame rate are None for the
+        audio rendition.
+    """
+    segments = parse_media_playlist(os.path.join(rendition_dir, "index.m3u8"), byteranges=True)
+    peak_bitrate = 0
+    total_bits = 0
+    total_duration = 0.0
+    for duration, uri, _, length in segments:
+        if length is None:
+            length = os.path.getsize(os.path.join(rendition_dir, uri))
+        bits = length * 8
+        total_bits += bits
+        total_duration += duration
+        if duration > 0:
+            peak_bitrate = max(peak_bitrate, bits / duration)
+
+    streams = probe_streams(os.path.join(rendition_dir, segments[0][1]))
+    video = next((stream for stream in streams if stream.get("codec_type") == "video"), {})
+    return {
+        "bandwidth": int(peak_bitrate),
+        "average_bandwidth": int(total_bits / total_duration) if total_duration else int(peak_bitrate),
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "frame_rate": _parse_rate(video.get("avg_frame_rate")) if video else None,
+        "codecs": codecs_attribute(streams),
+    }
+
+
+def render_master_playlist(variants, audio=None):
+    """
+    Renders an HLS master playlist.
+
+    Variants are listed from lowest to highest bandwidth, so players start on
+    a low rung and switch up or down based on measured throughput.
+
+    With a shared audio rendition, it is declared once as an EXT-X-MEDIA audio
+    group that every variant references. Variant BANDWIDTH and CODECS then
+    include the audio rendition, as the HLS spec requires.
+
+    Args:
+        variants (dict): Mapping of rendition label to the result of `measure_rendition`.
+        audio (dict, optional): Result of `measure_rendition` for the audio rendition.
+
+    Returns:
+        str: The master playlist text.
+    """
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    if audio:
+        lines.append(
+            f'#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="{HLS_AUDIO_LABEL}",NAME="Default",'
+            f'DEFAULT=YES,AUTOSELECT=YES,URI="{HLS_AUDIO_LABEL}/index.m3u8"'
+        )
+    for label, variant in sorted(variants.items(), key=lambda item: item[1]["bandwidth"]):
+        bandwidth, average_bandwidth, codecs = variant["bandwidth"], variant["average_bandwidth"], variant["codecs"]
+        if audio:
+            bandwidth += audio["bandwidth"]
+            average_bandwidth += audio["average_bandwidth"]
+            codecs = ",".join(codec for codec in (codecs, audio["codecs"]) if codec)
+        attributes = [
+            f"BANDWIDTH={bandwidth}",
+            f"AVERAGE-BANDWIDTH={average_bandwidth}",
+            f"RESOLUTION={variant['width']}x{variant['height']}",
+        ]
+        if variant.get("frame_rate"):
+            attributes.append(f"FRAME-RATE={variant['frame_rate']:.3f}")
+        attributes.append(f'CODECS="{codecs}"')
+        if audio:
+            attributes.append(f'AUDIO="{HLS_AUDIO_LABEL}"')
+        lines.append("#EXT-X-STREAM-INF:" + ",".join(attributes))
+        lines.append(f"{label}/index.m3u8")
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def master_playlist_lock(base_output_dir):
+    """
+    Serialises writers of a video's master playlist.
+
+    Rendition and audio jobs of the same video may finish at the same time
+    on different workers. Holding this lock while reading which renditions
+    are ready and writing the playlist ensures that a writer with an older
+    view never replaces the playlist of a newer one. The lock is a hidden
+    file locked with `flock`, so it is released by the kernel if a worker
+    dies, and `link_tree` does not share it between duplicates.
+
+    Args:
+        base_output_dir (str): Directory of the video's HLS output.
+    """
+    os.makedirs(base_output_dir, exist_ok=True)
+    with open(os.path.join(base_output_dir, ".master.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def write_master_playlist(base_output_dir, labels):
+    """
+    Measures the given renditions and writes `<base_output_dir>/master.m3u8`.
+
+    The file is written to a temporary file of its own and moved into place,
+    so concurrent readers never see a partially written playlist and
+    concurrent writers never write into each other's file. Callers that
+    decide which renditions to list hold `master_playlist_lock`.
+
+    Args:
+        base_output_dir (str): Directory containing one subdirectory per rendition.
+        labels (list): Labels of the renditions to include, including
+            `HLS_AUDIO_LABEL` if the shared audio rendition should be referenced.
+
+    Returns:
+        str: Path of the written master playlist.
+    """
+    variants = {
+        label: measure_rendition(os.path.join(base_output_dir, label))
+        for label in labels if label != HLS_AUDIO_LABEL
+    }
+    audio = None
+    if HLS_AUDIO_LABEL in labels:
+        audio = measure_rendition(os.path.join(base_output_dir, HLS_AUDIO_LABEL))
+    master_path = os.path.join(base_output_dir, "master.m3u8")
+    fd, tmp_path = tempfile.mkstemp(prefix=".master-", suffix=".tmp", dir=base_output_dir)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as master:
+            os.fchmod(master.fileno(), 0o644)
+            master.write(render_master_playlist(variants, audio))
+        os.replace(tmp_path, master_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return master_path
+
+
+def probe_keyframes(input_path):
+    """
+    Reads the timestamps of all video keyframes of a source with ffprobe.
+
+    Only packet headers are read, so no frame is decoded.
+
+    Args:
+        input_path (str): Path to the source video file.
+
+    Returns:
+        list: Keyframe timestamps in seconds, ascending.
+    """
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        input_path,
+    ]
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    keyframes = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframes.append(float(pts_time))
+    return sorted(keyframes)
+
+
+def plan_chunks(keyframes, duration, chunk_duration, segment_duration=HLS_SEGMENT_DURATION):
+    """
+    Splits a source into GOP-aligned chunks for parallel encoding.
+
+    Every chunk boundary is snapped forward to the first source keyframe at or
+    after a multiple of `chunk_duration`, so each chunk can be decoded on its
+    own starting at a keyframe. A trailing chunk shorter than one segment is
+    merged into the previous one.
+
+    Args:
+        keyframes (list): Keyframe timestamps in seconds, as returned by `probe_keyframes`.
+        duration (float): Source duration in seconds.
+        chunk_duration (float): Target chunk length in seconds.
+        segment_duration (int): Segment length of the encoding profile in seconds.
+
+    Returns:
+        list: One `(start, duration)` tuple per chunk, covering the whole source.
+    """
+    boundaries = [0.0]
+    target = chunk_duration
+    for keyframe in keyframes:
+        if keyframe >= target and duration - keyframe >= segment_duration:
+            boundaries.append(keyframe)
+            target = keyframe + chunk_duration
+    boundaries.append(duration)
+    return [(start, end - start) for start, end in zip(boundaries, boundaries[1:])]
+
+
+def render_media_playlist(segments):
+    """
+    Renders an HLS VOD media playlist.
+
+    Args:
+        segments (list): One `(duration, uri)` tuple per segment, in playback
+            order, or `(duration, uri, offset, length)` for segments stored as
+            byte ranges of a single file.
+
+    Returns:
+        str: The media playlist text.
+    """
+    target_duration = math.ceil(max((segment[0] for segment in segments), default=HLS_SEGMENT_DURATION))
+    single_file = any(len(segment) == 4 and segment[3] is not None for segment in segments)
+    lines = [
+        "#EXTM3U",
+        # EXT-X-BYTERANGE requires protocol version 4.
+        "#EXT-X-VERSION:4" if single_file else "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{target_duration}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+    ]
+    for duration, uri, *byterange in segments:
+        lines.append(f"#EXTINF:{duration:.6f},")
+        if byterange and byterange[1] is not None:
+            lines.append(f"#EXT-X-BYTERANGE:{byterange[1]}@{byterange[0]}")
+        lines.append(uri)
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+def stitch_chunks(base_output_dir, label, chunk_count, output_dir=None):
+    """
+    Stitches the chunk outputs of one rendition into a continuous HLS playlist.
+
+    Segments of every chunk are hard-linked into `<base_output_dir>/<label>/`
+    and renumbered `index0.ts`, `index1.ts`, ... in playback order. The chunk
+    files are left in place, so stitching can safely be repeated after a
+    crash. Timestamps are continuous because every chunk was encoded with an
+    output offset equal to its start time and without any shift by the
+    encoder delay (see `build_hls_command`).
+
+    Single-file chunks are concatenated into one `index.ts` instead, and
+    their byte ranges are shifted by the size of the preceding chunks.
+
+    Args:
+        base_output_dir (str): Directory containing one subdirectory per rendition.
+        label (str): Rendition label.
+        chunk_count (int): Number of chunks in `<base_output_dir>/chunks/`.
+        output_dir (str, optional): Directory to write the rendition to;
+            `<base_output_dir>/<label>/` if omitted.
+
+    Returns:
+        list: The stitched `(duration, uri)` segments.
+    """
+    output_dir = output_dir or os.path.join(base_output_dir, label)
+    os.makedirs(output_dir, exist_ok=True)
+    segments = []
+    media_path = os.path.join(output_dir, "index.ts")
+    media_file = None
+    try:
+        for index in range(chunk_count):
+            chunk_dir = os.path.join(base_output_dir, "chunks", str(index), label)
+            chunk_segments = parse_media_playlist(os.path.join(chunk_dir, "index.m3u8"), byteranges=True)
+            if chunk_segments and chunk_segments[0][3] is not None:
+                if media_file is None:
+                    media_file = open(media_path + ".tmp", "wb")
+                base_offset = media_file.tell()
+                with open(os.path.join(chunk_dir, chunk_segments[0][1]), "rb") as chunk_file:
+                    shutil.copyfileobj(chunk_file, media_file, 1024 * 1024)
+                segments += [
+                    (duration, "index.ts", base_offset + offset, length)
+                    for duration, _, offset, length in chunk_segments
+                ]
+                continue
+            for duration, uri, _, _ in chunk_segments:
+                name = f"index{len(segments)}.ts"
+                link_file(os.path.join(chunk_dir, uri), os.path.join(output_dir, name))
+                segments.append((duration, name))
+    finally:
+        if media_file is not None:
+            media_file.close()
+    if media_file is not None:
+        os.replace(media_path + ".tmp", media_path)
+
+    playlist_path = os.path.join(output_dir, "index.m3u8")
+    with open(playlist_path + ".tmp", "w", encoding="utf-8") as playlist:
+        playlist.write(render_media_playlist(segments))
+    os.replace(playlist_path + ".tmp", playlist_path)
+    return segments
+
+
+def pick_thumbnail_time(duration):
+    """
+    Chooses the timestamp to take a thumbnail from.
+
+    Skips the first 10% of the video (usually black frames, logos or
+    titles) but never seeks further than 60 seconds in, and leaves room for
+    the candidate frames before the end of short clips.
+
+    Args:
+        duration (float): Source duration in seconds, 0 if unknown.
+
+    Returns:
+        float: Timestamp in seconds.
+    """
+    if duration <= 0:
+        return 0.0
+    return round(max(0.0, min(duration * 0.1, 60.0, duration - 2.0)), 3)
+
+
+def build_thumbnail_command(input_path, output_path, timestamp, threads=None):
+    """
+    Builds the ffmpeg command that extracts a scaled thumbnail in one pass.
+
+    The seek is done on the input without accurate seeking, so ffmpeg jumps
+    to the keyframe at or before `timestamp` instead of decoding everything
+    up to it. The next `THUMBNAIL_CANDIDATES` frames are scaled down and the
+    `thumbnail` filter picks the most representative of them, so histograms
+    are computed on small frames. The amount of decoding is constant
+    regardless of the length of the source.
+
+    Args:
+        input_path (str): Path to the source video file.
+        output_path (str): Path of the JPEG to write.
+        timestamp (float): Seek position in seconds, as returned by `pick_thumbnail_time`.
+        threads (int, optional): Decoder and filter threads; ffmpeg's default if omitted.
+
+    Returns:
+        list: The ffmpeg argument list, ready for `subprocess.run`.
+    """
+    thread_options = ["-threads", str(threads), "-filter_threads", str(threads)] if threads else []
+    return [
+        "ffmpeg",
+        "-y",
+        *thread_options,
+        "-noaccurate_seek",
+        "-ss", f"{timestamp:.3f}",
+        "-i", input_path,
+        "-vf", f"scale='min({THUMBNAIL_WIDTH},iw)':-2,thumbnail={THUMBNAIL_CANDIDATES}",
+        "-frames:v", "1",
+        "-q:v", "3",
+        output_path,
+    ]
+
+
+def trickplay_tile_size(probe):
+    """
+    Computes the size of one trickplay tile, keeping the source aspect ratio.
+
+    Args:
+        probe (dict): Result of `probe_video`.
+
+    Returns:
+        tuple: `(width, height)` in pixels, both even.
+    """
+    height = max(2, round(TRICKPLAY_WIDTH * probe["height"] / probe["width"] / 2) * 2)
+    return TRICKPLAY_WIDTH, height
+
+
+def build_trickplay_command(input_path, output_dir, tile_width, tile_height, threads=None):
+    """
+    Builds the ffmpeg command that renders all trickplay sprite sheets in one pass.
+
+    The `fps` filter keeps one frame per `TRICKPLAY_INTERVAL`, which is scaled
+    to the tile size and packed by the `tile` filter into sprite sheets
+    written as `sprite0.jpg`, `sprite1.jpg`, ...
+
+    Args:
+        input_path (str): Path to the source video file.
+        output_dir (str): Directory that receives the sprite sheets.
+        tile_width (int): Tile width in pixels.
+        tile_height (int): Tile height in pixels.
+        threads (int, optional): Decoder and filter threads; ffmpeg's default if omitted.
+
+    Returns:
+        list: The ffmpeg argument list, ready for `subprocess.run`.
+    """
+    thread_options = ["-threads", str(threads), "-filter_threads", str(threads)] if threads else []
+    return [
+        "ffmpeg",
+        "-y",
+        *thread_options,
+        "-i", input_path,
+        "-an",
+        "-vf", f"fps=1/{TRICKPLAY_INTERVAL},scale={tile_width}:{tile_height},"
+               f"tile={TRICKPLAY_COLUMNS}x{TRICKPLAY_ROWS}",
+        "-q:v", "5",
+        "-start_number", "0",
+        os.path.join(output_dir, "sprite%d.jpg"),
+    ]
+
+
+def _vtt_timestamp(seconds):
+    """
+    Formats seconds as a WebVTT timestamp (HH:MM:SS.mmm).
+    """
+    milliseconds = round(seconds * 1000)
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+
+def render_trickplay_vtt(duration, tile_width, tile_height):
+    """
+    Renders the WebVTT track that maps time ranges to sprite sheet coordinates.
+
+    Every cue covers one `TRICKPLAY_INTERVAL` and points to its tile with a
+    media fragment, e.g. `sprite0.jpg#xywh=160,0,160,90`.
+
+    Args:
+        duration (float): Source duration in seconds.
+        tile_width (int): Tile width in pixels.
+        tile_height (int): Tile height in pixels.
+
+    Returns:
+        str: The WebVTT track text.
+    """
+    tiles_per_sprite = TRICKPLAY_COLUMNS * TRICKPLAY_ROWS
+    lines = ["WEBVTT", ""]
+    for index in range(max(1, math.ceil(duration / TRICKPLAY_INTERVAL))):
+        start = index * TRICKPLAY_INTERVAL
+        end = min(start + TRICKPLAY_INTERVAL, duration) if duration > start else start + TRICKPLAY_INTERVAL
+        sprite, position = divmod(index, tiles_per_sprite)
+        row, column = divmod(position, TRICKPLAY_COLUMNS)
+        lines.append(f"{_vtt_timestamp(start)} --> {_vtt_timestamp(end)}")
+        lines.append(f"sprite{sprite}.jpg#xywh={column * tile_width},{row * tile_height},{tile_width},{tile_height}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def build_test_source_command(output_path, width, height, duration, fps=25):
+    """
+    Builds the ffmpeg command that renders a synthetic test source.
+
+    Video comes from the `testsrc2` pattern and audio from a `sine` tone,
+    both generated by ffmpeg's `lavfi` device, so no sample media is needed.
+    All encoder settings are fixed and metadata is stripped, so the same
+    ffmpeg build always produces the same source.
+
+    Args:
+        output_path (str): Path of the MP4 to write.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        duration (float): Length in seconds.
+        fps (int): Frame rate.
+
+    Returns:
+        list: The ffmpeg argument list, ready for `subprocess.run`.
+    """
+    return [
+        "ffmpeg",
+        "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:beep_factor=4:sample_rate=48000:duration={duration}",
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-crf", "18",
+        "-g", str(fps * 2),
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac",
+        "-b:a", "192k",
+        "-map_metadata", "-1",
+        "-fflags", "+bitexact",
+        "-movflags", "+faststart",
+        output_path,
+    ]
+
+
+def hash_file(path, block_size=1024 * 1024):
+    """
+    Computes the SHA-256 of a file in a single streaming pass.
+
+    Args:
+        path (str): Path to the file.
+        block_size (int): Number of bytes read at a time.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def link_file(src, dst):
+    """
+    Makes `dst` a hard link to `src`, falling back to a copy across filesystems.
+
+    The link is created next to `dst` and moved into place, so an existing
+    `dst` is replaced atomically.
+
+    Args:
+        src (str): Existing file.
+        dst (str): Path of the link to create.
+    """
+    tmp = dst + ".link"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def link_tree(src_dir, dst_dir, exclude=("chunks",)):
+    """
+    Recreates a directory tree under `dst_dir` with every file hard-linked from `src_dir`.
+
+    The linked files are shared, so they must never be written to again;
+    encoders write into a staging directory instead, which
+    `move_into_place` publishes as new files.
+
+    Args:
+        src_dir (str): Existing directory.
+        dst_dir (str): Directory to create or fill.
+        exclude (tuple): Subdirectory names that are skipped, in addition to
+            hidden ones such as staging directories. Hidden files, such as
+            lock files, and temporary files are skipped as well.
+    """
+    for root, dirs, files in os.walk(src_dir):
+        dirs[:] = [name for name in dirs if name not in exclude and not name.startswith(".")]
+        target = os.path.join(dst_dir, os.path.relpath(root, src_dir))
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            if not name.endswith(".tmp") and not name.startswith("."):
+                link_file(os.path.join(root, name), os.path.join(target, name))
+
+
+def move_into_place(staging_dir, target_dir):
+    """
+    Publishes freshly encoded files from `staging_dir` in `target_dir`.
+
+    ffmpeg truncates and rewrites existing output files, which would change
+    every other video sharing them through hard links (see `link_tree`) and
+    the bytes under a segment URL while it is being served. Encoders
+    therefore write into a staging directory, and every file is moved into
+    place with `os.replace`, so it replaces the old name with a new inode and
+    the old file is never written to. Playlists are moved last, so they only
+    reference files that are already in place. Files of the previous encode
+    that the new one does not have are removed.
+
+    Args:
+        staging_dir (str): Directory the files were encoded into; removed afterwards.
+        target_dir (str): Directory to publish the files in.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    names = sorted(os.listdir(staging_dir), key=lambda name: (name.endswith(".m3u8"), name.endswith(".json"), name))
+    for name in names:
+        os.replace(os.path.join(staging_dir, name), os.path.join(target_dir, name))
+    for name in set(os.listdir(target_dir)) - set(names):
+        path = os.path.join(target_dir, name)
+        if os.path.isfile(path):
+            os.remove(path)
+    os.rmdir(staging_dir)
@@ -1,20 +1,69 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from video_app.models import Video
-from .serializers import VideoSerializer
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from django.db.models import Exists, OuterRef, Prefetch, Q
+from video_app.models import Video, VideoRendition, VideoUpload
+from .serializers import VideoSerializer, VideoUploadSerializer
+from .progress import describe_progress
+from .manifests import amanifest_response, manifest_response
+from .segment_index import SINGLE_FILE_NAME, check_segment_version, find_segment, segment_indexes
+from .segments import amedia_file_response, media_file_response
+from .signing import SignedSegmentAuthentication, rendition_url, sign_segment_urls
+from .utils import HLS_AUDIO_LABEL
+from .uploads import (
+    TUS_CHECKSUM_ALGORITHMS, TUS_EXTENSIONS, TUS_VERSION, UploadError, append_chunk, complete_upload,
+    create_upload_file, delete_upload, parse_upload_checksum, parse_upload_metadata,
+)
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from django.http import FileResponse
 from django.conf import settings
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views import View
+from auth_app.api.authentication import CookieJWTAuthentication
+import asyncio
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Trickplay files only change when a video is re-encoded, so clients may keep them for a week.
+TRICKPLAY_CACHE_CONTROL = "private, max-age=604800"
+
+# Segment URLs carry the version of their playlist and requests for an older
+# version are rejected, so versioned segments can be cached for good.
+SEGMENT_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+# Unversioned segment URLs serve whatever the rendition currently holds, so
+# clients re-validate them with their ETag.
+UNVERSIONED_SEGMENT_CACHE_CONTROL = "private, no-cache"
+
+# Playlists change while renditions are added or re-encoded, so clients
+# re-validate them after a few seconds.
+MANIFEST_CACHE_CONTROL = "private, max-age=5"
+
+def segment_url_query(request):
+    """
+    Returns the query string that signs the segment URIs of a media playlist for the requesting user.
+
+    Args:
+        request (HttpRequest): The authenticated playlist request.
+
+    Returns:
+        str: The query string, empty if `SEGMENT_URL_MAX_AGE` is 0.
+    """
+    if not settings.SEGMENT_URL_MAX_AGE:
+        return ""
+    return sign_segment_urls(request.user.pk, rendition_url(request.path))
+
 class VideoListAPIView(APIView):
     """
-    API view that returns a list of all HLS-ready videos.
+    API view that returns a list of all playable videos.
+
+    A video is listed as soon as its first video rendition and its shared
+    audio rendition are ready, so viewers can start watching while higher
+    renditions are still being encoded.
 
     Permissions:
         - Only authenticated users can access this view.
@@ -26,7 +75,19 @@ class VideoListAPIView(APIView):
     
     def get(self, request):
         try:
-            videos = Video.objects.filter(hls_ready=True).order_by('-created_at')
+            ready_renditions = VideoRendition.objects.filter(state=VideoRendition.STATE_READY).exclude(label=HLS_AUDIO_LABEL)
+            video_ready = Exists(ready_renditions.filter(video=OuterRef('pk')))
+            audio_pending = Exists(
+                VideoRendition.objects
+                .filter(video=OuterRef('pk'), label=HLS_AUDIO_LABEL)
+                .exclude(state=VideoRendition.STATE_READY)
+            )
+            videos = (
+                Video.objects
+                .filter(Q(hls_ready=True) | (video_ready & ~audio_pending))
+                .prefetch_related(Prefetch('renditions', queryset=ready_renditions, to_attr='ready_renditions'))
+                .order_by('-created_at')
+            )
             serializer = VideoSerializer(videos, many=True, context={'request': request})
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Exception as e:
@@ -36,10 +97,41 @@ class VideoListAPIView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class VideoMasterPlaylistAPIView(APIView):
+    """
+    API view that serves the HLS master playlist (master.m3u8) for a specific video.
+
+    The master playlist lists every rendition with its measured bandwidth,
+    resolution and codecs, so players can pick and switch quality on their own.
+    It is served from the in-process manifest cache.
+
+    Permissions:
+        - Only authenticated users can access this view.
+
+    Methods:
+        get(request, movie_id): Returns the master playlist of the video.
+    """
+    permission_classes = [IsAuthenticated]
+    def get(self, request, movie_id):
+        manifest_path = os.path.join(settings.MEDIA_ROOT, "videos", str(movie_id), "master.m3u8")
+        try:
+            response = manifest_response(request, manifest_path)
+        except FileNotFoundError:
+            return Response("Video or Manifest not found", status=status.HTTP_404_NOT_FOUND)
+        response["Cache-Control"] = MANIFEST_CACHE_CONTROL
+        return response
+
 class VideoStreamAPIView(APIView):
     """
     API view that serves the HLS manifest (.m3u8) for a specific video.
 
+    Playlists are served from an in-process cache, gzip-compressed if the
+    client accepts it, with the playlist's version appended to every segment
+    URI. Responses carry a strong ETag and Last-Modified and may be cached for
+    a few seconds, so players re-validating the playlist get 304 while it is
+    unchanged. With `SEGMENT_URL_MAX_AGE`, segment URIs are also signed for the
+    requesting user, so segments are fetched without JWT or database lookups.
+
     Permissions:
         - Only authenticated users can access this view.
 
@@ -49,24 +141,382 @@ class VideoStreamAPIView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request, movie_id, resolution):
         manifest_path = os.path.join(settings.MEDIA_ROOT, "videos", str(movie_id), resolution, "index.m3u8")
-        if not os.path.exists(manifest_path):
+        try:
+            response = manifest_response(request, manifest_path, versioned=True, query=segment_url_query(request))
+        except FileNotFoundError:
             return Response("Video or Manifest not found", status=status.HTTP_404_NOT_FOUND)
-        return FileResponse(open(manifest_path, "rb"), content_type="application/vnd.apple.mpegurl")
+        response["Cache-Control"] = MANIFEST_CACHE_CONTROL
+        return response
     
 class VideoSegmentAPIView(APIView):
     """
     API view that serves individual HLS video segments (.ts) for a video.
 
+    Single-file renditions (`HLS_SINGLE_FILE`) address their segments as byte
+    ranges of one `index.ts`, which players fetch with a `Range` header. Such
+    requests are answered with 206 from a file descriptor that is kept open
+    across requests, so no stat or open is needed per segment. Multiple
+    ranges, ETag/Last-Modified revalidation (304) and `If-Range` are
+    supported as well. Segments are sent as immutable, since playlists
+    reference them with a version; requests for an older version than the
+    rendition's are answered with 404, so they never get the bytes of a
+    re-encode. The index's sizes and ETags are only used for the version it
+    describes; other requests stat the file. With `MEDIA_OFFLOAD`, every segment (and its
+    ranges) is sent by the front proxy instead. Signed segment URLs from the
+    media playlist are checked without touching the database; unsigned or
+    expired ones need a valid JWT. Segments are looked up by name in the
+    rendition's segment index, so names the playlist does not reference are
+    answered with 404 without touching the file system.
+
     Permissions:
         - Only authenticated users can access this view.
 
     Methods:
         get(request, movie_id, resolution, segment): Returns the requested video segment in the specified resolution.
     """
+    authentication_classes = [SignedSegmentAuthentication, CookieJWTAuthentication]
     permission_classes = [IsAuthenticated]
     def get(self, request, movie_id, resolution, segment):
-        segment_path = os.path.join(settings.MEDIA_ROOT, "videos", str(movie_id), resolution, segment)
-
-        if not os.path.exists(segment_path):
+        rendition_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(movie_id), resolution)
+        version = request.GET.get("v")
+        try:
+            index = segment_indexes.get(rendition_dir, version)
+            current = check_segment_version(index, version)
+            entry = find_segment(index, segment)
+            response = media_file_response(
+                request, entry.path, "video/MP2T", cached=current and segment == SINGLE_FILE_NAME,
+                entry=entry if current else None)
+        except FileNotFoundError:
             return Response("Video or Segment not found", status=status.HTTP_404_NOT_FOUND)
-        return FileResponse(open(segment_path, "rb"), content_type="video/MP2T")
\ No newline at end of file
+        response["Cache-Control"] = SEGMENT_CACHE_CONTROL if version else UNVERSIONED_SEGMENT_CACHE_CONTROL
+        return response
+
+class AsyncMediaAPIView(View):
+    """
+    Base class of the async playlist and segment views used under ASGI.
+
+    DRF views are synchronous, so under an ASGI server each request to them
+    holds a thread for its whole transfer. These plain Django async views
+    authenticate with `CookieJWTAuthentication.aauthenticate` and answer
+    like their DRF counterparts, including the 401 body and
+    `WWW-Authenticate` header of `IsAuthenticated`.
+
+    Permissions:
+        - Only authenticated users can access views derived from this class.
+    """
+    authentication_classes = [CookieJWTAuthentication]
+
+    async def dispatch(self, request, *args, **kwargs):
+        for authentication_class in self.authentication_classes:
+            try:
+                result = await authentication_class().aauthenticate(request)
+            except AuthenticationFailed as e:
+                return self.unauthorized(request, e.detail)
+            if result is not None:
+                request.user, request.auth = result
+                return await super().dispatch(request, *args, **kwargs)
+        return self.unauthorized(request, NotAuthenticated.default_detail)
+
+    def unauthorized(self, request, detail):
+        data = detail if isinstance(detail, dict) else {"detail": detail}
+        response = JsonResponse(data, status=status.HTTP_401_UNAUTHORIZED)
+        response["WWW-Authenticate"] = self.authentication_classes[0]().authenticate_header(request)
+        return response
+
+class AsyncVideoMasterPlaylistAPIView(AsyncMediaAPIView):
+    """
+    Async variant of `VideoMasterPlaylistAPIView`, used with `MEDIA_ASYNC_VIEWS`.
+
+    Permissions:
+        - Only authenticated users can access this view.
+
+    Methods:
+        get(request, movie_id): Returns the master playlist of the video.
+    """
+    async def get(self, request, movie_id):
+        manifest_path = os.path.join(settings.MEDIA_ROOT, "videos", str(movie_id), "master.m3u8")
+        try:
+            response = await amanifest_response(request, manifest_path)
+        except FileNotFoundError:
+            return JsonResponse("Video or Manifest not found", safe=False, status=status.HTTP_404_NOT_FOUND)
+        response["Cache-Control"] = MANIFEST_CACHE_CONTROL
+        return response
+
+class AsyncVideoStreamAPIView(AsyncMediaAPIView):
+    """
+    Async variant of `VideoStreamAPIView`, used with `MEDIA_ASYNC_VIEWS`.
+
+    Permissions:
+        - Only authenticated users can access this view.
+
+    Methods:
+        get(request, movie_id, resolution): Returns the HLS manifest file for the video in the requested resolution.
+    """
+    async def get(self, request, movie_id, resolution):
+        manifest_path = os.path.join(settings.MEDIA_ROOT, "videos", str(movie_id), resolution, "index.m3u8")
+        try:
+            response = await amanifest_response(request, manifest_path, versioned=True, query=segment_url_query(request))
+        except FileNotFoundError:
+            return JsonResponse("Video or Manifest not found", safe=False, status=status.HTTP_404_NOT_FOUND)
+        response["Cache-Control"] = MANIFEST_CACHE_CONTROL
+        return response
+
+class AsyncVideoSegmentAPIView(AsyncMediaAPIView):
+    """
+    Async variant of `VideoSegmentAPIView`, used with `MEDIA_ASYNC_VIEWS`.
+
+    Segments are read in worker threads and streamed to the client, so one
+    worker process serves many concurrent segment downloads. Signed segment
+    URLs are checked without touching the database.
+
+    Permissions:
+        - Only authenticated users can access this view.
+
+    Methods:
+        get(request, movie_id, resolution, segment): Returns the requested video segment in the specified resolution.
+    """
+    authentication_classes = [SignedSegmentAuthentication, CookieJWTAuthentication]
+
+    async def get(self, request, movie_id, resolution, segment):
+        rendition_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(movie_id), resolution)
+        version = request.GET.get("v")
+        try:
+            index = (segment_indexes.lookup(rendition_dir, version)
+                     or await asyncio.to_thread(segment_indexes.get, rendition_dir, version))
+            current = check_segment_version(index, version)
+            entry = find_segment(index, segment)
+            response = await amedia_file_response(
+                request, entry.path, "video/MP2T", cached=current and segment == SINGLE_FILE_NAME,
+                entry=entry if current else None)
+        except FileNotFoundError:
+            return JsonResponse("Video or Segment not found", safe=False, status=status.HTTP_404_NOT_FOUND)
+        response["Cache-Control"] = SEGMENT_CACHE_CONTROL if version else UNVERSIONED_SEGMENT_CACHE_CONTROL
+        return response
+
+class VideoTrickplayTrackAPIView(APIView):
+    """
+    API view that serves the WebVTT trickplay track (thumbnails.vtt) for a video.
+
+    Each cue maps a time range to a tile of a sprite sheet, which players use
+    to show scrubbing previews. Responses may be cached for a week.
+
+    Permissions:
+        - Only authenticated users can access this view.
+
+    Methods:
+        get(request, movie_id): Returns the WebVTT track of the video.
+    """
+    permission_classes = [IsAuthenticated]
+    def get(self, request, movie_id):
+        track_path = os.path.join(settings.MEDIA_ROOT, "videos", str(movie_id), "trickplay", "thumbnails.vtt")
+        try:
+            response = media_file_response(request, track_path, "text/vtt")
+        except FileNotFoundError:
+            return Response("Video or Trickplay track not found", status=status.HTTP_404_NOT_FOUND)
+        response["Cache-Control"] = TRICKPLAY_CACHE_CONTROL
+        return response
+
+class VideoTrickplaySpriteAPIView(APIView):
+    """
+    API view that serves a trickplay sprite sheet (sprite<index>.jpg) for a video.
+
+    Permissions:
+        - Only authenticated users can access this view.
+
+    Methods:
+        get(request, movie_id, index): Returns the requested sprite sheet. Responses may be cached for a week.
+    """
+    permission_classes = [IsAuthenticated]
+    def get(self, request, movie_id, index):
+        sprite_path = os.path.join(settings.MEDIA_ROOT, "videos", str(movie_id), "trickplay", f"sprite{index}.jpg")
+        try:
+            response = media_file_response(request, sprite_path, "image/jpeg")
+        except FileNotFoundError:
+            return Response("Video or Sprite not found", status=status.HTTP_404_NOT_FOUND)
+        response["Cache-Control"] = TRICKPLAY_CACHE_CONTROL
+        return response
+
+class VideoProgressAPIView(APIView):
+    """
+    API view that reports the live transcode progress of one or many videos.
+
+    Progress is read from the cache, where the transcode jobs store ffmpeg's
+    progress per rendition or chunk: percent done, encode speed as a realtime
+    factor, ETA in seconds and the time of the last update, which makes stuck
+    jobs visible.
+
+    Permissions:
+        - Only authenticated users can access this view.
+
+    Methods:
+        get(request, movie_id=None): Returns the progress of the given video, or
+            of the comma-separated video IDs in the `ids` query parameter.
+    """
+    permission_classes = [IsAuthenticated]
+    def get(self, request, movie_id=None):
+        videos = Video.objects.prefetch_related('renditions')
+        if movie_id is not None:
+            video = videos.filter(id=movie_id).first()
+            if video is None:
+                return Response("Video not found", status=status.HTTP_404_NOT_FOUND)
+            return Response(describe_progress(video), status=status.HTTP_200_OK)
+
+        try:
+            ids = [int(value) for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            return Response({"detail": "ids must be a comma-separated list of video IDs."}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({"detail": "ids is required."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response([describe_progress(video) for video in videos.filter(id__in=ids).order_by('id')], status=status.HTTP_200_OK)
+
+
+def tus_response(status_code=status.HTTP_204_NO_CONTENT, data=None, **headers):
+    """
+    Builds a response carrying the tus protocol headers.
+
+    Args:
+        status_code (int): HTTP status code.
+        data (optional): Response body.
+        **headers: Additional headers; underscores in names become dashes.
+
+    Returns:
+        Response: The response.
+    """
+    response = Response(data, status=status_code)
+    response["Tus-Resumable"] = TUS_VERSION
+    for name, value in headers.items():
+        response[name.replace("_", "-")] = str(value)
+    return response
+
+
+def tus_error(error):
+    """
+    Turns an `UploadError` into a tus response.
+    """
+    return tus_response(error.status, {"detail": error.detail})
+
+
+def check_tus_version(request):
+    """
+    Rejects requests for a tus protocol version this server does not speak.
+
+    Raises:
+        UploadError: With 412 if the Tus-Resumable header is missing or differs.
+    """
+    if request.headers.get("Tus-Resumable") != TUS_VERSION:
+        raise UploadError(status.HTTP_412_PRECONDITION_FAILED, f"Tus-Resumable must be {TUS_VERSION}.")
+
+class VideoUploadCreateAPIView(APIView):
+    """
+    API view that starts a resumable video upload (tus protocol, creation extension).
+
+    The client sends the total size in `Upload-Length` and the video's
+    `title`, `description`, `category`, optional `encoding_profile` and
+    `filename` in `Upload-Metadata`. The metadata is validated right away and
+    the upload URL is returned in `Location`.
+
+    Permissions:
+        - Only staff users can access this view.
+
+    Methods:
+        options(request): Returns the supported tus version, extensions and maximum size.
+        post(request): Creates the upload.
+    """
+    permission_classes = [IsAdminUser]
+
+    def options(self, request, *args, **kwargs):
+        return tus_response(
+            Tus_Version=TUS_VERSION,
+            Tus_Extension=TUS_EXTENSIONS,
+            Tus_Max_Size=settings.VIDEO_UPLOAD_MAX_SIZE,
+            Tus_Checksum_Algorithm=",".join(TUS_CHECKSUM_ALGORITHMS),
+        )
+
+    def post(self, request):
+        try:
+            check_tus_version(request)
+            length = request.headers.get("Upload-Length", "")
+            if not length.isdigit():
+                raise UploadError(status.HTTP_400_BAD_REQUEST, "Upload-Length is required.")
+            if int(length) > settings.VIDEO_UPLOAD_MAX_SIZE:
+                raise UploadError(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "Upload-Length exceeds Tus-Max-Size.")
+            metadata = parse_upload_metadata(request.headers.get("Upload-Metadata"))
+        except UploadError as error:
+            return tus_error(error)
+
+        serializer = VideoUploadSerializer(data=metadata)
+        if not serializer.is_valid():
+            return tus_response(status.HTTP_400_BAD_REQUEST, serializer.errors)
+        upload = VideoUpload.objects.create(
+            user_id=request.user.id,
+            length=int(length),
+            metadata={**serializer.validated_data, "filename": metadata.get("filename", "")},
+        )
+        create_upload_file(upload)
+        location = request.build_absolute_uri(reverse("video-upload", args=[upload.id]))
+        return tus_response(status.HTTP_201_CREATED, Location=location, Upload_Offset=0)
+
+class VideoUploadAPIView(APIView):
+    """
+    API view for a single resumable video upload (tus protocol).
+
+    Chunks are sent with PATCH as `application/offset+octet-stream` and must
+    start at the current `Upload-Offset`. The body is appended straight to
+    disk; an optional `Upload-Checksum` is verified and a mismatching chunk is
+    discarded with status 460. With the final chunk, the Video is created and
+    its processing starts; its ID is returned in `Upload-Video-Id`.
+
+    Permissions:
+        - Only staff users can access this view, and only for their own uploads.
+
+    Methods:
+        head(request, upload_id): Returns the current offset, so the client can resume.
+        patch(request, upload_id): Appends a chunk.
+        delete(request, upload_id): Cancels an unfinished upload.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get_upload(self, request, upload_id):
+        return VideoUpload.objects.filter(id=upload_id, user_id=request.user.id).first()
+
+    def head(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return tus_response(status.HTTP_404_NOT_FOUND)
+        headers = {"Upload_Offset": upload.offset, "Upload_Length": upload.length, "Cache_Control": "no-store"}
+        if upload.video_id:
+            headers["Upload_Video_Id"] = upload.video_id
+        return tus_response(status.HTTP_200_OK, **headers)
+
+    def patch(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return tus_response(status.HTTP_404_NOT_FOUND)
+        try:
+            check_tus_version(request)
+            if request.content_type != "application/offset+octet-stream":
+                raise UploadError(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, "Content-Type must be application/offset+octet-stream.")
+            if request.headers.get("Upload-Offset") != str(upload.offset):
+                raise UploadError(status.HTTP_409_CONFLICT, f"Upload-Offset must be {upload.offset}.")
+            if upload.video_id:
+                raise UploadError(status.HTTP_409_CONFLICT, "Upload is already complete.")
+            checksum = parse_upload_checksum(request.headers.get("Upload-Checksum"))
+            content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+            offset = append_chunk(upload, request.stream, content_length, checksum) if content_length else upload.offset
+            headers = {"Upload_Offset": offset}
+            if offset == upload.length:
+                video = complete_upload(upload)
+                headers["Upload_Video_Id"] = video.id
+                logger.info("✅ Upload %s abgeschlossen, Video %s erstellt", upload.id, video.id)
+        except UploadError as error:
+            return tus_error(error)
+        return tus_response(**headers)
+
+    def delete(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return tus_response(status.HTTP_404_NOT_FOUND)
+        if upload.video_id:
+            return tus_error(UploadError(status.HTTP_409_CONFLICT, "Upload is already complete."))
+        delete_upload(upload)
+        return tus_response()
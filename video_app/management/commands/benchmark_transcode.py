@@ -0,0 +1,289 @@
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from video_app.api.scheduler import THUMBNAIL_THREADS, available_cpus, encode_budget
+from video_app.api.utils import (
+    HLS_AUDIO_LABEL, build_audio_hls_command, build_hls_command, build_ladder, build_test_source_command,
+    build_thumbnail_command, build_trickplay_command, pick_thumbnail_time, resolve_encoding_profile,
+    trickplay_tile_size,
+)
+
+# "renditions" runs one encode per ladder rung like the `generate_hls_rendition`
+# jobs, "audio" the shared audio encode of `generate_hls_audio`.
+STAGES = ("thumbnail", "trickplay", "renditions", "audio")
+
+# Metrics compared against the baseline; lower is better for all of them.
+COMPARED_METRICS = ("wall_time", "cpu_time", "peak_rss_mb", "output_bytes")
+
+
+def run_measured(cmd):
+    """
+    Runs an ffmpeg command and measures the resources of the ffmpeg process.
+
+    The process is reaped with `os.wait4`, so CPU time and peak RSS are those
+    of this ffmpeg run alone, not of every child the command has started.
+
+    Args:
+        cmd (list): ffmpeg argument list, starting with "ffmpeg".
+
+    Returns:
+        dict: `wall_time` and `cpu_time` (seconds) and `peak_rss_mb`.
+
+    Raises:
+        CommandError: If ffmpeg exits with a non-zero status.
+    """
+    cmd = [cmd[0], "-v", "error", "-nostats"] + cmd[1:]
+    with tempfile.TemporaryFile() as errors:
+        started = time.monotonic()
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=errors)
+        _, status, usage = os.wait4(process.pid, 0)
+        wall_time = time.monotonic() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode != 0:
+            errors.seek(0)
+            raise CommandError(f"ffmpeg exited with {process.returncode}: {errors.read().decode(errors='replace').strip()}")
+    return {
+        "wall_time": round(wall_time, 3),
+        "cpu_time": round(usage.ru_utime + usage.ru_stime, 3),
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+    }
+
+
+def combine_runs(runs):
+    """
+    Adds up the measurements of commands that run one after another.
+
+    A stage with several jobs, such as one encode per rendition, is reported
+    as if its jobs ran back to back on one worker: wall and CPU times are
+    summed, peak RSS is the largest of all runs.
+
+    Args:
+        runs (list): Measurements as returned by `run_measured`.
+
+    Returns:
+        dict: `wall_time`, `cpu_time` and `peak_rss_mb` of the whole stage.
+    """
+    return {
+        "wall_time": round(sum(run["wall_time"] for run in runs), 3),
+        "cpu_time": round(sum(run["cpu_time"] for run in runs), 3),
+        "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+    }
+
+
+def directory_size(path):
+    """
+    Sums the size of all files below a directory.
+    """
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names
+    )
+
+
+def compare_to_baseline(report, baseline, threshold):
+    """
+    Compares a benchmark report with a stored baseline report.
+
+    Every result that has a counterpart (same case and stage) in the baseline
+    gets a `change` dict with the relative change of each compared metric in
+    percent.
+
+    Args:
+        report (dict): The current report; its results are updated in place.
+        baseline (dict): A report written by an earlier run.
+        threshold (float): Increase in percent from which a metric counts as regression.
+
+    Returns:
+        list: One description per regressed metric, e.g. "720p-10s hls cpu_time +14.2%".
+    """
+    previous = {(result["case"], result["stage"]): result for result in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        before = previous.get((result["case"], result["stage"]))
+        if before is None:
+            continue
+        result["change"] = {}
+        for metric in COMPARED_METRICS:
+            if not before.get(metric):
+                continue
+            change = round((result[metric] - before[metric]) / before[metric] * 100, 1)
+            result["change"][metric] = change
+            if change > threshold:
+                regressions.append(f"{result['case']} {result['stage']} {metric} {change:+.1f}%")
+    return regressions
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks the thumbnail, trickplay and HLS pipelines on synthetic sources.
+
+    Test sources are rendered with ffmpeg's `lavfi` device (`testsrc2` video
+    and a `sine` tone) for every combination of duration and resolution, so
+    the benchmark needs no sample media and no network. Each stage runs the
+    same ffmpeg commands its jobs build, with the configured encoding
+    profile, packaging mode and thread budget: one encode per rendition and
+    the shared audio encode, as `plan_hls` enqueues them. The database, Redis
+    and the queues are not involved.
+
+    Per case and stage, wall time, CPU time and peak RSS of ffmpeg, the size
+    of the output and the realtime factor (seconds of source per second of
+    wall time) are reported as JSON. With `--baseline`, the report is compared
+    with an earlier one and metrics that grew by more than `--threshold`
+    percent are listed as regressions. Run it on an otherwise idle machine.
+
+    Usage:
+        python manage.py benchmark_transcode --output baseline.json
+        python manage.py benchmark_transcode --baseline baseline.json --fail-on-regression
+        python manage.py benchmark_transcode --duration 30 --resolution 3840x2160 --stage renditions
+    """
+    help = "Benchmarks the transcode pipelines on synthetic lavfi sources and reports JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--duration", action="append", type=int, metavar="SECONDS",
+            help="Source duration; can be repeated (default: 10 and 60).",
+        )
+        parser.add_argument(
+            "--resolution", action="append", metavar="WIDTHxHEIGHT",
+            help="Source resolution; can be repeated (default: 1280x720 and 1920x1080).",
+        )
+        parser.add_argument(
+            "--stage", action="append", choices=STAGES,
+            help="Stage to run; can be repeated (default: all).",
+        )
+        parser.add_argument("--profile", help="Encoding profile (default: HLS_DEFAULT_PROFILE).")
+        parser.add_argument("--repeat", type=int, default=1, help="Runs per case and stage; the median run is reported.")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument("--baseline", help="JSON report of an earlier run to compare with.")
+        parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent (default: 10).")
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit with an error if a metric regressed.")
+        parser.add_argument("--work-dir", help="Keep sources and output in this directory instead of a temporary one.")
+
+    def handle(self, *args, **options):
+        profile_name = options["profile"] or settings.HLS_DEFAULT_PROFILE
+        try:
+            profile = resolve_encoding_profile(settings.HLS_ENCODING_PROFILES, profile_name)
+        except KeyError:
+            raise CommandError(f"Unknown encoding profile '{profile_name}'.")
+        resolutions = [self.parse_resolution(value) for value in options["resolution"] or ["1280x720", "1920x1080"]]
+        durations = options["duration"] or [10, 60]
+        stages = options["stage"] or list(STAGES)
+        baseline = self.load_baseline(options["baseline"]) if options["baseline"] else None
+
+        work_dir = options["work_dir"] or tempfile.mkdtemp(prefix="videoflix-benchmark-")
+        os.makedirs(work_dir, exist_ok=True)
+        threads = encode_budget()[1]
+        report = {
+            "environment": {
+                "ffmpeg": self.ffmpeg_version(),
+                "cpus": available_cpus(),
+                "threads": threads,
+                "profile": profile_name,
+                "single_file": settings.HLS_SINGLE_FILE,
+                "mobile_renditions": profile.get("mobile", settings.HLS_MOBILE_RENDITIONS),
+                "platform": platform.platform(),
+                "python": platform.python_version(),
+            },
+            "results": [],
+        }
+        try:
+            for width, height in resolutions:
+                for duration in durations:
+                    case = f"{height}p-{duration}s"
+                    source = os.path.join(work_dir, f"{case}.mp4")
+                    if not os.path.exists(source):
+                        self.stderr.write(f"Rendering source {case}")
+                        subprocess.run(
+                            build_test_source_command(source, width, height, duration),
+                            check=True, capture_output=True)
+                    probe = {
+                        "width": width, "height": height, "fps": 25.0, "duration": float(duration),
+                        "bitrate": 0, "audio": True,
+                    }
+                    for stage in stages:
+                        output_dir = os.path.join(work_dir, case, stage)
+                        runs = []
+                        for _ in range(max(1, options["repeat"])):
+                            shutil.rmtree(output_dir, ignore_errors=True)
+                            os.makedirs(output_dir)
+                            cmds = self.build_stage_commands(stage, source, output_dir, probe, profile, threads)
+                            run = combine_runs([run_measured(cmd) for cmd in cmds])
+                            run["output_bytes"] = directory_size(output_dir)
+                            runs.append(run)
+                        run = sorted(runs, key=lambda run: run["wall_time"])[len(runs) // 2]
+                        run["realtime_factor"] = round(duration / run["wall_time"], 2) if run["wall_time"] else None
+                        report["results"].append({
+                            "case": case, "stage": stage, "width": width, "height": height, "duration": duration,
+                            **run,
+                        })
+                        self.stderr.write(
+                            f"{case} {stage}: {run['wall_time']:.2f}s wall, {run['cpu_time']:.2f}s CPU, "
+                            f"{run['peak_rss_mb']} MB RSS, {run['output_bytes']} bytes, {run['realtime_factor']}x realtime")
+        finally:
+            if not options["work_dir"]:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        regressions = []
+        if baseline is not None:
+            for key in ("ffmpeg", "cpus", "threads", "profile", "single_file"):
+                if baseline.get("environment", {}).get(key) != report["environment"][key]:
+                    self.stderr.write(self.style.WARNING(
+                        f"Baseline was recorded with a different {key}: {baseline.get('environment', {}).get(key)!r}"))
+            regressions = compare_to_baseline(report, baseline, options["threshold"])
+            report["regressions"] = regressions
+            for regression in regressions:
+                self.stderr.write(self.style.ERROR(f"Regression: {regression}"))
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as report_file:
+                report_file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} metric(s) regressed by more than {options['threshold']}%.")
+
+    def build_stage_commands(self, stage, source, output_dir, probe, profile, threads):
+        """
+        Builds the ffmpeg commands the jobs of the given stage run for the source, in order.
+        """
+        if stage == "thumbnail":
+            return [build_thumbnail_command(
+                source, os.path.join(output_dir, "thumbnail.jpg"), pick_thumbnail_time(probe["duration"]),
+                THUMBNAIL_THREADS)]
+        if stage == "trickplay":
+            return [build_trickplay_command(source, output_dir, *trickplay_tile_size(probe), threads)]
+        if stage == "audio":
+            os.makedirs(os.path.join(output_dir, HLS_AUDIO_LABEL), exist_ok=True)
+            return [build_audio_hls_command(
+                source, output_dir, settings.HLS_SINGLE_FILE, profile["segment_duration"], threads)]
+        include_mobile = profile.get("mobile", settings.HLS_MOBILE_RENDITIONS)
+        cmds = []
+        for label, rendition in build_ladder(probe, include_mobile, profile).items():
+            os.makedirs(os.path.join(output_dir, label), exist_ok=True)
+            cmds.append(build_hls_command(
+                source, output_dir, {label: rendition}, single_file=settings.HLS_SINGLE_FILE, threads=threads))
+        return cmds
+
+    def parse_resolution(self, value):
+        width, _, height = value.lower().partition("x")
+        if not (width.isdigit() and height.isdigit()) or int(width) % 2 or int(height) % 2:
+            raise CommandError(f"Invalid resolution '{value}'. Expected even WIDTHxHEIGHT, e.g. 1280x720.")
+        return int(width), int(height)
+
+    def load_baseline(self, path):
+        try:
+            with open(path, encoding="utf-8") as baseline:
+                return json.load(baseline)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read baseline '{path}': {e}")
+
+    def ffmpeg_version(self):
+        result = subprocess.run(["ffmpeg", "-version"], check=True, capture_output=True, text=True)
+        return result.stdout.splitlines()[0]
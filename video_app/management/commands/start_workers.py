@@ -0,0 +1,71 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Starts and supervises the RQ worker pools configured in `RQ_WORKER_POOLS`.
+
+    Every pool starts `count` workers that listen to the pool's queues in
+    order, so the first queue has priority. Workers run with the RQ
+    scheduler, which re-enqueues failed jobs after their retry interval.
+    Workers that exit unexpectedly are restarted. SIGTERM/SIGINT are forwarded to all workers, which then
+    finish their current job before shutting down.
+
+    Usage:
+        python manage.py start_workers
+        python manage.py start_workers --pool transcode=6 --pool emails=2
+    """
+    help = "Starts the configured number of RQ workers for every worker pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pool",
+            action="append",
+            default=[],
+            metavar="NAME=COUNT",
+            help="Override the number of workers of a pool, e.g. --pool transcode=6.",
+        )
+
+    def handle(self, *args, **options):
+        pools = {name: dict(pool) for name, pool in settings.RQ_WORKER_POOLS.items()}
+        for override in options["pool"]:
+            name, _, count = override.partition("=")
+            if name not in pools or not count.isdigit():
+                raise CommandError(f"Invalid pool override '{override}'. Expected NAME=COUNT with NAME in {', '.join(pools)}.")
+            pools[name]["count"] = int(count)
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        workers = []
+        for name, pool in pools.items():
+            for _ in range(pool["count"]):
+                workers.append([pool["queues"], self.start_worker(pool["queues"])])
+            self.stdout.write(f"Started {pool['count']} worker(s) for pool '{name}' on queues {', '.join(pool['queues'])}")
+
+        while not self.stopping:
+            for worker in workers:
+                if worker[1].poll() is not None and not self.stopping:
+                    self.stderr.write(f"Worker on {', '.join(worker[0])} exited with {worker[1].returncode}, restarting")
+                    worker[1] = self.start_worker(worker[0])
+            time.sleep(1)
+
+        for _, process in workers:
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        for _, process in workers:
+            process.wait()
+
+    def start_worker(self, queues):
+        manage_py = os.path.join(settings.BASE_DIR, "manage.py")
+        return subprocess.Popen([sys.executable, manage_py, "rqworker", "--with-scheduler", *queues])
+
+    def stop(self, signum, frame):
+        self.stopping = True
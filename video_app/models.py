@@ -1,7 +1,15 @@
+import uuid
+from django.conf import settings
 from django.db import models
 
 # Create your models here.
 
+def encoding_profile_choices():
+    """
+    Returns the names of the encoding profiles configured in `HLS_ENCODING_PROFILES`.
+    """
+    return [(name, name) for name in settings.HLS_ENCODING_PROFILES]
+
 class Video(models.Model):
     """
     Represents a video uploaded to the platform.
@@ -13,7 +21,10 @@ class Video(models.Model):
         thumbnail (File, optional): Thumbnail image for the video.
         category (str): Video category. Choices are Drama, Romance, Action, Comedy, Documentary.
         created_at (datetime): Timestamp when the video was created.
-        hls_ready (bool): Indicates if HLS streaming files have been generated.
+        hls_ready (bool): Indicates if all HLS renditions and the master playlist have been generated.
+        source_hash (str): SHA-256 of the uploaded file, used to reuse the output of identical uploads.
+        duration (float, optional): Probed duration of the source in seconds.
+        encoding_profile (str, optional): Name of the encoding profile; blank uses `HLS_DEFAULT_PROFILE`.
 
     Methods:
         __str__(): Returns a string representation of the video including title and primary key.
@@ -32,6 +43,94 @@ class Video(models.Model):
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
     hls_ready = models.BooleanField(default=False)
+    source_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    duration = models.FloatField(null=True, blank=True)
+    encoding_profile = models.CharField(max_length=50, blank=True, choices=encoding_profile_choices)
+
+    def __str__(self):
+        return f"{self.title} {self.pk}"
+
+class VideoRendition(models.Model):
+    """
+    Tracks the encoding state of a single HLS rendition of a video.
+
+    One row exists per rung of the video's encoding ladder, so every rendition
+    job updates only its own row and a video becomes playable as soon as its
+    first rendition is ready.
+
+    Fields:
+        video (Video): The video this rendition belongs to.
+        label (str): Rendition label, e.g. "720p".
+        width (int): Encoded frame width.
+        height (int): Encoded frame height.
+        state (str): Encoding state. Choices are pending, processing, ready, failed.
+        segment_count (int): Number of segments in the rendition's playlist.
+        encoding_profile (str): Name of the encoding profile the rendition is encoded with.
+        created_at (datetime): Timestamp when the rendition was planned.
+        started_at (datetime, optional): Timestamp when encoding started.
+        finished_at (datetime, optional): Timestamp when encoding finished or failed.
+
+    Methods:
+        __str__(): Returns a string representation including video, label and state.
+    """
+    STATE_PENDING = 'pending'
+    STATE_PROCESSING = 'processing'
+    STATE_READY = 'ready'
+    STATE_FAILED = 'failed'
+    STATE_CHOICES = [
+        (STATE_PENDING, 'Pending'),
+        (STATE_PROCESSING, 'Processing'),
+        (STATE_READY, 'Ready'),
+        (STATE_FAILED, 'Failed'),
+    ]
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='renditions')
+    label = models.CharField(max_length=20)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default=STATE_PENDING)
+    segment_count = models.PositiveIntegerField(default=0)
+    encoding_profile = models.CharField(max_length=50, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['video', 'label'], name='unique_video_rendition'),
+        ]
+
+    def __str__(self):
+        return f"{self.video} {self.label} {self.state}"
+
+class VideoUpload(models.Model):
+    """
+    Tracks a resumable, chunked upload of a video file.
+
+    Chunks are appended to `MEDIA_ROOT/uploads/<id>.part` as they arrive.
+    Once `offset` reaches `length`, the file is moved into `videos/` and the
+    Video is created from the stored metadata.
+
+    Fields:
+        id (UUID): Identifier used in the upload URL.
+        user (User): The user who started the upload.
+        length (int): Total size of the file in bytes.
+        offset (int): Number of bytes received so far.
+        metadata (dict): Validated Video fields (title, description, category, encoding_profile) and the filename.
+        video (Video, optional): The Video created once the upload is complete.
+        created_at (datetime): Timestamp when the upload was started.
+        updated_at (datetime): Timestamp when the last chunk was received.
+
+    Methods:
+        __str__(): Returns a string representation including the ID and progress.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='video_uploads')
+    length = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    metadata = models.JSONField(default=dict)
+    video = models.OneToOneField(Video, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.title} {self.pk}"
\ No newline at end of file
+        return f"{self.id} {self.offset}/{self.length}"
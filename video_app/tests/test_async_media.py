@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from video_app.api.manifests import manifests
+from video_app.api.segment_index import segment_indexes
+from video_app.api.segments import segment_files
+from video_app.api.views import AsyncVideoMasterPlaylistAPIView, AsyncVideoSegmentAPIView, AsyncVideoStreamAPIView
+
+
+class AsyncMediaViewTestCase(TestCase):
+    """
+    Test case for the async playlist and segment views used under ASGI.
+
+    This suite verifies:
+    - Requests without a token are rejected with 401 like the DRF views
+    - An access token from the cookie or the Authorization header is accepted
+    - Segments are streamed whole or as byte ranges, and revalidated with 304
+    - Media playlists are versioned and missing files answered with 404
+    - Only single-file renditions are kept open, and their file outlives eviction until the response is closed
+    """
+    def setUp(self):
+        """
+        Set up a temporary media root with a rendition and a user with an access token.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_OFFLOAD="")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(segment_files.clear)
+        self.addCleanup(segment_indexes.clear)
+        self.addCleanup(manifests.clear)
+
+        rendition_dir = os.path.join(self.media_root, "videos", "1", "720p")
+        os.makedirs(rendition_dir)
+        with open(os.path.join(rendition_dir, "index.m3u8"), "w") as playlist:
+            playlist.write("#EXTM3U\n#EXTINF:4.0,\nindex0.ts\n#EXT-X-ENDLIST\n")
+        with open(os.path.join(rendition_dir, "index0.ts"), "wb") as segment:
+            segment.write(b"0123456789")
+
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token = str(AccessToken.for_user(self.user))
+        self.factory = AsyncRequestFactory()
+
+    async def get_segment(self, headers=None, data=None):
+        """
+        Helper method to request the segment with the access token cookie.
+        """
+        request = self.factory.get("/api/video/1/720p/index0.ts/", data, headers=headers)
+        request.COOKIES["access_token"] = self.token
+        return await AsyncVideoSegmentAPIView.as_view()(request, movie_id=1, resolution="720p", segment="index0.ts")
+
+    async def read(self, response):
+        """
+        Helper method to read the body of a streaming response.
+        """
+        return b"".join([chunk async for chunk in response])
+
+    async def test_unauthenticated(self):
+        """
+        Test that requests without a token or with an invalid one get 401.
+        """
+        request = self.factory.get("/api/video/1/master.m3u8")
+        response = await AsyncVideoMasterPlaylistAPIView.as_view()(request, movie_id=1)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="api"')
+
+        request = self.factory.get("/api/video/1/master.m3u8")
+        request.COOKIES["access_token"] = "invalid"
+        response = await AsyncVideoMasterPlaylistAPIView.as_view()(request, movie_id=1)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_inactive_user(self):
+        """
+        Test that the token of a deactivated user is rejected.
+        """
+        await User.objects.filter(id=self.user.id).aupdate(is_active=False)
+        response = await self.get_segment()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_segment(self):
+        """
+        Test that a versioned segment is streamed whole with its validators and cache policy.
+        """
+        version = f"{os.stat(os.path.join(self.media_root, 'videos', '1', '720p', 'index.m3u8')).st_mtime_ns:x}"
+        response = await self.get_segment(data={"v": version})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(response["Cache-Control"], "private, max-age=31536000, immutable")
+        self.assertEqual(await self.read(response), b"0123456789")
+
+    async def test_segment_range_and_revalidation(self):
+        """
+        Test that byte ranges get 206 and a matching ETag gets 304.
+        """
+        response = await self.get_segment({"Range": "bytes=2-5"})
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(await self.read(response), b"2345")
+
+        response = await self.get_segment({"Range": "bytes=0-0,8-"})
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertTrue(response["Content-Type"].startswith("multipart/byteranges"))
+        body = await self.read(response)
+        self.assertEqual(len(body), int(response["Content-Length"]))
+
+        response = await self.get_segment({"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_header_token_and_versioned_playlist(self):
+        """
+        Test that a Bearer token is accepted and media playlists carry versioned segment URIs.
+        """
+        request = self.factory.get("/api/video/1/720p/index.m3u8", headers={"Authorization": f"Bearer {self.token}"})
+        response = await AsyncVideoStreamAPIView.as_view()(request, movie_id=1, resolution="720p")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response.content.decode(), r"\nindex0\.ts\?v=[0-9a-f]+&u=\d+&e=\d+&s=[0-9a-f]{32}\n")
+        self.assertEqual(response["Cache-Control"], "private, max-age=5")
+
+    async def test_not_found(self):
+        """
+        Test that missing playlists and segments are answered with 404.
+        """
+        request = self.factory.get("/api/video/2/master.m3u8")
+        request.COOKIES["access_token"] = self.token
+        response = await AsyncVideoMasterPlaylistAPIView.as_view()(request, movie_id=2)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        request = self.factory.get("/api/video/1/720p/index9.ts/")
+        request.COOKIES["access_token"] = self.token
+        response = await AsyncVideoSegmentAPIView.as_view()(request, movie_id=1, resolution="720p", segment="index9.ts")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_segment_files_are_not_cached(self):
+        """
+        Test that a per-segment file is opened for its request only and closed with the response.
+        """
+        fds = []
+        os_open = os.open
+        with mock.patch("os.open", side_effect=lambda *args: fds.append(os_open(*args)) or fds[-1]):
+            response = await self.get_segment()
+        self.assertFalse(segment_files._files)
+        fd, = fds
+        self.assertEqual(await self.read(response), b"0123456789")
+        response.close()
+        with self.assertRaises(OSError):
+            os.fstat(fd)
+
+    async def test_single_file_evicted_during_stream(self):
+        """
+        Test that the cached index.ts stays open for a response in flight after eviction, and is closed with it.
+        """
+        rendition_dir = os.path.join(self.media_root, "videos", "1", "480p")
+        os.makedirs(rendition_dir)
+        with open(os.path.join(rendition_dir, "index.m3u8"), "w") as playlist:
+            playlist.write("#EXTM3U\n#EXT-X-VERSION:4\n#EXTINF:4.0,\n#EXT-X-BYTERANGE:10@0\nindex.ts\n#EXT-X-ENDLIST\n")
+        with open(os.path.join(rendition_dir, "index.ts"), "wb") as media:
+            media.write(b"0123456789")
+
+        version = f"{os.stat(os.path.join(rendition_dir, 'index.m3u8')).st_mtime_ns:x}"
+        request = self.factory.get("/api/video/1/480p/index.ts/", {"v": version}, headers={"Range": "bytes=2-5"})
+        request.COOKIES["access_token"] = self.token
+        response = await AsyncVideoSegmentAPIView.as_view()(request, movie_id=1, resolution="480p", segment="index.ts")
+        (media, _), = segment_files._files.values()
+
+        segment_files.clear()
+        self.assertEqual(await self.read(response), b"2345")
+        os.fstat(media.fd)
+        response.close()
+        with self.assertRaises(OSError):
+            os.fstat(media.fd)
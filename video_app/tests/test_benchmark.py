@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+from video_app.api.scheduler import THUMBNAIL_THREADS
+from video_app.api.utils import (
+    build_audio_hls_command, build_hls_command, build_ladder, build_test_source_command, resolve_encoding_profile,
+)
+from video_app.management.commands.benchmark_transcode import Command, combine_runs, compare_to_baseline
+
+
+class TranscodeBenchmarkTestCase(SimpleTestCase):
+    """
+    Test case for the transcode benchmark command.
+
+    This suite verifies:
+    - Test sources are generated from lavfi video and audio sources
+    - Reports are compared with a baseline per case and stage
+    - Stages run the commands of the jobs production enqueues, one per rendition plus audio
+    - Invalid arguments are rejected before anything is encoded
+    """
+    def test_test_source_command(self):
+        """
+        Test that the source has the requested size and duration and carries audio.
+        """
+        cmd = build_test_source_command("/out/source.mp4", 1280, 720, 10)
+        self.assertEqual(cmd.count("lavfi"), 2)
+        self.assertIn("testsrc2=size=1280x720:rate=25:duration=10", cmd)
+        self.assertTrue(any(arg.startswith("sine=") and arg.endswith("duration=10") for arg in cmd))
+        self.assertEqual(cmd[-1], "/out/source.mp4")
+
+    def test_compare_to_baseline(self):
+        """
+        Test that relative changes are added and only increases above the threshold are regressions.
+        """
+        def result(stage, wall_time, cpu_time):
+            return {
+                "case": "720p-10s", "stage": stage, "wall_time": wall_time, "cpu_time": cpu_time,
+                "peak_rss_mb": 100.0, "output_bytes": 1000,
+            }
+
+        baseline = {"results": [result("hls", 10.0, 20.0), result("thumbnail", 1.0, 1.0)]}
+        report = {"results": [result("hls", 12.0, 19.0), result("thumbnail", 1.05, 1.0), result("trickplay", 1.0, 1.0)]}
+        regressions = compare_to_baseline(report, baseline, 10.0)
+        self.assertEqual(regressions, ["720p-10s hls wall_time +20.0%"])
+        self.assertEqual(report["results"][0]["change"]["cpu_time"], -5.0)
+        self.assertNotIn("change", report["results"][2])
+
+    def test_invalid_arguments(self):
+        """
+        Test that unknown profiles and odd resolutions are rejected.
+        """
+        with self.assertRaises(CommandError):
+            call_command("benchmark_transcode", profile="missing")
+        with self.assertRaises(CommandError):
+            call_command("benchmark_transcode", resolution=["1281x720"])
+
+    def test_stage_commands(self):
+        """
+        Test that stages build the per-rendition, audio and thumbnail commands of their jobs.
+        """
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        profile = resolve_encoding_profile(settings.HLS_ENCODING_PROFILES, settings.HLS_DEFAULT_PROFILE)
+        probe = {"width": 1280, "height": 720, "fps": 25.0, "duration": 10.0, "bitrate": 0, "audio": True}
+        ladder = build_ladder(probe, profile.get("mobile", settings.HLS_MOBILE_RENDITIONS), profile)
+        command = Command()
+
+        cmds = command.build_stage_commands("renditions", "/in.mp4", output_dir, probe, profile, 3)
+        self.assertEqual(cmds, [
+            build_hls_command("/in.mp4", output_dir, {label: rendition}, single_file=settings.HLS_SINGLE_FILE, threads=3)
+            for label, rendition in ladder.items()
+        ])
+        cmds = command.build_stage_commands("audio", "/in.mp4", output_dir, probe, profile, 3)
+        self.assertEqual(cmds, [
+            build_audio_hls_command("/in.mp4", output_dir, settings.HLS_SINGLE_FILE, profile["segment_duration"], 3)])
+        cmd, = command.build_stage_commands("thumbnail", "/in.mp4", output_dir, probe, profile, 3)
+        self.assertEqual(cmd[cmd.index("-threads") + 1], str(THUMBNAIL_THREADS))
+
+    def test_combine_runs(self):
+        """
+        Test that the runs of a stage's jobs are summed, with the largest peak RSS.
+        """
+        runs = [
+            {"wall_time": 1.0, "cpu_time": 2.0, "peak_rss_mb": 50.0},
+            {"wall_time": 0.5, "cpu_time": 1.5, "peak_rss_mb": 80.0},
+        ]
+        self.assertEqual(combine_runs(runs), {"wall_time": 1.5, "cpu_time": 3.5, "peak_rss_mb": 80.0})
@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest import mock
+from django.test import TestCase, override_settings
+from video_app.api.tasks import generate_hls_chunk, generate_hls_rendition, plan_renditions
+from video_app.models import Video, VideoRendition
+
+class TranscodeCheckpointTestCase(TestCase):
+    """
+    Test case for resumable, checkpointed transcoding.
+
+    This suite verifies:
+    - Ready renditions survive re-planning and are not encoded again
+    - Completed chunks with a matching checkpoint are skipped, others are encoded again
+    - Failures are re-raised and recorded on the rendition, without a checkpoint
+    """
+    def setUp(self):
+        """
+        Set up a temporary media root and a video with a planned ladder.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.video = Video.objects.create(title="Test", description="Test video", category="Drama")
+        Video.objects.filter(id=self.video.id).update(video_file="videos/missing.mp4")
+        self.video.refresh_from_db()
+        self.ladder = {
+            "480p": {"width": 854, "height": 480, "maxrate": 1400, "gop": 125},
+            "720p": {"width": 1280, "height": 720, "maxrate": 2800, "gop": 125},
+        }
+        plan_renditions(self.video, self.ladder)
+        self.base_output_dir = os.path.join(self.media_root, "videos", str(self.video.id))
+
+        ffmpeg = mock.patch("video_app.api.tasks.run_ffmpeg_with_progress", side_effect=self.encode)
+        self.ffmpeg = ffmpeg.start()
+        self.addCleanup(ffmpeg.stop)
+        master = mock.patch("video_app.api.tasks.write_partial_master_playlist")
+        master.start()
+        self.addCleanup(master.stop)
+        self.failing = False
+
+    def encode(self, cmd, *args):
+        """
+        Helper method standing in for ffmpeg: writes a playlist to every output, or fails if `self.failing`.
+        """
+        if self.failing:
+            raise subprocess.CalledProcessError(1, cmd)
+        for playlist_path in (arg for arg in cmd if arg.endswith("index.m3u8")):
+            with open(playlist_path, "w") as playlist:
+                playlist.write("#EXTM3U\n#EXT-X-ENDLIST\n")
+
+    def finish_rendition(self, label):
+        """
+        Helper method to record a rendition as encoded, with its playlist on disk.
+        """
+        os.makedirs(os.path.join(self.base_output_dir, label))
+        with open(os.path.join(self.base_output_dir, label, "index.m3u8"), "w") as playlist:
+            playlist.write("#EXTM3U\n#EXTINF:5.0,\nindex0.ts\n#EXT-X-ENDLIST\n")
+        self.video.renditions.filter(label=label).update(state=VideoRendition.STATE_READY, segment_count=1)
+
+    def test_replanning_keeps_ready_renditions(self):
+        """
+        Test that planning again only resets renditions that are not ready yet.
+        """
+        self.finish_rendition("480p")
+        self.video.renditions.filter(label="720p").update(state=VideoRendition.STATE_FAILED)
+        plan_renditions(self.video, self.ladder)
+        self.assertEqual(self.video.renditions.get(label="480p").state, VideoRendition.STATE_READY)
+        self.assertEqual(self.video.renditions.get(label="720p").state, VideoRendition.STATE_PENDING)
+
+    def test_ready_rendition_is_skipped(self):
+        """
+        Test that a retried rendition job returns without encoding when the rendition is ready.
+        """
+        self.finish_rendition("480p")
+        generate_hls_rendition(self.video.id, "480p", self.ladder["480p"])
+        self.ffmpeg.assert_not_called()
+        self.assertEqual(self.video.renditions.get(label="480p").state, VideoRendition.STATE_READY)
+
+        generate_hls_rendition(self.video.id, "720p", self.ladder["720p"])
+        self.ffmpeg.assert_called_once()
+        self.assertEqual(self.video.renditions.get(label="720p").state, VideoRendition.STATE_READY)
+
+    def test_failed_rendition_is_reraised(self):
+        """
+        Test that an encoding failure is raised to RQ and recorded on the rendition.
+        """
+        self.finish_rendition("480p")
+        self.failing = True
+        with self.assertRaises(subprocess.CalledProcessError):
+            generate_hls_rendition(self.video.id, "720p", self.ladder["720p"])
+        rendition = self.video.renditions.get(label="720p")
+        self.assertEqual(rendition.state, VideoRendition.STATE_FAILED)
+        self.assertIsNotNone(rendition.finished_at)
+        self.assertFalse(os.path.exists(os.path.join(self.base_output_dir, "720p", "index.m3u8")))
+        self.assertEqual(self.video.renditions.get(label="480p").state, VideoRendition.STATE_READY)
+
+    def test_completed_chunk_is_skipped(self):
+        """
+        Test that a chunk with a matching checkpoint is not encoded again.
+        """
+        chunk_dir = os.path.join(self.base_output_dir, "chunks", "0")
+        os.makedirs(chunk_dir)
+        with open(os.path.join(chunk_dir, "checkpoint.json"), "w") as checkpoint:
+            json.dump({"start": 0.0, "duration": 120.0, "labels": ["480p", "720p"]}, checkpoint)
+        generate_hls_chunk(self.video.id, 0, 0.0, 120.0, self.ladder)
+        self.ffmpeg.assert_not_called()
+
+        generate_hls_chunk(self.video.id, 0, 0.0, 90.0, self.ladder)
+        self.ffmpeg.assert_called_once()
+        with open(os.path.join(chunk_dir, "checkpoint.json")) as checkpoint:
+            self.assertEqual(json.load(checkpoint), {"start": 0.0, "duration": 90.0, "labels": ["480p", "720p"]})
+
+    def test_failed_chunk_has_no_checkpoint(self):
+        """
+        Test that a failed chunk is re-raised without writing a checkpoint, so its retry encodes it again.
+        """
+        self.failing = True
+        with self.assertRaises(subprocess.CalledProcessError):
+            generate_hls_chunk(self.video.id, 1, 120.0, 120.0, self.ladder)
+        self.assertFalse(os.path.exists(os.path.join(self.base_output_dir, "chunks", "1", "checkpoint.json")))
+        self.assertEqual(
+            set(self.video.renditions.values_list("state", flat=True)), {VideoRendition.STATE_FAILED})
+
+        self.failing = False
+        generate_hls_chunk(self.video.id, 1, 120.0, 120.0, self.ladder)
+        self.assertEqual(self.ffmpeg.call_count, 2)
+        self.assertTrue(os.path.exists(os.path.join(self.base_output_dir, "chunks", "1", "checkpoint.json")))
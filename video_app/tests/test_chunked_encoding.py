@@ -0,0 +1,123 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest import skipUnless
+from django.test import SimpleTestCase
+from video_app.api.utils import (
+    build_hls_command, build_test_source_command, parse_media_playlist, plan_chunks, stitch_chunks,
+)
+
+
+def read_pts(path):
+    """
+    Reads the presentation timestamp of every PES packet in an MPEG-TS file.
+
+    Returns:
+        list: Timestamps in seconds, sorted.
+    """
+    with open(path, "rb") as ts_file:
+        data = ts_file.read()
+    timestamps = []
+    for position in range(0, len(data) - 187, 188):
+        packet = data[position:position + 188]
+        if packet[0] != 0x47 or not packet[1] & 0x40 or not packet[3] & 0x10:
+            continue
+        payload = packet[5 + packet[4]:] if packet[3] & 0x20 else packet[4:]
+        if payload[:3] != b"\x00\x00\x01" or len(payload) < 14 or not payload[7] & 0x80:
+            continue
+        pts = payload[9:14]
+        timestamps.append((
+            (pts[0] >> 1 & 7) << 30 | pts[1] << 22 | (pts[2] >> 1) << 15 | pts[3] << 7 | pts[4] >> 1
+        ) / 90000)
+    return sorted(timestamps)
+
+class ChunkedEncodingTestCase(SimpleTestCase):
+    """
+    Test case for the split-encode-stitch transcoding helpers.
+
+    This suite verifies:
+    - Chunk boundaries are snapped to source keyframes
+    - Short trailing chunks are merged into the previous chunk
+    - Chunk commands seek on the input and offset output timestamps
+    - Stitched playlists are renumbered continuously across chunks
+    - Stitched chunks have the timestamps of an encode in one run
+    """
+    def test_chunks_snap_to_keyframes(self):
+        """
+        Test that chunk boundaries start at the first keyframe after each target.
+        """
+        keyframes = [0.0, 4.2, 8.4, 10.5, 16.8, 21.0, 25.2]
+        self.assertEqual(plan_chunks(keyframes, 30.0, 10), [(0.0, 10.5), (10.5, 10.5), (21.0, 9.0)])
+
+    def test_short_tail_is_merged(self):
+        """
+        Test that no chunk shorter than one segment is created at the end.
+        """
+        keyframes = [float(t) for t in range(0, 23, 2)]
+        self.assertEqual(plan_chunks(keyframes, 23.0, 10), [(0.0, 10.0), (10.0, 13.0)])
+
+    def test_chunk_command(self):
+        """
+        Test that a chunk command seeks on the input and shifts output timestamps by the chunk start.
+        """
+        ladder = {"480p": {"width": 854, "height": 480, "maxrate": 1400, "gop": 125}}
+        cmd = build_hls_command("/in.mp4", "/out", ladder, start=120.0, duration=60.5)
+        self.assertLess(cmd.index("-ss"), cmd.index("-i"))
+        self.assertEqual(cmd[cmd.index("-ss") + 1], "120.000")
+        self.assertEqual(cmd[cmd.index("-t") + 1], "60.500")
+        self.assertEqual(cmd[cmd.index("-output_ts_offset") + 1], "120.000")
+
+    def test_stitch_chunks(self):
+        """
+        Test that segments of all chunks are moved and renumbered into one playlist.
+        """
+        with tempfile.TemporaryDirectory() as base:
+            for index, durations in enumerate([(5.0, 5.0, 0.5), (5.0, 4.0)]):
+                chunk_dir = os.path.join(base, "chunks", str(index), "720p")
+                os.makedirs(chunk_dir)
+                with open(os.path.join(chunk_dir, "index.m3u8"), "w") as playlist:
+                    playlist.write("#EXTM3U\n")
+                    for number, duration in enumerate(durations):
+                        playlist.write(f"#EXTINF:{duration},\nindex{number}.ts\n")
+                        with open(os.path.join(chunk_dir, f"index{number}.ts"), "w") as segment:
+                            segment.write(f"{index}-{number}")
+                    playlist.write("#EXT-X-ENDLIST\n")
+
+            stitch_chunks(base, "720p", 2)
+
+            output_dir = os.path.join(base, "720p")
+            segments = parse_media_playlist(os.path.join(output_dir, "index.m3u8"))
+            self.assertEqual([uri for _, uri in segments], [f"index{n}.ts" for n in range(5)])
+            self.assertEqual([duration for duration, _ in segments], [5.0, 5.0, 0.5, 5.0, 4.0])
+            with open(os.path.join(output_dir, "index3.ts")) as segment:
+                self.assertEqual(segment.read(), "1-0")
+
+    @skipUnless(shutil.which("ffmpeg"), "ffmpeg is not installed")
+    def test_timestamps_across_chunks(self):
+        """
+        Test that timestamps run on without a gap or overlap across a chunk boundary, as in a single run.
+        """
+        ladder = {"240p": {"width": 320, "height": 240, "maxrate": 400, "gop": 50, "segment_duration": 2}}
+        with tempfile.TemporaryDirectory() as base:
+            source = os.path.join(base, "source.mp4")
+            subprocess.run(build_test_source_command(source, 320, 240, 8), check=True, capture_output=True)
+            for index, (start, duration) in enumerate([(0.0, 4.0), (4.0, 4.0)]):
+                chunk_dir = os.path.join(base, "chunks", str(index))
+                os.makedirs(os.path.join(chunk_dir, "240p"))
+                cmd = build_hls_command(source, chunk_dir, ladder, start=start, duration=duration)
+                subprocess.run(cmd, check=True, capture_output=True)
+            stitch_chunks(base, "240p", 2)
+            os.makedirs(os.path.join(base, "single", "240p"))
+            subprocess.run(build_hls_command(source, os.path.join(base, "single"), ladder), check=True, capture_output=True)
+
+            def timestamps(rendition_dir):
+                return [
+                    pts for _, uri in parse_media_playlist(os.path.join(rendition_dir, "index.m3u8"))
+                    for pts in read_pts(os.path.join(rendition_dir, uri))
+                ]
+
+            stitched = timestamps(os.path.join(base, "240p"))
+            self.assertEqual(len(stitched), 200)
+            self.assertEqual({round(b - a, 3) for a, b in zip(stitched, stitched[1:])}, {0.04})
+            self.assertEqual(stitched, timestamps(os.path.join(base, "single", "240p")))
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.api.manifests import manifests
+from video_app.api.segment_index import segment_indexes
+from video_app.api.segments import segment_files
+
+
+class ConditionalMediaRequestTestCase(APITestCase):
+    """
+    Test case for conditional GET on playlists and segments.
+
+    This suite verifies:
+    - Responses carry a strong ETag and Last-Modified
+    - If-None-Match and If-Modified-Since are answered with 304 while the file is unchanged
+    - A replaced file gets a new ETag
+    """
+    def setUp(self):
+        """
+        Set up a temporary media root with a rendition and an authenticated user.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_OFFLOAD="")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(segment_files.clear)
+        self.addCleanup(segment_indexes.clear)
+        self.addCleanup(manifests.clear)
+
+        self.rendition_dir = os.path.join(self.media_root, "videos", "1", "720p")
+        os.makedirs(self.rendition_dir)
+        self.write("index.m3u8", b"#EXTM3U\n#EXTINF:4.0,\nindex0.ts\n")
+        self.write("index0.ts", b"segment")
+        self.url = reverse("video-stream", args=[1, "720p"])
+
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.force_authenticate(self.user)
+
+    def write(self, name, data):
+        """
+        Helper method to replace a file of the rendition the way the encoder does.
+        """
+        path = os.path.join(self.rendition_dir, name)
+        with open(path + ".tmp", "wb") as media:
+            media.write(data)
+        os.replace(path + ".tmp", path)
+
+    def test_validators(self):
+        """
+        Test that playlists and segments carry a strong ETag and Last-Modified.
+        """
+        for url in (self.url, reverse("video-segment", args=[1, "720p", "index0.ts"])):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response["ETag"].startswith('"'))
+            self.assertIn("Last-Modified", response)
+            self.assertEqual(response["Accept-Ranges"], "bytes")
+
+    def test_if_none_match(self):
+        """
+        Test that a matching ETag returns 304 without a body and a stale one the new file.
+        """
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+        self.write("index.m3u8", b"#EXTM3U\n#EXT-X-ENDLIST\n")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"#EXTM3U\n#EXT-X-ENDLIST\n")
+
+    def test_if_modified_since(self):
+        """
+        Test that If-Modified-Since returns 304 unless the file is newer.
+        """
+        mtime = os.path.getmtime(os.path.join(self.rendition_dir, "index.m3u8"))
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(mtime))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(mtime - 60))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
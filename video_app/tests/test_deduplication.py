@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.test import TestCase, override_settings
+from video_app.api.tasks import generate_hls_rendition, ingest_video
+from video_app.api.utils import hash_file, link_tree
+from video_app.models import Video, VideoRendition
+
+class SourceDeduplicationTestCase(TestCase):
+    """
+    Test case for content-hash deduplication of uploaded sources.
+
+    This suite verifies:
+    - Files are hashed with SHA-256
+    - Encoded output trees are hard-linked
+    - A duplicate upload reuses the HLS output, renditions and thumbnail of the original
+    - Re-encoding one of them publishes new files and leaves the shared ones untouched
+    """
+    def setUp(self):
+        """
+        Set up a temporary media root with an encoded original video.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        os.makedirs(os.path.join(self.media_root, "videos", "source"))
+        self.write("videos/source/original.mp4", b"same master file")
+        self.write("videos/source/copy.mp4", b"same master file")
+
+        self.original = self.create_video("videos/source/original.mp4")
+        self.write(f"videos/{self.original.id}/master.m3u8", b"#EXTM3U\n")
+        self.write(f"videos/{self.original.id}/480p/index.m3u8", b"#EXTM3U\n")
+        self.write(f"videos/{self.original.id}/480p/index0.ts", b"segment")
+        self.write(f"videos/{self.original.id}/trickplay/thumbnails.vtt", b"WEBVTT\n")
+        VideoRendition.objects.create(video=self.original, label="480p", width=854, height=480, state=VideoRendition.STATE_READY, segment_count=1)
+        Video.objects.filter(id=self.original.id).update(
+            hls_ready=True, thumbnail="thumbnails/original.jpg", source_hash=hash_file(self.path("videos/source/original.mp4")))
+        self.original.refresh_from_db()
+
+    def path(self, name):
+        """
+        Helper method to resolve a path inside the media root.
+        """
+        return os.path.join(self.media_root, name)
+
+    def write(self, name, content):
+        """
+        Helper method to write a file inside the media root.
+        """
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        with open(self.path(name), "wb") as target:
+            target.write(content)
+
+    def create_video(self, file_name):
+        """
+        Helper method to create a video without triggering the upload signal jobs.
+        """
+        video = Video.objects.create(title="Test", description="Test video", category="Drama")
+        Video.objects.filter(id=video.id).update(video_file=file_name)
+        return Video.objects.get(id=video.id)
+
+    def test_hash_file(self):
+        """
+        Test that files are hashed with SHA-256.
+        """
+        self.assertEqual(hash_file(self.path("videos/source/original.mp4")), hash_file(self.path("videos/source/copy.mp4")))
+        self.assertEqual(len(hash_file(self.path("videos/source/original.mp4"))), 64)
+
+    def test_link_tree(self):
+        """
+        Test that output trees are recreated with hard links and chunk directories are skipped.
+        """
+        self.write(f"videos/{self.original.id}/chunks/0/480p/index0.ts", b"chunk")
+        link_tree(self.path(f"videos/{self.original.id}"), self.path("videos/linked"))
+        self.assertTrue(os.path.samefile(self.path(f"videos/{self.original.id}/480p/index0.ts"), self.path("videos/linked/480p/index0.ts")))
+        self.assertFalse(os.path.exists(self.path("videos/linked/chunks")))
+
+    def test_duplicate_reuses_output(self):
+        """
+        Test that a duplicate upload is marked ready with the original's output and no new jobs.
+        """
+        duplicate = self.create_video("videos/source/copy.mp4")
+        ingest_video(duplicate.id)
+
+        duplicate.refresh_from_db()
+        self.assertTrue(duplicate.hls_ready)
+        self.assertEqual(duplicate.source_hash, self.original.source_hash)
+        self.assertEqual(duplicate.thumbnail.name, "thumbnails/original.jpg")
+        self.assertTrue(os.path.samefile(self.path(f"videos/{duplicate.id}/master.m3u8"), self.path(f"videos/{self.original.id}/master.m3u8")))
+        self.assertTrue(os.path.samefile(self.path("videos/source/copy.mp4"), self.path("videos/source/original.mp4")))
+        rendition = duplicate.renditions.get(label="480p")
+        self.assertEqual(rendition.state, VideoRendition.STATE_READY)
+        self.assertEqual(rendition.segment_count, 1)
+
+    def test_reencode_keeps_duplicate(self):
+        """
+        Test that re-encoding the original replaces its files instead of rewriting the ones the duplicate links to.
+        """
+        duplicate = self.create_video("videos/source/copy.mp4")
+        ingest_video(duplicate.id)
+        self.original.renditions.filter(label="480p").update(state=VideoRendition.STATE_PENDING)
+
+        def encode(cmd, *args):
+            playlist_path = cmd[-1]
+            self.assertNotEqual(os.path.dirname(playlist_path), self.path(f"videos/{self.original.id}/480p"))
+            with open(os.path.join(os.path.dirname(playlist_path), "index0.ts"), "wb") as segment:
+                segment.write(b"re-encoded")
+            with open(playlist_path, "w") as playlist:
+                playlist.write("#EXTM3U\n#EXTINF:5.0,\nindex0.ts\n#EXT-X-ENDLIST\n")
+
+        rendition = {"width": 854, "height": 480, "maxrate": 1400, "gop": 125}
+        with mock.patch("video_app.api.tasks.run_ffmpeg_with_progress", side_effect=encode), \
+                mock.patch("video_app.api.tasks.write_partial_master_playlist"):
+            generate_hls_rendition(self.original.id, "480p", rendition)
+
+        with open(self.path(f"videos/{self.original.id}/480p/index0.ts"), "rb") as segment:
+            self.assertEqual(segment.read(), b"re-encoded")
+        with open(self.path(f"videos/{duplicate.id}/480p/index0.ts"), "rb") as segment:
+            self.assertEqual(segment.read(), b"segment")
+        with open(self.path(f"videos/{duplicate.id}/480p/index.m3u8"), "rb") as playlist:
+            self.assertEqual(playlist.read(), b"#EXTM3U\n")
+        self.assertEqual(self.original.renditions.get(label="480p").state, VideoRendition.STATE_READY)
+        self.assertEqual(sorted(os.listdir(self.path(f"videos/{self.original.id}"))), ["480p", "master.m3u8", "trickplay"])
@@ -0,0 +1,84 @@
+from django.test import SimpleTestCase
+from video_app.api.utils import build_ladder, build_hls_command
+
+class EncodingLadderTestCase(SimpleTestCase):
+    """
+    Test case for building the HLS encoding ladder from probed source properties.
+
+    This suite verifies:
+    - Renditions above the source resolution are skipped
+    - The source aspect ratio is kept for every rendition
+    - Mobile rungs are only added when requested
+    - Small sources are encoded once at their native size
+    - Bitrates are capped at the source bitrate
+    """
+    def probe(self, width, height, fps=30.0, bitrate=0):
+        """
+        Helper method to build a probe result like `probe_video` returns.
+        """
+        return {"width": width, "height": height, "fps": fps, "duration": 60.0, "bitrate": bitrate}
+
+    def test_full_hd_source_gets_full_ladder(self):
+        """
+        Test that a 1080p source is encoded at 480p, 720p and 1080p.
+        """
+        ladder = build_ladder(self.probe(1920, 1080))
+        self.assertEqual(list(ladder), ["480p", "720p", "1080p"])
+        self.assertEqual((ladder["1080p"]["width"], ladder["1080p"]["height"]), (1920, 1080))
+        self.assertEqual((ladder["480p"]["width"], ladder["480p"]["height"]), (854, 480))
+
+    def test_no_upscaling(self):
+        """
+        Test that a 480p source is not upscaled to 720p or 1080p.
+        """
+        ladder = build_ladder(self.probe(854, 480))
+        self.assertEqual(list(ladder), ["480p"])
+
+    def test_aspect_ratio_is_kept(self):
+        """
+        Test that 4:3, widescreen and portrait sources keep their aspect ratio.
+        """
+        ladder = build_ladder(self.probe(1440, 1080))
+        self.assertEqual((ladder["720p"]["width"], ladder["720p"]["height"]), (960, 720))
+
+        ladder = build_ladder(self.probe(1920, 800))
+        self.assertEqual((ladder["1080p"]["width"], ladder["1080p"]["height"]), (1920, 800))
+
+        ladder = build_ladder(self.probe(1080, 1920))
+        self.assertEqual((ladder["1080p"]["width"], ladder["1080p"]["height"]), (608, 1080))
+        self.assertEqual(ladder["480p"]["height"], 480)
+
+    def test_mobile_rungs(self):
+        """
+        Test that 240p and 360p rungs are only added when enabled.
+        """
+        self.assertNotIn("360p", build_ladder(self.probe(1280, 720)))
+        ladder = build_ladder(self.probe(1280, 720), include_mobile=True)
+        self.assertEqual(list(ladder), ["240p", "360p", "480p", "720p"])
+
+    def test_small_source_is_kept_native(self):
+        """
+        Test that a source smaller than every rung is encoded once at its native size.
+        """
+        ladder = build_ladder(self.probe(321, 241))
+        self.assertEqual(list(ladder), ["480p"])
+        self.assertEqual((ladder["480p"]["width"], ladder["480p"]["height"]), (320, 240))
+
+    def test_bitrate_and_gop(self):
+        """
+        Test that bitrates are capped at the source bitrate and the GOP matches the segment length.
+        """
+        ladder = build_ladder(self.probe(1920, 1080, fps=25.0, bitrate=2_000_000))
+        self.assertEqual(ladder["1080p"]["maxrate"], 2000)
+        self.assertEqual(ladder["480p"]["maxrate"], 1400)
+        self.assertEqual(ladder["720p"]["gop"], 125)
+
+    def test_single_decode_command(self):
+        """
+        Test that all renditions are produced by one ffmpeg command with a split filter.
+        """
+        ladder = build_ladder(self.probe(1920, 1080))
+        cmd = build_hls_command("/in.mp4", "/out", ladder)
+        self.assertEqual(cmd.count("-i"), 1)
+        self.assertIn("[0:v]split=3[v0][v1][v2]", cmd[cmd.index("-filter_complex") + 1])
+        self.assertIn("/out/720p/index.m3u8", cmd)
@@ -0,0 +1,98 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from video_app.api.tasks import encoding_profile_for, plan_renditions
+from video_app.api.utils import build_hls_command, build_ladder, plan_chunks, resolve_encoding_profile
+from video_app.models import Video, VideoRendition
+
+PROFILES = {
+    "default": {},
+    "news": {"ladder": [["360p", 640, 360, 800]], "preset": "veryfast", "gop": 2, "segment_duration": 4},
+    "catalogue": {"preset": "slow", "crf": 21},
+}
+
+class EncodingProfileTestCase(SimpleTestCase):
+    """
+    Test case for resolving encoding profiles and applying them to the ladder.
+
+    This suite verifies:
+    - Profiles are merged with the default encoding settings
+    - Profiles whose segments cannot be cut at keyframes are rejected
+    - Ladder, GOP, preset, CRF and segment duration follow the profile
+    """
+    def test_profile_defaults(self):
+        """
+        Test that keys a profile does not set fall back to the defaults.
+        """
+        profile = resolve_encoding_profile(PROFILES, "catalogue")
+        self.assertEqual((profile["preset"], profile["crf"]), ("slow", 21))
+        self.assertEqual((profile["gop"], profile["segment_duration"]), (5, 5))
+        self.assertRaises(KeyError, resolve_encoding_profile, PROFILES, "missing")
+
+    def test_segment_duration_must_be_multiple_of_gop(self):
+        """
+        Test that a GOP that does not divide the segment duration is rejected.
+        """
+        with self.assertRaises(ImproperlyConfigured):
+            resolve_encoding_profile({"bad": {"gop": 3, "segment_duration": 4}}, "bad")
+
+    def test_profile_ladder_and_command(self):
+        """
+        Test that the profile's rungs and codec settings end up in the ffmpeg command.
+        """
+        probe = {"width": 1920, "height": 1080, "fps": 25.0, "duration": 60.0, "bitrate": 0}
+        ladder = build_ladder(probe, profile=resolve_encoding_profile(PROFILES, "news"))
+        self.assertEqual(list(ladder), ["360p"])
+        self.assertEqual(ladder["360p"]["gop"], 50)
+        cmd = build_hls_command("/in.mp4", "/out", ladder)
+        self.assertEqual(cmd[cmd.index("-preset") + 1], "veryfast")
+        self.assertEqual(cmd[cmd.index("-hls_time") + 1], "4")
+        self.assertNotIn("-crf", cmd)
+
+        ladder = build_ladder(probe, profile=resolve_encoding_profile(PROFILES, "catalogue"))
+        cmd = build_hls_command("/in.mp4", "/out", ladder)
+        self.assertEqual(cmd[cmd.index("-crf") + 1], "21")
+
+    def test_chunk_tail_uses_segment_duration(self):
+        """
+        Test that short trailing chunks are measured against the profile's segment duration.
+        """
+        keyframes = [float(t) for t in range(0, 24, 2)]
+        self.assertEqual(plan_chunks(keyframes, 24.0, 10, segment_duration=2), [(0.0, 10.0), (10.0, 10.0), (20.0, 4.0)])
+
+@override_settings(HLS_ENCODING_PROFILES=PROFILES, HLS_DEFAULT_PROFILE="default")
+class VideoEncodingProfileTestCase(TestCase):
+    """
+    Test case for the encoding profile of a video.
+
+    This suite verifies:
+    - Videos without a profile, or with an unknown one, use the default profile
+    - Ready renditions are encoded again when the video's profile changes
+    """
+    def setUp(self):
+        """
+        Set up a video without a file.
+        """
+        self.video = Video.objects.create(title="Test", description="Test video", category="Drama")
+
+    def test_profile_resolution(self):
+        """
+        Test that a picked profile is used and unknown ones fall back to the default.
+        """
+        self.assertEqual(encoding_profile_for(self.video)[0], "default")
+        self.video.encoding_profile = "news"
+        self.assertEqual(encoding_profile_for(self.video)[1]["preset"], "veryfast")
+        self.video.encoding_profile = "removed"
+        self.assertEqual(encoding_profile_for(self.video)[0], "default")
+
+    def test_profile_change_resets_ready_renditions(self):
+        """
+        Test that re-planning with another profile does not keep ready renditions.
+        """
+        ladder = {"480p": {"width": 854, "height": 480}}
+        plan_renditions(self.video, ladder, profile_name="default")
+        self.video.renditions.update(state=VideoRendition.STATE_READY)
+        plan_renditions(self.video, ladder, profile_name="default")
+        self.assertEqual(self.video.renditions.get().state, VideoRendition.STATE_READY)
+        plan_renditions(self.video, ladder, profile_name="catalogue")
+        rendition = self.video.renditions.get()
+        self.assertEqual((rendition.state, rendition.encoding_profile), (VideoRendition.STATE_PENDING, "catalogue"))
@@ -0,0 +1,140 @@
+import gzip
+import os
+import shutil
+import tempfile
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.api.manifests import ManifestCache, manifests, version_segment_uris
+from video_app.api.segment_index import segment_indexes
+from video_app.api.segments import segment_files
+
+PLAYLIST = "#EXTM3U\n#EXT-X-TARGETDURATION:5\n#EXTINF:5.0,\nindex0.ts\n#EXTINF:1.0,\nindex1.ts\n#EXT-X-ENDLIST\n"
+
+
+class ManifestCacheTestCase(SimpleTestCase):
+    """
+    Test case for the in-process manifest cache.
+
+    This suite verifies:
+    - Segment URIs are versioned, tags are left alone
+    - Cached manifests are reused until the file is replaced
+    - The cache stays within its size limit
+    """
+    def setUp(self):
+        """
+        Set up a temporary directory for playlists.
+        """
+        self.base = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base)
+
+    def write(self, name, data):
+        """
+        Helper method to replace a playlist the way the encoder does.
+        """
+        path = os.path.join(self.base, name)
+        with open(path + ".tmp", "w") as playlist:
+            playlist.write(data)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def test_version_segment_uris(self):
+        """
+        Test that only URI lines get the version, including ones with a query string.
+        """
+        self.assertEqual(
+            version_segment_uris("#EXTM3U\n#EXTINF:5.0,\nindex0.ts\nindex.ts?x=1\n", "ab"),
+            "#EXTM3U\n#EXTINF:5.0,\nindex0.ts?v=ab\nindex.ts?x=1&v=ab\n",
+        )
+
+    def test_reload_after_replace(self):
+        """
+        Test that a manifest is cached and reloaded once the playlist is replaced.
+        """
+        cache = ManifestCache()
+        path = self.write("index.m3u8", PLAYLIST)
+        manifest = cache.get(path, versioned=True)
+        self.assertIs(cache.get(path, versioned=True), manifest)
+        self.assertIn(b"index0.ts?v=", manifest.body)
+        self.assertEqual(gzip.decompress(manifest.gzipped), manifest.body)
+
+        self.write("index.m3u8", PLAYLIST.replace("index1", "index2"))
+        reloaded = cache.get(path, versioned=True)
+        self.assertIn(b"index2.ts", reloaded.body)
+        self.assertNotEqual(reloaded.etag, manifest.etag)
+
+    def test_size_limit(self):
+        """
+        Test that the least recently used manifests are dropped beyond the size limit.
+        """
+        first = self.write("first.m3u8", PLAYLIST)
+        second = self.write("second.m3u8", PLAYLIST)
+        entry = ManifestCache().get(first)
+        cache = ManifestCache(max_bytes=len(entry.body) + len(entry.gzipped))
+        cache.get(first)
+        cache.get(second)
+        self.assertEqual(list(cache._entries), [(second, "")])
+        self.assertLessEqual(cache.size, cache.max_bytes)
+
+
+class MediaCachePolicyAPITestCase(APITestCase):
+    """
+    Test case for caching headers of playlists and segments.
+
+    This suite verifies:
+    - Segments are sent as immutable, playlists with a short max-age
+    - Playlists are gzip-compressed for clients that accept it
+    """
+    def setUp(self):
+        """
+        Set up a temporary media root with a rendition and an authenticated user.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(segment_files.clear)
+        self.addCleanup(segment_indexes.clear)
+        self.addCleanup(manifests.clear)
+
+        rendition_dir = os.path.join(self.media_root, "videos", "1", "720p")
+        os.makedirs(rendition_dir)
+        with open(os.path.join(rendition_dir, "index.m3u8"), "w") as playlist:
+            playlist.write(PLAYLIST)
+        with open(os.path.join(rendition_dir, "index0.ts"), "wb") as media:
+            media.write(b"segment")
+
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.force_authenticate(self.user)
+
+    def test_cache_control(self):
+        """
+        Test the Cache-Control policy of versioned and unversioned segments and playlists.
+        """
+        url = reverse("video-segment", args=[1, "720p", "index0.ts"])
+        version = f"{os.stat(os.path.join(self.media_root, 'videos', '1', '720p', 'index.m3u8')).st_mtime_ns:x}"
+        response = self.client.get(url, {"v": version})
+        self.assertIn("immutable", response["Cache-Control"])
+        response = self.client.get(url)
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        response = self.client.get(reverse("video-stream", args=[1, "720p"]))
+        self.assertEqual(response["Cache-Control"], "private, max-age=5")
+
+    def test_gzip_playlist(self):
+        """
+        Test that gzip is only used if accepted and gets its own ETag.
+        """
+        url = reverse("video-stream", args=[1, "720p"])
+        plain = self.client.get(url)
+        self.assertNotIn("Content-Encoding", plain)
+        compressed = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", compressed["Vary"])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertNotEqual(compressed["ETag"], plain["ETag"])
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=compressed["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,199 @@
+import fcntl
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.api.tasks import write_partial_master_playlist
+from video_app.api.utils import (
+    build_audio_hls_command, build_hls_command, codecs_attribute, parse_media_playlist, render_master_playlist,
+    write_master_playlist,
+)
+from video_app.models import VideoRendition
+
+class MasterPlaylistRenderingTestCase(SimpleTestCase):
+    """
+    Test case for building the HLS master playlist from measured renditions.
+
+    This suite verifies:
+    - Parsing of segment durations and URIs from media playlists
+    - RFC 6381 CODECS strings for H.264 and AAC streams
+    - Variant ordering and attributes in the rendered master playlist
+    - The shared audio group is declared once and referenced by every variant
+    - Video renditions are encoded without audio and audio is encoded once
+    """
+    def test_parse_media_playlist(self):
+        """
+        Test that segment durations and URIs are read in playlist order.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.m3u8")
+            with open(path, "w") as playlist:
+                playlist.write("#EXTM3U\n#EXT-X-TARGETDURATION:5\n#EXTINF:5.000000,\nindex0.ts\n#EXTINF:2.5,\nindex1.ts\n#EXT-X-ENDLIST\n")
+            self.assertEqual(parse_media_playlist(path), [(5.0, "index0.ts"), (2.5, "index1.ts")])
+
+    def test_codecs_attribute(self):
+        """
+        Test that probed H.264 and AAC streams are turned into RFC 6381 codec strings.
+        """
+        streams = [
+            {"codec_type": "video", "codec_name": "h264", "profile": "High", "level": 31},
+            {"codec_type": "audio", "codec_name": "aac", "profile": "LC"},
+        ]
+        self.assertEqual(codecs_attribute(streams), "avc1.64001F,mp4a.40.2")
+        self.assertEqual(codecs_attribute([{"codec_name": "h264", "profile": "Constrained Baseline", "level": 30}]), "avc1.42E01E")
+
+    def test_variants_sorted_by_bandwidth(self):
+        """
+        Test that the lowest-bandwidth rendition is listed first with all attributes.
+        """
+        variants = {
+            "720p": {"bandwidth": 3000000, "average_bandwidth": 2500000, "width": 1280, "height": 720, "frame_rate": 25.0, "codecs": "avc1.64001F,mp4a.40.2"},
+            "480p": {"bandwidth": 1500000, "average_bandwidth": 1200000, "width": 854, "height": 480, "frame_rate": 25.0, "codecs": "avc1.64001E,mp4a.40.2"},
+        }
+        lines = render_master_playlist(variants).splitlines()
+        self.assertEqual(lines[0], "#EXTM3U")
+        self.assertEqual(lines[3], '#EXT-X-STREAM-INF:BANDWIDTH=1500000,AVERAGE-BANDWIDTH=1200000,RESOLUTION=854x480,FRAME-RATE=25.000,CODECS="avc1.64001E,mp4a.40.2"')
+        self.assertEqual(lines[4], "480p/index.m3u8")
+        self.assertEqual(lines[6], "720p/index.m3u8")
+
+    def test_shared_audio_group(self):
+        """
+        Test that variants reference the audio group and include its bandwidth and codec.
+        """
+        variants = {
+            "480p": {"bandwidth": 1500000, "average_bandwidth": 1200000, "width": 854, "height": 480, "frame_rate": 25.0, "codecs": "avc1.64001E"},
+        }
+        audio = {"bandwidth": 130000, "average_bandwidth": 128000, "width": None, "height": None, "frame_rate": None, "codecs": "mp4a.40.2"}
+        lines = render_master_playlist(variants, audio).splitlines()
+        self.assertEqual(lines[3], '#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio",NAME="Default",DEFAULT=YES,AUTOSELECT=YES,URI="audio/index.m3u8"')
+        self.assertEqual(lines[4], '#EXT-X-STREAM-INF:BANDWIDTH=1630000,AVERAGE-BANDWIDTH=1328000,RESOLUTION=854x480,FRAME-RATE=25.000,CODECS="avc1.64001E,mp4a.40.2",AUDIO="audio"')
+
+    def test_audio_encoded_once(self):
+        """
+        Test that video outputs drop audio and the audio rendition is a separate output.
+        """
+        ladder = {
+            "480p": {"width": 854, "height": 480, "maxrate": 1400, "gop": 125},
+            "720p": {"width": 1280, "height": 720, "maxrate": 2800, "gop": 125},
+        }
+        cmd = build_hls_command("/in.mp4", "/out", ladder, audio=True)
+        self.assertEqual(cmd.count("-an"), 2)
+        self.assertEqual(cmd.count("-c:a"), 1)
+        self.assertEqual(cmd[-1], "/out/audio/index.m3u8")
+        self.assertNotIn("-c:a", build_hls_command("/in.mp4", "/out", ladder))
+        audio_cmd = build_audio_hls_command("/in.mp4", "/out")
+        self.assertIn("-vn", audio_cmd)
+        self.assertNotIn("-filter_complex", audio_cmd)
+
+
+class MasterPlaylistWritingTestCase(SimpleTestCase):
+    """
+    Test case for writing the master playlist while several jobs finish.
+
+    This suite verifies:
+    - Every write goes through a temporary file of its own, never a shared fixed name
+    - Rendition states are read and the playlist written under the master playlist lock
+    """
+    VARIANT = {"bandwidth": 1, "average_bandwidth": 1, "width": 2, "height": 2, "frame_rate": 25.0, "codecs": "avc1"}
+
+    def setUp(self):
+        """
+        Set up a temporary output directory and a mocked rendition measurement.
+        """
+        self.base_output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_output_dir)
+        measure = mock.patch("video_app.api.utils.measure_rendition", return_value=self.VARIANT)
+        measure.start()
+        self.addCleanup(measure.stop)
+
+    def test_unique_temporary_file(self):
+        """
+        Test that another writer's temporary file is neither reused nor published.
+        """
+        other = os.path.join(self.base_output_dir, "master.m3u8.tmp")
+        with open(other, "w") as tmp:
+            tmp.write("other writer")
+        replaced = []
+        replace = os.replace
+        with mock.patch("os.replace", side_effect=lambda src, dst: replaced.append(src) or replace(src, dst)):
+            write_master_playlist(self.base_output_dir, ["480p"])
+            write_master_playlist(self.base_output_dir, ["480p"])
+        self.assertEqual(len(set(replaced)), 2)
+        self.assertNotIn(other, replaced)
+        with open(other) as tmp:
+            self.assertEqual(tmp.read(), "other writer")
+        with open(os.path.join(self.base_output_dir, "master.m3u8")) as master:
+            self.assertIn("480p/index.m3u8", master.read())
+        self.assertEqual(sorted(os.listdir(self.base_output_dir)), ["master.m3u8", "master.m3u8.tmp"])
+
+    def test_states_read_under_lock(self):
+        """
+        Test that a partial master playlist reads the rendition states while holding the lock.
+        """
+        def lock_held(*args):
+            with open(os.path.join(self.base_output_dir, ".master.lock"), "w") as lock:
+                with self.assertRaises(BlockingIOError):
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return [("480p", VideoRendition.STATE_READY)]
+
+        with mock.patch.object(VideoRendition.objects, "filter") as rendition_filter, \
+                mock.patch("video_app.api.tasks.write_master_playlist") as write:
+            rendition_filter.return_value.values_list.side_effect = lock_held
+            write.side_effect = lambda *args: lock_held()
+            write_partial_master_playlist(1, self.base_output_dir)
+        write.assert_called_once_with(self.base_output_dir, ["480p"])
+
+
+class MasterPlaylistAPITestCase(APITestCase):
+    """
+    Test case for the master playlist endpoint.
+
+    This suite verifies:
+    - Unauthenticated requests are rejected
+    - Missing master playlists return 404
+    - Existing master playlists are served with the HLS content type
+    """
+    def setUp(self):
+        """
+        Set up a test user and a temporary media root.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username="viewer@example.com", email="viewer@example.com", password="securepassword123")
+        self.url = reverse('video-master', kwargs={'movie_id': 1})
+
+    def test_master_playlist_requires_authentication(self):
+        """
+        Test that anonymous users cannot fetch the master playlist.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_master_playlist_not_found(self):
+        """
+        Test that a video without a master playlist returns 404.
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_master_playlist_served(self):
+        """
+        Test that an existing master playlist is returned unchanged.
+        """
+        os.makedirs(os.path.join(self.media_root, "videos", "1"))
+        with open(os.path.join(self.media_root, "videos", "1", "master.m3u8"), "w") as master:
+            master.write("#EXTM3U\n")
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/vnd.apple.mpegurl")
+        self.assertEqual(response.content, b"#EXTM3U\n")
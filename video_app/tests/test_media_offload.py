@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.api.segment_index import segment_indexes
+
+
+class MediaOffloadAPITestCase(APITestCase):
+    """
+    Test case for handing media delivery over to the front proxy.
+
+    This suite verifies:
+    - With X-Accel-Redirect, responses point at the internal location and carry no body
+    - With X-Sendfile, responses carry the file path
+    - Playlists are still served by Django
+    - Range requests are left to the proxy
+    - Permission checks and missing files are still answered by Django
+    """
+    def setUp(self):
+        """
+        Set up a temporary media root with a rendition and an authenticated user.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_OFFLOAD="x-accel-redirect")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(segment_indexes.clear)
+
+        self.rendition_dir = os.path.join(self.media_root, "videos", "1", "720p")
+        os.makedirs(self.rendition_dir)
+        with open(os.path.join(self.rendition_dir, "index.m3u8"), "w") as playlist:
+            playlist.write("#EXTM3U\n#EXTINF:4.0,\nindex0.ts\n#EXT-X-ENDLIST\n")
+        with open(os.path.join(self.rendition_dir, "index0.ts"), "wb") as media:
+            media.write(b"media")
+
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.force_authenticate(self.user)
+
+    def test_segment_accel_redirect(self):
+        """
+        Test that a segment is handed to nginx with its content type.
+        """
+        response = self.client.get(reverse("video-segment", args=[1, "720p", "index0.ts"]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/videos/1/720p/index0.ts")
+        self.assertEqual(response["Content-Type"], "video/MP2T")
+        self.assertEqual(response.content, b"")
+
+    def test_segment_sendfile(self):
+        """
+        Test that X-Sendfile carries the absolute path of the segment.
+        """
+        with override_settings(MEDIA_OFFLOAD="x-sendfile"):
+            response = self.client.get(reverse("video-segment", args=[1, "720p", "index0.ts"]))
+        self.assertEqual(response["X-Sendfile"], os.path.join(self.rendition_dir, "index0.ts"))
+        self.assertNotIn("X-Accel-Redirect", response)
+
+    def test_playlist_served_by_django(self):
+        """
+        Test that playlists are not offloaded, since their segment URIs are rewritten.
+        """
+        response = self.client.get(reverse("video-stream", args=[1, "720p"]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-Accel-Redirect", response)
+
+    def test_range_request_left_to_proxy(self):
+        """
+        Test that a Range request is offloaded as a whole, so the proxy answers it.
+        """
+        response = self.client.get(reverse("video-segment", args=[1, "720p", "index0.ts"]), HTTP_RANGE="bytes=0-1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("X-Accel-Redirect", response)
+
+    def test_checks_stay_in_django(self):
+        """
+        Test that unauthenticated requests and missing files are not offloaded.
+        """
+        response = self.client.get(reverse("video-segment", args=[1, "1080p", "index0.ts"]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(None)
+        response = self.client.get(reverse("video-segment", args=[1, "720p", "index0.ts"]))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotIn("X-Accel-Redirect", response)
+
+    def test_unknown_mode(self):
+        """
+        Test that an unknown offload mode is reported as a configuration error.
+        """
+        with override_settings(MEDIA_OFFLOAD="sendfile"), self.assertRaises(ImproperlyConfigured):
+            self.client.get(reverse("video-segment", args=[1, "720p", "index0.ts"]))
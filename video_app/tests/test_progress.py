@@ -0,0 +1,140 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.api.progress import get_progress, parse_progress_block, set_progress, set_progress_units
+from video_app.models import Video, VideoRendition
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TranscodeProgressTestCase(SimpleTestCase):
+    """
+    Test case for parsing and aggregating ffmpeg progress.
+
+    This suite verifies:
+    - `-progress` blocks are parsed into encoded seconds and speed
+    - Percent and ETA are derived per unit and over all units
+    - Re-planning a transcode clears the progress of the previous one
+    """
+    def setUp(self):
+        """
+        Start every test with an empty cache.
+        """
+        cache.clear()
+
+    def test_parse_progress_block(self):
+        """
+        Test that out_time_us and speed are read, and N/A values are ignored.
+        """
+        self.assertEqual(parse_progress_block({"out_time_us": "2500000", "speed": "1.5x"}), (2.5, 1.5))
+        self.assertEqual(parse_progress_block({"out_time_us": "N/A", "speed": "N/A"}), (None, None))
+
+    def test_unit_percent_and_eta(self):
+        """
+        Test that a unit reports percent done and the remaining time at its current speed.
+        """
+        set_progress_units(1, ["480p"])
+        set_progress(1, "480p", 30.0, 120.0, speed=2.0)
+        unit = get_progress(1)["units"]["480p"]
+        self.assertEqual(unit["percent"], 25.0)
+        self.assertEqual(unit["eta"], 45.0)
+        self.assertEqual(unit["state"], "running")
+
+    def test_overall_progress_weights_units_by_duration(self):
+        """
+        Test that overall percent counts encoded seconds and the ETA is that of the slowest unit.
+        """
+        set_progress_units(1, ["chunk-0", "chunk-1"])
+        set_progress(1, "chunk-0", 100.0, 100.0, state="done")
+        set_progress(1, "chunk-1", 0.0, 100.0, speed=0.5)
+        progress = get_progress(1)
+        self.assertEqual(progress["percent"], 50.0)
+        self.assertEqual(progress["eta"], 200.0)
+
+    def test_overall_percent_unknown_until_all_units_started(self):
+        """
+        Test that overall percent is only reported once every unit has reported progress.
+        """
+        set_progress_units(1, ["480p", "720p"])
+        set_progress(1, "480p", 60.0, 60.0, state="done")
+        progress = get_progress(1)
+        self.assertIsNone(progress["percent"])
+        self.assertIsNone(progress["units"]["720p"])
+
+    def test_replanning_clears_previous_units(self):
+        """
+        Test that recording new units removes the progress of the previous transcode.
+        """
+        set_progress_units(1, ["480p"])
+        set_progress(1, "480p", 60.0, 60.0, state="done")
+        set_progress_units(1, ["480p"])
+        self.assertIsNone(get_progress(1)["units"]["480p"])
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VideoProgressAPITestCase(APITestCase):
+    """
+    Test case for the transcode progress endpoints.
+
+    This suite verifies:
+    - Authentication is required
+    - A single video reports its progress and rendition states
+    - Several videos can be queried at once and invalid IDs are rejected
+    """
+    def setUp(self):
+        """
+        Set up a user and a video with one running rendition.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.video = Video.objects.create(title="Test", description="Test video", category="Drama")
+        VideoRendition.objects.create(video=self.video, label="480p", state=VideoRendition.STATE_PROCESSING)
+        set_progress_units(self.video.id, ["480p"])
+        set_progress(self.video.id, "480p", 15.0, 60.0, speed=3.0)
+
+    def test_requires_authentication(self):
+        """
+        Test that unauthenticated requests are rejected.
+        """
+        response = self.client.get(reverse("video-progress", args=[self.video.id]))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_single_video_progress(self):
+        """
+        Test that one video reports overall progress, ETA and rendition states.
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("video-progress", args=[self.video.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["percent"], 25.0)
+        self.assertEqual(response.data["eta"], 15.0)
+        self.assertEqual(response.data["renditions"], {"480p": VideoRendition.STATE_PROCESSING})
+
+    def test_unknown_video_returns_404(self):
+        """
+        Test that progress of a missing video returns 404.
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("video-progress", args=[self.video.id + 1]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_many_videos_progress(self):
+        """
+        Test that several videos can be queried at once and finished videos report 100 percent.
+        """
+        finished = Video.objects.create(title="Done", description="Done video", category="Drama", hls_ready=True)
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("video-progress-list"), {"ids": f"{self.video.id},{finished.id}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([entry["percent"] for entry in response.data], [25.0, 100.0])
+
+    def test_invalid_ids_return_400(self):
+        """
+        Test that missing or malformed IDs are rejected.
+        """
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(reverse("video-progress-list")).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse("video-progress-list"), {"ids": "1,abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,177 @@
+import fcntl
+import multiprocessing
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from video_app.api.scheduler import THUMBNAIL_THREADS, available_cpus, encode_budget, encode_slot
+from video_app.api.tasks import generate_hls_audio, generate_thumbnail, plan_renditions
+from video_app.api.utils import (
+    build_audio_hls_command, build_hls_command, build_thumbnail_command, build_trickplay_command,
+)
+from video_app.models import Video
+
+
+def _try_slot(slot_dir, result):
+    """
+    Helper for another process: reports whether a slot is free right now.
+    """
+    for name in os.listdir(slot_dir):
+        with open(os.path.join(slot_dir, name), "w") as slot:
+            try:
+                fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                result.put(True)
+                return
+            except BlockingIOError:
+                pass
+    result.put(False)
+
+
+class EncodeSchedulerTestCase(SimpleTestCase):
+    """
+    Test case for the CPU-aware encode scheduler.
+
+    This suite verifies:
+    - The CPU budget is split into concurrent encodes and threads per encode
+    - Encode slots are shared with other processes on the node
+    - Thread budgets end up in the ffmpeg commands
+    """
+    def setUp(self):
+        """
+        Use a temporary slot directory.
+        """
+        self.slot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.slot_dir)
+
+    def test_available_cpus(self):
+        """
+        Test that at least one core is reported.
+        """
+        self.assertGreaterEqual(available_cpus(), 1)
+
+    def test_budget_split(self):
+        """
+        Test the derived and the configured number of concurrent encodes.
+        """
+        with override_settings(FFMPEG_CPU_BUDGET=16, FFMPEG_MAX_ENCODES=0):
+            self.assertEqual(encode_budget(), (4, 4))
+        with override_settings(FFMPEG_CPU_BUDGET=6, FFMPEG_MAX_ENCODES=0):
+            self.assertEqual(encode_budget(), (1, 6))
+        with override_settings(FFMPEG_CPU_BUDGET=8, FFMPEG_MAX_ENCODES=3):
+            self.assertEqual(encode_budget(), (3, 2))
+        with override_settings(FFMPEG_CPU_BUDGET=2, FFMPEG_MAX_ENCODES=8):
+            self.assertEqual(encode_budget(), (2, 1))
+
+    def test_slot_is_shared_across_processes(self):
+        """
+        Test that a held slot is taken for other processes and free again once released.
+        """
+        with override_settings(FFMPEG_CPU_BUDGET=4, FFMPEG_MAX_ENCODES=1, FFMPEG_SLOT_DIR=self.slot_dir):
+            context = multiprocessing.get_context("fork")
+            result = context.Queue()
+            with encode_slot() as threads:
+                self.assertEqual(threads, 4)
+                process = context.Process(target=_try_slot, args=(self.slot_dir, result))
+                process.start()
+                process.join()
+                self.assertFalse(result.get())
+            process = context.Process(target=_try_slot, args=(self.slot_dir, result))
+            process.start()
+            process.join()
+            self.assertTrue(result.get())
+
+    def test_threads_in_commands(self):
+        """
+        Test that the thread budget is set for decoding and split between the encoders.
+        """
+        ladder = {
+            "480p": {"width": 854, "height": 480, "maxrate": 1400, "gop": 125},
+            "720p": {"width": 1280, "height": 720, "maxrate": 2800, "gop": 125},
+        }
+        cmd = build_hls_command("/in.mp4", "/out", ladder, threads=4)
+        self.assertEqual(cmd[cmd.index("-threads") + 1], "4")
+        self.assertLess(cmd.index("-threads"), cmd.index("-i"))
+        self.assertEqual([cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-threads"][1:], ["2", "2"])
+        self.assertNotIn("-threads", build_hls_command("/in.mp4", "/out", ladder))
+        trickplay = build_trickplay_command("/in.mp4", "/out", 160, 90, threads=2)
+        self.assertEqual(trickplay[trickplay.index("-threads") + 1], "2")
+        thumbnail = build_thumbnail_command("/in.mp4", "/out.jpg", 10.0, threads=2)
+        self.assertLess(thumbnail.index("-threads"), thumbnail.index("-i"))
+        audio = build_audio_hls_command("/in.mp4", "/out", threads=2)
+        self.assertEqual(audio[audio.index("-threads") + 1], "2")
+        self.assertNotIn("-threads", build_audio_hls_command("/in.mp4", "/out"))
+
+
+class EncodeSlotJobsTestCase(TestCase):
+    """
+    Test case for the encode slots taken by the jobs.
+
+    This suite verifies:
+    - Audio encodes only run ffmpeg while holding a slot, with the slot's thread budget
+    - Thumbnails run without waiting for a slot, with their own small thread cap
+    """
+    def setUp(self):
+        """
+        Set up a temporary media root, a video and a slot that records whether it is held.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.video = Video.objects.create(title="Test", description="Test video", category="Drama")
+        Video.objects.filter(id=self.video.id).update(video_file="videos/source.mp4", duration=10.0)
+        self.video.refresh_from_db()
+        self.held = False
+
+        @contextmanager
+        def slot():
+            self.held = True
+            try:
+                yield 3
+            finally:
+                self.held = False
+
+        patcher = mock.patch("video_app.api.tasks.encode_slot", side_effect=slot)
+        self.slots = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def encode(self, cmd, *args, **kwargs):
+        """
+        Helper method standing in for ffmpeg: checks the slot and writes the output.
+        """
+        self.assertTrue(self.held)
+        self.assertEqual(cmd[cmd.index("-threads") + 1], "3")
+        with open(cmd[-1], "w") as output:
+            output.write("#EXTM3U\n#EXT-X-ENDLIST\n")
+
+    def test_audio_takes_slot(self):
+        """
+        Test that the shared audio rendition is encoded within a slot.
+        """
+        plan_renditions(self.video, {}, audio=True)
+        with mock.patch("video_app.api.tasks.run_ffmpeg_with_progress", side_effect=self.encode) as ffmpeg, \
+                mock.patch("video_app.api.tasks.write_partial_master_playlist"):
+            generate_hls_audio(self.video.id)
+        ffmpeg.assert_called_once()
+
+    def test_thumbnail_skips_slot(self):
+        """
+        Test that the thumbnail is extracted without a slot, with `THUMBNAIL_THREADS` threads.
+        """
+        def extract(cmd, *args, **kwargs):
+            self.assertFalse(self.held)
+            self.assertEqual(cmd[cmd.index("-threads") + 1], str(THUMBNAIL_THREADS))
+            with open(cmd[-1], "w") as output:
+                output.write("jpeg")
+
+        with mock.patch("video_app.api.tasks.subprocess.run", side_effect=extract) as ffmpeg, \
+                mock.patch("video_app.api.tasks.probe_video", return_value={"duration": 10.0}):
+            generate_thumbnail(self.video.id)
+        ffmpeg.assert_called_once()
+        self.assertEqual(self.slots.call_count, 0)
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.thumbnail.name, "thumbnails/source.jpg")
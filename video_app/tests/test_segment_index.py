@@ -0,0 +1,227 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.api.segment_index import (
+    SEGMENT_INDEX_NAME, SegmentIndexCache, check_segment_version, read_segment_index, segment_indexes,
+    write_segment_index,
+)
+from video_app.api.segments import segment_files
+from video_app.api.utils import move_into_place
+
+PLAYLIST = "#EXTM3U\n#EXTINF:4.0,\nindex0.ts\n#EXTINF:4.0,\nindex1.ts\n#EXT-X-ENDLIST\n"
+
+
+class SegmentIndexTestCase(SimpleTestCase):
+    """
+    Test case for building and caching per-rendition segment indexes.
+
+    This suite verifies:
+    - The index lists every segment of the playlist with size and validators
+    - Renditions without segments.json get their index built from the playlist
+    - A request for another playlist version reloads the cached index
+    - Requests for an older or malformed playlist version are rejected
+    """
+    def setUp(self):
+        """
+        Set up a temporary rendition directory with a playlist and two segments.
+        """
+        self.rendition_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.rendition_dir)
+        with open(os.path.join(self.rendition_dir, "index.m3u8"), "w") as playlist:
+            playlist.write(PLAYLIST + "../secret.ts\n")
+        for index, data in enumerate((b"first", b"second")):
+            with open(os.path.join(self.rendition_dir, f"index{index}.ts"), "wb") as segment:
+                segment.write(data)
+
+    def test_write_segment_index(self):
+        """
+        Test that segments.json holds every segment and leaves out paths outside the rendition.
+        """
+        write_segment_index(self.rendition_dir)
+        with open(os.path.join(self.rendition_dir, SEGMENT_INDEX_NAME)) as index_file:
+            data = json.load(index_file)
+        self.assertEqual(sorted(data["segments"]), ["index0.ts", "index1.ts"])
+        self.assertEqual(data["segments"]["index1.ts"]["size"], 6)
+        index = read_segment_index(self.rendition_dir)
+        self.assertEqual(index.segments["index0.ts"].path, os.path.join(self.rendition_dir, "index0.ts"))
+        self.assertEqual(index.version, data["version"])
+
+    def test_index_without_file(self):
+        """
+        Test that a rendition without segments.json is indexed from its playlist.
+        """
+        index = read_segment_index(self.rendition_dir)
+        self.assertEqual(index.segments["index0.ts"].size, 5)
+        self.assertFalse(os.path.exists(os.path.join(self.rendition_dir, SEGMENT_INDEX_NAME)))
+
+    def test_reload_for_new_version(self):
+        """
+        Test that a cached index is reused for its own version and reloaded for another one.
+        """
+        cache = SegmentIndexCache()
+        index = cache.get(self.rendition_dir)
+        self.assertIs(cache.lookup(self.rendition_dir, index.version), index)
+        self.assertIs(cache.lookup(self.rendition_dir, "other"), index)
+        cache._indexes[self.rendition_dir] = (index, time.monotonic() - 2)
+        self.assertIsNone(cache.lookup(self.rendition_dir, "other"))
+        self.assertIs(cache.lookup(self.rendition_dir), index)
+
+    def test_check_segment_version(self):
+        """
+        Test that only the index's own version is current, newer or no versions pass and older or malformed ones raise.
+        """
+        index = read_segment_index(self.rendition_dir)
+        newer = f"{int(index.version, 16) + 1:x}"
+        older = f"{int(index.version, 16) - 1:x}"
+        self.assertTrue(check_segment_version(index, index.version))
+        self.assertFalse(check_segment_version(index, newer))
+        self.assertFalse(check_segment_version(index, None))
+        for version in (older, "zz", ""):
+            with self.assertRaises(FileNotFoundError):
+                check_segment_version(index, version)
+
+
+class SegmentRoutingAPITestCase(APITestCase):
+    """
+    Test case for serving segments through the segment index.
+
+    This suite verifies:
+    - Segment URLs match the playlist's bare names without a redirect
+    - Names the playlist does not reference, and traversal attempts, get 404
+    - Indexed segments are served without a path stat
+    - Segment URLs of a playlist replaced by a re-encode get 404 instead of the new bytes
+    - A newer version than the cached index is served with the file's own size and ETag
+    - The old version is never served the new bytes while the cached index is not reloaded yet
+    """
+    def setUp(self):
+        """
+        Set up a temporary media root with an indexed rendition and an authenticated user.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_OFFLOAD="")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(segment_files.clear)
+        self.addCleanup(segment_indexes.clear)
+
+        self.rendition_dir = os.path.join(self.media_root, "videos", "1", "720p")
+        os.makedirs(self.rendition_dir)
+        with open(os.path.join(self.rendition_dir, "index.m3u8"), "w") as playlist:
+            playlist.write(PLAYLIST)
+        for index in range(2):
+            with open(os.path.join(self.rendition_dir, f"index{index}.ts"), "wb") as segment:
+                segment.write(b"segment")
+        write_segment_index(self.rendition_dir)
+
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.force_authenticate(self.user)
+
+    def test_bare_segment_name(self):
+        """
+        Test that the URL a playlist's relative URI resolves to is served directly.
+        """
+        url = reverse("video-segment", args=[1, "720p", "index0.ts"])
+        self.assertEqual(url, "/api/video/1/720p/index0.ts")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), b"segment")
+        response = self.client.get(url + "/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unindexed_names(self):
+        """
+        Test that only names from the playlist are served.
+        """
+        for name in (SEGMENT_INDEX_NAME, "index2.ts", "..%2F..%2Fmaster.m3u8"):
+            response = self.client.get(f"/api/video/1/720p/{name}")
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, name)
+        with open(os.path.join(self.media_root, "videos", "1", "master.m3u8"), "w") as master:
+            master.write("#EXTM3U\n")
+        response = self.client.get("/api/video/1/../index0.ts")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_no_stat(self):
+        """
+        Test that once the index is loaded, a segment of its version is opened and served without a path stat.
+        """
+        version = f"{os.stat(os.path.join(self.rendition_dir, 'index.m3u8')).st_mtime_ns:x}"
+        self.client.get(reverse("video-segment", args=[1, "720p", "index0.ts"]), {"v": version})
+        url = reverse("video-segment", args=[1, "720p", "index1.ts"])
+        with mock.patch("os.stat", side_effect=AssertionError):
+            response = self.client.get(url, {"v": version}, HTTP_RANGE="bytes=0-2")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response.content, b"seg")
+
+    def test_outdated_version(self):
+        """
+        Test that after a re-encode the new version is served and the old one is answered with 404.
+        """
+        playlist_path = os.path.join(self.rendition_dir, "index.m3u8")
+        url = reverse("video-segment", args=[1, "720p", "index0.ts"])
+        old_version = f"{os.stat(playlist_path).st_mtime_ns:x}"
+        self.assertEqual(self.client.get(url, {"v": old_version}).status_code, status.HTTP_200_OK)
+
+        with open(os.path.join(self.rendition_dir, "new.ts"), "wb") as segment:
+            segment.write(b"re-encoded")
+        os.replace(os.path.join(self.rendition_dir, "new.ts"), os.path.join(self.rendition_dir, "index0.ts"))
+        mtime_ns = os.stat(playlist_path).st_mtime_ns + 1_000_000_000
+        os.utime(playlist_path, ns=(mtime_ns, mtime_ns))
+        write_segment_index(self.rendition_dir)
+        segment_indexes.clear()
+
+        response = self.client.get(url, {"v": f"{mtime_ns:x}"})
+        self.assertEqual(b"".join(response.streaming_content), b"re-encoded")
+        response = self.client.get(url, {"v": old_version})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_version_newer_than_index(self):
+        """
+        Test that while the index is not reloaded yet, a newer version gets the file's own size and ETag.
+        """
+        playlist_path = os.path.join(self.rendition_dir, "index.m3u8")
+        url = reverse("video-segment", args=[1, "720p", "index0.ts"])
+        old = self.client.get(url, {"v": f"{os.stat(playlist_path).st_mtime_ns:x}"})
+
+        with open(os.path.join(self.rendition_dir, "new.ts"), "wb") as segment:
+            segment.write(b"re-encoded")
+        os.replace(os.path.join(self.rendition_dir, "new.ts"), os.path.join(self.rendition_dir, "index0.ts"))
+        mtime_ns = os.stat(playlist_path).st_mtime_ns + 1_000_000_000
+        os.utime(playlist_path, ns=(mtime_ns, mtime_ns))
+        write_segment_index(self.rendition_dir)
+
+        response = self.client.get(url, {"v": f"{mtime_ns:x}"})
+        self.assertEqual(b"".join(response.streaming_content), b"re-encoded")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertNotEqual(response["ETag"], old["ETag"])
+        self.assertEqual(response["Cache-Control"], "private, max-age=31536000, immutable")
+
+    def test_old_version_before_index_reload(self):
+        """
+        Test that a re-encode published while the old index is cached gets 404 for the old version, not the new bytes.
+        """
+        playlist_path = os.path.join(self.rendition_dir, "index.m3u8")
+        old_version = f"{os.stat(playlist_path).st_mtime_ns:x}"
+        url = reverse("video-segment", args=[1, "720p", "index0.ts"])
+        self.assertEqual(self.client.get(url, {"v": old_version}).status_code, status.HTTP_200_OK)
+
+        staging_dir = tempfile.mkdtemp(dir=self.rendition_dir)
+        for name, data in (("index0.ts", b"NEW-ENCODE-LONGER"), ("index1.ts", b"NEW-ENCODE-LONGER")):
+            with open(os.path.join(staging_dir, name), "wb") as segment:
+                segment.write(data)
+        with open(os.path.join(staging_dir, "index.m3u8"), "w") as playlist:
+            playlist.write(PLAYLIST)
+        move_into_place(staging_dir, self.rendition_dir)
+
+        response = self.client.get(url, {"v": old_version})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url, {"v": old_version}, HTTP_RANGE="bytes=0-")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
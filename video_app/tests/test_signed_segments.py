@@ -0,0 +1,128 @@
+import os
+import re
+import shutil
+import tempfile
+import time
+from django.contrib.auth.models import User
+from django.http import QueryDict
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.api.manifests import manifests
+from video_app.api.segment_index import segment_indexes
+from video_app.api.segments import segment_files
+from video_app.api.signing import rendition_url, sign_segment_urls, verify_segment_url
+
+
+class SegmentSignatureTestCase(SimpleTestCase):
+    """
+    Test case for signing and verifying segment URLs.
+
+    This suite verifies:
+    - A signed query string is accepted for its user and rendition
+    - Expired, tampered and foreign signatures are rejected
+    - Expiry times are rounded, so reloaded playlists keep their URLs
+    """
+    def test_rendition_url(self):
+        """
+        Test that playlist and segment URLs map to the same rendition.
+        """
+        self.assertEqual(rendition_url("/api/video/1/720p/index.m3u8"), "/api/video/1/720p")
+        self.assertEqual(rendition_url("/api/video/1/720p/index0.ts/"), "/api/video/1/720p")
+
+    def test_verify(self):
+        """
+        Test that a signature is bound to user, rendition and expiry.
+        """
+        now = time.time()
+        query = sign_segment_urls(7, "/api/video/1/720p", now=now)
+        params = QueryDict(query)
+        self.assertEqual(verify_segment_url(params, "/api/video/1/720p", now=now), "7")
+        self.assertIsNone(verify_segment_url(params, "/api/video/2/720p", now=now))
+        self.assertIsNone(verify_segment_url(params, "/api/video/1/720p", now=now + 3600 + 301))
+        self.assertIsNone(verify_segment_url(QueryDict(query.replace("u=7", "u=8")), "/api/video/1/720p", now=now))
+        self.assertIsNone(verify_segment_url(QueryDict(query.replace("s=", "s=0")), "/api/video/1/720p", now=now))
+        self.assertIsNone(verify_segment_url(QueryDict(""), "/api/video/1/720p", now=now))
+
+    def test_expiry_is_rounded(self):
+        """
+        Test that signatures issued within the same renewal interval are equal.
+        """
+        start = 1_000_000_010
+        self.assertEqual(
+            sign_segment_urls(1, "/api/video/1/720p", now=start),
+            sign_segment_urls(1, "/api/video/1/720p", now=start + 99),
+        )
+
+
+class SignedSegmentAPITestCase(APITestCase):
+    """
+    Test case for serving segments through signed URLs.
+
+    This suite verifies:
+    - Media playlists carry signed segment URIs for the requesting user
+    - Signed segment requests are served without JWT and without database queries
+    - Requests with an invalid signature still need a JWT
+    - SEGMENT_URL_MAX_AGE=0 turns signing off
+    """
+    def setUp(self):
+        """
+        Set up a temporary media root with a rendition and an authenticated user.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_OFFLOAD="")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(segment_files.clear)
+        self.addCleanup(segment_indexes.clear)
+        self.addCleanup(manifests.clear)
+
+        rendition_dir = os.path.join(self.media_root, "videos", "1", "720p")
+        os.makedirs(rendition_dir)
+        with open(os.path.join(rendition_dir, "index.m3u8"), "w") as playlist:
+            playlist.write("#EXTM3U\n#EXTINF:4.0,\nindex0.ts\n#EXT-X-ENDLIST\n")
+        with open(os.path.join(rendition_dir, "index0.ts"), "wb") as segment:
+            segment.write(b"segment")
+
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.force_authenticate(self.user)
+
+    def segment_query(self):
+        """
+        Helper method to fetch the media playlist and return the query string of its segment URI.
+        """
+        response = self.client.get(reverse("video-stream", args=[1, "720p"]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return re.search(r"^index0\.ts\?(.+)$", response.content.decode(), re.M).group(1)
+
+    def test_signed_segment_without_jwt(self):
+        """
+        Test that a signed segment URL is served without a token and without any query.
+        """
+        query = self.segment_query()
+        self.assertIn(f"u={self.user.id}", query)
+        self.client.force_authenticate(None)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("video-segment", args=[1, "720p", "index0.ts"]) + "?" + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), b"segment")
+
+    def test_invalid_signature_needs_jwt(self):
+        """
+        Test that a tampered signature or another rendition falls back to JWT authentication.
+        """
+        query = self.segment_query()
+        self.client.force_authenticate(None)
+        response = self.client.get(reverse("video-segment", args=[1, "720p", "index0.ts"]) + "?" + query + "0")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse("video-segment", args=[2, "720p", "index0.ts"]) + "?" + query)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SEGMENT_URL_MAX_AGE=0)
+    def test_signing_disabled(self):
+        """
+        Test that segment URIs only carry the version when signing is off.
+        """
+        self.assertRegex(self.segment_query(), r"^v=[0-9a-f]+$")
@@ -0,0 +1,250 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.api.segment_index import segment_indexes
+from video_app.api.segments import SegmentFileCache, parse_range_header, segment_files
+from video_app.api.utils import build_hls_command, parse_media_playlist, render_media_playlist, stitch_chunks
+
+class SingleFilePackagingTestCase(SimpleTestCase):
+    """
+    Test case for single-file byte-range HLS packaging.
+
+    This suite verifies:
+    - Single-file commands write one `index.ts` per rendition
+    - EXT-X-BYTERANGE playlists are parsed and rendered, including implicit offsets
+    - Single-file chunks are concatenated with shifted byte ranges
+    - Range headers are parsed and unsatisfiable ranges are rejected
+    - Cached files are closed once evicted and no longer read
+    """
+    def test_single_file_command(self):
+        """
+        Test that the single_file flag and the media file name are set per rendition.
+        """
+        ladder = {"480p": {"width": 854, "height": 480, "maxrate": 1400, "gop": 125}}
+        cmd = build_hls_command("/in.mp4", "/out", ladder, single_file=True)
+        self.assertEqual(cmd[cmd.index("-hls_flags") + 1], "single_file")
+        self.assertEqual(cmd[cmd.index("-hls_segment_filename") + 1], "/out/480p/index.ts")
+        self.assertNotIn("-hls_flags", build_hls_command("/in.mp4", "/out", ladder))
+
+    def test_parse_byterange_playlist(self):
+        """
+        Test that byte ranges are read and a missing offset continues the previous range.
+        """
+        with tempfile.TemporaryDirectory() as base:
+            playlist_path = os.path.join(base, "index.m3u8")
+            with open(playlist_path, "w") as playlist:
+                playlist.write(
+                    "#EXTM3U\n#EXT-X-VERSION:4\n#EXTINF:5.0,\n#EXT-X-BYTERANGE:100@0\nindex.ts\n"
+                    "#EXTINF:1.0,\n#EXT-X-BYTERANGE:40\nindex.ts\n#EXT-X-ENDLIST\n")
+            self.assertEqual(
+                parse_media_playlist(playlist_path, byteranges=True),
+                [(5.0, "index.ts", 0, 100), (1.0, "index.ts", 100, 40)],
+            )
+            self.assertEqual(parse_media_playlist(playlist_path), [(5.0, "index.ts"), (1.0, "index.ts")])
+
+    def test_render_byterange_playlist(self):
+        """
+        Test that byte-range playlists declare version 4 and one EXT-X-BYTERANGE per segment.
+        """
+        playlist = render_media_playlist([(5.0, "index.ts", 0, 100), (1.0, "index.ts", 100, 40)])
+        self.assertIn("#EXT-X-VERSION:4", playlist)
+        self.assertIn("#EXT-X-BYTERANGE:40@100\nindex.ts", playlist)
+        self.assertIn("#EXT-X-VERSION:3", render_media_playlist([(5.0, "index0.ts")]))
+
+    def test_stitch_single_file_chunks(self):
+        """
+        Test that single-file chunks are concatenated and their ranges shifted.
+        """
+        with tempfile.TemporaryDirectory() as base:
+            for index, data in enumerate([b"aaaabb", b"cccdd"]):
+                chunk_dir = os.path.join(base, "chunks", str(index), "720p")
+                os.makedirs(chunk_dir)
+                first = 4 if index == 0 else 3
+                with open(os.path.join(chunk_dir, "index.m3u8"), "w") as playlist:
+                    playlist.write(
+                        f"#EXTM3U\n#EXTINF:5.0,\n#EXT-X-BYTERANGE:{first}@0\nindex.ts\n"
+                        f"#EXTINF:2.0,\n#EXT-X-BYTERANGE:2@{first}\nindex.ts\n#EXT-X-ENDLIST\n")
+                with open(os.path.join(chunk_dir, "index.ts"), "wb") as media:
+                    media.write(data)
+
+            stitch_chunks(base, "720p", 2)
+
+            output_dir = os.path.join(base, "720p")
+            self.assertEqual(
+                parse_media_playlist(os.path.join(output_dir, "index.m3u8"), byteranges=True),
+                [(5.0, "index.ts", 0, 4), (2.0, "index.ts", 4, 2), (5.0, "index.ts", 6, 3), (2.0, "index.ts", 9, 2)],
+            )
+            with open(os.path.join(output_dir, "index.ts"), "rb") as media:
+                self.assertEqual(media.read(), b"aaaabbcccdd")
+
+    def test_parse_range_header(self):
+        """
+        Test closed, open-ended, suffix and multiple ranges as well as unsatisfiable and malformed ones.
+        """
+        self.assertEqual(parse_range_header("bytes=10-19", 100), [(10, 10)])
+        self.assertEqual(parse_range_header("bytes=90-", 100), [(90, 10)])
+        self.assertEqual(parse_range_header("bytes=-30", 100), [(70, 30)])
+        self.assertEqual(parse_range_header("bytes=90-200", 100), [(90, 10)])
+        self.assertEqual(parse_range_header("bytes=0-1, 5-6", 100), [(0, 2), (5, 2)])
+        self.assertEqual(parse_range_header("bytes=0-1,200-", 100), [(0, 2)])
+        self.assertEqual(parse_range_header("bytes=100-", 100), [])
+        self.assertIsNone(parse_range_header("bytes=5-1", 100))
+        self.assertIsNone(parse_range_header("items=0-1", 100))
+        self.assertIsNone(parse_range_header("bytes=" + ",".join(["0-1"] * 17), 100))
+
+    def test_file_cache_evicts_least_recently_used(self):
+        """
+        Test that the file cache keeps at most `max_size` files open.
+        """
+        cache = SegmentFileCache(max_size=1)
+        self.addCleanup(cache.clear)
+        with tempfile.TemporaryDirectory() as base:
+            for name in ("a", "b"):
+                with open(os.path.join(base, name), "wb") as media:
+                    media.write(b"x" * 3)
+                self.assertEqual(cache.open(os.path.join(base, name))[1], 3)
+            self.assertEqual(list(cache._files), [os.path.join(base, "b")])
+
+    def test_file_cache_closes_evicted_file_after_release(self):
+        """
+        Test that an evicted file stays open while referenced and is closed on its last release.
+        """
+        cache = SegmentFileCache(max_size=1)
+        self.addCleanup(cache.clear)
+        with tempfile.TemporaryDirectory() as base:
+            for name in ("a", "b"):
+                with open(os.path.join(base, name), "wb") as media:
+                    media.write(b"x" * 3)
+            first = cache.open(os.path.join(base, "a"))
+            self.assertEqual(cache.lookup(os.path.join(base, "a")), first)
+            second = cache.open(os.path.join(base, "b"))
+            cache.release(second)
+
+            cache.release(first)
+            self.assertEqual(os.pread(first.fd, 3, 0), b"xxx")
+            cache.release(first)
+            with self.assertRaises(OSError):
+                os.fstat(first.fd)
+            self.assertEqual(os.pread(second.fd, 3, 0), b"xxx")
+
+class SegmentRangeAPITestCase(APITestCase):
+    """
+    Test case for byte-range requests against the segment endpoint.
+
+    This suite verifies:
+    - Range requests return 206 with the requested bytes and Content-Range
+    - Multiple ranges return a multipart/byteranges body
+    - Ranges are ignored if If-Range no longer matches
+    - Unsatisfiable ranges return 416
+    - Requests without Range still return the whole file
+    - A streamed response keeps its file open when the file is evicted from the cache
+    """
+    def setUp(self):
+        """
+        Set up a temporary media root with a single-file rendition and an authenticated user.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_OFFLOAD="")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(segment_files.clear)
+        self.addCleanup(segment_indexes.clear)
+
+        rendition_dir = os.path.join(self.media_root, "videos", "1", "720p")
+        os.makedirs(rendition_dir)
+        with open(os.path.join(rendition_dir, "index.ts"), "wb") as media:
+            media.write(bytes(range(100)))
+        with open(os.path.join(rendition_dir, "index.m3u8"), "w") as playlist:
+            playlist.write("#EXTM3U\n#EXT-X-VERSION:4\n#EXTINF:4.0,\n#EXT-X-BYTERANGE:100@0\nindex.ts\n#EXT-X-ENDLIST\n")
+        version = f"{os.stat(os.path.join(rendition_dir, 'index.m3u8')).st_mtime_ns:x}"
+        self.url = reverse("video-segment", args=[1, "720p", "index.ts"]) + f"?v={version}"
+
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.force_authenticate(self.user)
+
+    def test_range_request(self):
+        """
+        Test that a byte range is served with 206 and Content-Range.
+        """
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response.content, bytes(range(10, 20)))
+        self.assertEqual(response["Content-Range"], "bytes 10-19/100")
+
+    def test_multiple_ranges(self):
+        """
+        Test that several ranges are returned as parts of a multipart/byteranges body.
+        """
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-1,50-52")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        content_type, _, boundary = response["Content-Type"].partition("; boundary=")
+        self.assertEqual(content_type, "multipart/byteranges")
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(
+            response.content,
+            f"--{boundary}\r\nContent-Type: video/MP2T\r\nContent-Range: bytes 0-1/100\r\n\r\n".encode()
+            + bytes([0, 1])
+            + f"\r\n--{boundary}\r\nContent-Type: video/MP2T\r\nContent-Range: bytes 50-52/100\r\n\r\n".encode()
+            + bytes([50, 51, 52])
+            + f"\r\n--{boundary}--\r\n".encode(),
+        )
+
+    def test_if_range(self):
+        """
+        Test that a range is only served while If-Range matches the current ETag.
+        """
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unsatisfiable_range(self):
+        """
+        Test that a range past the end of the file returns 416.
+        """
+        response = self.client.get(self.url, HTTP_RANGE="bytes=200-")
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response["Content-Range"], "bytes */100")
+
+    def test_missing_file_with_range(self):
+        """
+        Test that a range request for a missing file returns 404.
+        """
+        response = self.client.get(reverse("video-segment", args=[1, "480p", "index.ts"]), HTTP_RANGE="bytes=0-1")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_full_request(self):
+        """
+        Test that a request without Range returns the whole file.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, bytes(range(100)))
+
+    def test_evicted_during_stream(self):
+        """
+        Test that evicting the file while its response is only partly sent neither breaks the body nor leaks the file.
+        """
+        with mock.patch("video_app.api.segments.RANGE_BUFFER_SIZE", 10), \
+                mock.patch("video_app.api.segments.RANGE_BLOCK_SIZE", 10):
+            response = self.client.get(self.url, HTTP_RANGE="bytes=0-49")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertTrue(response.streaming)
+        (media, _), = segment_files._files.values()
+        blocks = iter(response.streaming_content)
+        body = next(blocks) + next(blocks)
+
+        segment_files.clear()
+        self.assertEqual(os.fstat(media.fd).st_size, 100)
+        body += b"".join(blocks)
+        self.assertEqual(body, bytes(range(50)))
+        with self.assertRaises(OSError):
+            os.fstat(media.fd)
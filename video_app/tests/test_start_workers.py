@@ -0,0 +1,92 @@
+import signal
+import sys
+from io import StringIO
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+
+POOLS = {
+    "emails": {"queues": ["emails", "default"], "count": 1},
+    "transcode": {"queues": ["transcode"], "count": 2},
+}
+
+
+@override_settings(RQ_WORKER_POOLS=POOLS)
+class StartWorkersTestCase(SimpleTestCase):
+    """
+    Test case for the start_workers command supervising the RQ worker pools.
+
+    This suite verifies:
+    - Every pool starts its number of `rqworker --with-scheduler` processes on its queues
+    - A worker that exits is restarted on the same queues
+    - SIGTERM is forwarded to all running workers on shutdown
+    - Invalid pool overrides are rejected
+    """
+    def run_command(self, loops, exit_codes, *args):
+        """
+        Helper method to run the command with mocked workers for a number of supervision loops.
+
+        Args:
+            loops (int): Number of supervision loops before SIGTERM is received.
+            exit_codes (dict): Exit code per started worker (by start order) on its first poll;
+                workers not listed keep running.
+        """
+        processes = []
+
+        def popen(argv):
+            process = mock.Mock(argv=argv, returncode=exit_codes.get(len(processes)))
+            process.poll.side_effect = lambda process=process: process.returncode
+            processes.append(process)
+            return process
+
+        handlers = {}
+
+        def sleep(seconds):
+            self.sleeps += 1
+            if self.sleeps == loops:
+                handlers[signal.SIGTERM](signal.SIGTERM, None)
+
+        self.sleeps = 0
+        with mock.patch("subprocess.Popen", side_effect=popen), \
+                mock.patch("signal.signal", side_effect=lambda signum, handler: handlers.__setitem__(signum, handler)), \
+                mock.patch("time.sleep", side_effect=sleep):
+            call_command("start_workers", *args, stdout=StringIO(), stderr=StringIO())
+        return processes
+
+    def test_starts_pools(self):
+        """
+        Test that one worker per configured count is started with the scheduler on the pool's queues in order.
+        """
+        processes = self.run_command(1, {})
+        self.assertEqual(len(processes), 3)
+        for process, queues in zip(processes, [["emails", "default"], ["transcode"], ["transcode"]]):
+            self.assertEqual(process.argv[0], sys.executable)
+            self.assertTrue(process.argv[1].endswith("manage.py"))
+            self.assertEqual(process.argv[2:], ["rqworker", "--with-scheduler", *queues])
+
+    def test_restarts_exited_worker(self):
+        """
+        Test that a worker that exits is replaced by a new one on the same queues, and only once.
+        """
+        processes = self.run_command(2, {1: 1})
+        self.assertEqual(len(processes), 4)
+        self.assertEqual(processes[3].argv[2:], ["rqworker", "--with-scheduler", "transcode"])
+        processes[1].send_signal.assert_not_called()
+
+    def test_stop_forwards_sigterm(self):
+        """
+        Test that all running workers get SIGTERM and are waited for.
+        """
+        processes = self.run_command(1, {})
+        for process in processes:
+            process.send_signal.assert_called_once_with(signal.SIGTERM)
+            process.wait.assert_called_once_with()
+
+    def test_pool_override(self):
+        """
+        Test that --pool changes the worker count of a pool and unknown pools are rejected.
+        """
+        processes = self.run_command(1, {}, "--pool", "transcode=0")
+        self.assertEqual([process.argv[-1] for process in processes], ["default"])
+        with self.assertRaises(CommandError):
+            call_command("start_workers", "--pool", "missing=1")
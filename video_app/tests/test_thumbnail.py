@@ -0,0 +1,38 @@
+from django.test import SimpleTestCase
+from video_app.api.utils import build_thumbnail_command, pick_thumbnail_time
+
+class ThumbnailTestCase(SimpleTestCase):
+    """
+    Test case for thumbnail timestamp selection and the extraction command.
+
+    This suite verifies:
+    - The timestamp depends on the probed duration and stays inside short clips
+    - Long sources never seek further than 60 seconds
+    - The seek happens on the input and scaling runs in the same pass
+    """
+    def test_timestamp_inside_short_clips(self):
+        """
+        Test that clips shorter than 5 seconds still get a valid timestamp.
+        """
+        self.assertEqual(pick_thumbnail_time(0), 0.0)
+        self.assertEqual(pick_thumbnail_time(1.5), 0.0)
+        self.assertEqual(pick_thumbnail_time(3.0), 0.3)
+
+    def test_timestamp_for_long_sources(self):
+        """
+        Test that long sources use 10% of the duration, capped at 60 seconds.
+        """
+        self.assertEqual(pick_thumbnail_time(300.0), 30.0)
+        self.assertEqual(pick_thumbnail_time(7200.0), 60.0)
+
+    def test_input_seek_and_single_pass(self):
+        """
+        Test that the command seeks before the input and scales before picking a candidate frame.
+        """
+        cmd = build_thumbnail_command("/in.mp4", "/out.jpg", 42.0)
+        self.assertLess(cmd.index("-ss"), cmd.index("-i"))
+        self.assertIn("-noaccurate_seek", cmd[:cmd.index("-i")])
+        self.assertEqual(cmd[cmd.index("-ss") + 1], "42.000")
+        self.assertTrue(cmd[cmd.index("-vf") + 1].startswith("scale="))
+        self.assertIn("thumbnail=", cmd[cmd.index("-vf") + 1])
+        self.assertEqual(cmd[cmd.index("-frames:v") + 1], "1")
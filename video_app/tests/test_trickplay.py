@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.api.utils import render_trickplay_vtt, trickplay_tile_size
+
+class TrickplayTrackTestCase(SimpleTestCase):
+    """
+    Test case for the trickplay tile size and WebVTT track.
+
+    This suite verifies:
+    - Tiles keep the source aspect ratio
+    - Cues cover the whole duration and point at the right tile
+    - Tiles continue on the next sprite sheet once a sheet is full
+    """
+    def test_tile_size(self):
+        """
+        Test that tiles are 160 pixels wide and keep the aspect ratio.
+        """
+        self.assertEqual(trickplay_tile_size({"width": 1920, "height": 1080}), (160, 90))
+        self.assertEqual(trickplay_tile_size({"width": 1080, "height": 1920}), (160, 284))
+
+    def test_cues(self):
+        """
+        Test that cues map consecutive intervals to consecutive tiles.
+        """
+        lines = render_trickplay_vtt(25.0, 160, 90).splitlines()
+        self.assertEqual(lines[0], "WEBVTT")
+        self.assertEqual(lines[2:4], ["00:00:00.000 --> 00:00:10.000", "sprite0.jpg#xywh=0,0,160,90"])
+        self.assertEqual(lines[5:7], ["00:00:10.000 --> 00:00:20.000", "sprite0.jpg#xywh=160,0,160,90"])
+        self.assertEqual(lines[8:10], ["00:00:20.000 --> 00:00:25.000", "sprite0.jpg#xywh=320,0,160,90"])
+
+    def test_next_sprite_sheet(self):
+        """
+        Test that tile 100 starts the second sprite sheet and row 2 starts after 10 tiles.
+        """
+        cues = render_trickplay_vtt(3600.0, 160, 90).split("\n\n")
+        self.assertIn("sprite0.jpg#xywh=0,90,160,90", cues[11])
+        self.assertIn("00:16:40.000 --> 00:16:50.000\nsprite1.jpg#xywh=0,0,160,90", cues[101])
+
+
+class TrickplayAPITestCase(APITestCase):
+    """
+    Test case for the trickplay track and sprite endpoints.
+
+    This suite verifies:
+    - Unauthenticated requests are rejected
+    - Missing files return 404
+    - Existing files are served with long cache lifetimes
+    """
+    def setUp(self):
+        """
+        Set up a test user and a temporary media root with trickplay output.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username="viewer@example.com", email="viewer@example.com", password="securepassword123")
+        trickplay_dir = os.path.join(self.media_root, "videos", "1", "trickplay")
+        os.makedirs(trickplay_dir)
+        with open(os.path.join(trickplay_dir, "thumbnails.vtt"), "w") as track:
+            track.write("WEBVTT\n")
+        with open(os.path.join(trickplay_dir, "sprite0.jpg"), "wb") as sprite:
+            sprite.write(b"\xff\xd8\xff")
+
+    def test_requires_authentication(self):
+        """
+        Test that anonymous users cannot fetch trickplay files.
+        """
+        response = self.client.get(reverse('video-trickplay-track', kwargs={'movie_id': 1}))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_track_and_sprite_served(self):
+        """
+        Test that the track and sprite sheets are served with cache headers.
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('video-trickplay-track', kwargs={'movie_id': 1}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/vtt")
+        self.assertIn("max-age=604800", response["Cache-Control"])
+
+        response = self.client.get(reverse('video-trickplay-sprite', kwargs={'movie_id': 1, 'index': 0}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertIn("max-age=604800", response["Cache-Control"])
+
+    def test_missing_sprite(self):
+        """
+        Test that a sprite sheet that does not exist returns 404.
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('video-trickplay-sprite', kwargs={'movie_id': 1, 'index': 7}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
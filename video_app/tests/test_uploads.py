@@ -0,0 +1,272 @@
+import base64
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.api.uploads import HTTP_460_CHECKSUM_MISMATCH, TUS_VERSION, UploadError, complete_upload, upload_path
+from video_app.models import Video, VideoUpload
+
+
+def encode_metadata(**metadata):
+    """
+    Helper that builds an Upload-Metadata header.
+    """
+    return ",".join(f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in metadata.items())
+
+
+def checksum(data):
+    """
+    Helper that builds a sha256 Upload-Checksum header.
+    """
+    return "sha256 " + base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+
+class VideoUploadAPITestCase(APITestCase):
+    """
+    Test case for the resumable video upload API.
+
+    This suite verifies:
+    - Only staff users can upload
+    - Uploads are created with validated metadata and an empty partial file
+    - Chunks are appended at the current offset and can be resumed
+    - Mismatching offsets and checksums are rejected without changing the upload
+    - The final chunk moves the file into the media root and creates the Video
+    - Invalid metadata at completion keeps the partial file and moves nothing
+    - Concurrent or repeated completion is rejected with 409
+    - The new offset is saved before the upload's lock is released
+    - Uploads are only visible to the user who started them
+    """
+    def setUp(self):
+        """
+        Set up a temporary media root and an authenticated staff user.
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(username="staff", password="testpassword", is_staff=True)
+        self.client.force_authenticate(self.user)
+        self.data = b"0123456789" * 10
+
+    def create_upload(self, length=None):
+        """
+        Helper method to start an upload of `self.data` and return its URL.
+        """
+        response = self.client.post(
+            reverse("video-upload-create"),
+            HTTP_TUS_RESUMABLE=TUS_VERSION,
+            HTTP_UPLOAD_LENGTH=str(length or len(self.data)),
+            HTTP_UPLOAD_METADATA=encode_metadata(
+                title="Test", description="Test video", category="Drama", filename="my movie.mp4"),
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response["Location"]
+
+    def patch_chunk(self, url, data, offset, **headers):
+        """
+        Helper method to send one chunk.
+        """
+        return self.client.generic(
+            "PATCH", url, data,
+            content_type="application/offset+octet-stream",
+            HTTP_TUS_RESUMABLE=TUS_VERSION,
+            HTTP_UPLOAD_OFFSET=str(offset),
+            **headers,
+        )
+
+    def test_upload_requires_staff(self):
+        """
+        Test that regular users cannot start uploads.
+        """
+        self.client.force_authenticate(User.objects.create_user(username="viewer", password="testpassword"))
+        response = self.client.post(reverse("video-upload-create"), HTTP_TUS_RESUMABLE=TUS_VERSION, HTTP_UPLOAD_LENGTH="10")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_create_upload(self):
+        """
+        Test that an upload is created at offset 0 with its metadata.
+        """
+        url = self.create_upload()
+        upload = VideoUpload.objects.get()
+        self.assertTrue(url.endswith(reverse("video-upload", args=[upload.id])))
+        self.assertEqual((upload.offset, upload.length, upload.metadata["title"]), (0, 100, "Test"))
+        self.assertEqual(os.path.getsize(upload_path(upload)), 0)
+
+    def test_create_upload_validates_metadata(self):
+        """
+        Test that an upload without the required metadata or tus version is rejected.
+        """
+        response = self.client.post(reverse("video-upload-create"), HTTP_TUS_RESUMABLE=TUS_VERSION, HTTP_UPLOAD_LENGTH="10")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse("video-upload-create"), HTTP_UPLOAD_LENGTH="10")
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertFalse(VideoUpload.objects.exists())
+
+    def test_resume_upload(self):
+        """
+        Test that HEAD reports the offset reached by the first chunk.
+        """
+        url = self.create_upload()
+        response = self.patch_chunk(url, self.data[:40], 0, HTTP_UPLOAD_CHECKSUM=checksum(self.data[:40]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response["Upload-Offset"], "40")
+
+        response = self.client.head(url, HTTP_TUS_RESUMABLE=TUS_VERSION)
+        self.assertEqual((response["Upload-Offset"], response["Upload-Length"]), ("40", "100"))
+        self.assertNotIn("Upload-Video-Id", response)
+
+    def test_offset_mismatch(self):
+        """
+        Test that a chunk not starting at the current offset is rejected with 409.
+        """
+        url = self.create_upload()
+        response = self.patch_chunk(url, self.data[40:], 40)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(VideoUpload.objects.get().offset, 0)
+
+    def test_checksum_mismatch(self):
+        """
+        Test that a chunk with a wrong checksum is discarded with 460.
+        """
+        url = self.create_upload()
+        response = self.patch_chunk(url, self.data[:40], 0, HTTP_UPLOAD_CHECKSUM=checksum(b"something else"))
+        self.assertEqual(response.status_code, HTTP_460_CHECKSUM_MISMATCH)
+        upload = VideoUpload.objects.get()
+        self.assertEqual(upload.offset, 0)
+        self.assertEqual(os.path.getsize(upload_path(upload)), 0)
+
+    def test_chunk_exceeding_length(self):
+        """
+        Test that a chunk past the announced Upload-Length is rejected.
+        """
+        url = self.create_upload(length=10)
+        response = self.patch_chunk(url, self.data[:20], 0)
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_complete_upload(self):
+        """
+        Test that the final chunk creates the Video from the assembled file.
+        """
+        url = self.create_upload()
+        self.patch_chunk(url, self.data[:40], 0)
+        response = self.patch_chunk(url, self.data[40:], 40, HTTP_UPLOAD_CHECKSUM=checksum(self.data[40:]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        video = Video.objects.get(id=response["Upload-Video-Id"])
+        self.assertEqual((video.title, video.video_file.name), ("Test", "videos/my_movie.mp4"))
+        with open(video.video_file.path, "rb") as media:
+            self.assertEqual(media.read(), self.data)
+        self.assertFalse(os.path.exists(upload_path(VideoUpload.objects.get())))
+
+        response = self.patch_chunk(url, b"x", 100)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_delete_upload(self):
+        """
+        Test that a cancelled upload and its partial file are removed.
+        """
+        url = self.create_upload()
+        upload = VideoUpload.objects.get()
+        response = self.client.delete(url, HTTP_TUS_RESUMABLE=TUS_VERSION)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(VideoUpload.objects.exists())
+        self.assertFalse(os.path.exists(upload_path(upload)))
+
+    def test_complete_upload_validates_before_moving(self):
+        """
+        Test that metadata which became invalid is rejected with 400 before the file is moved.
+        """
+        url = self.create_upload()
+        upload = VideoUpload.objects.get()
+        upload.metadata["category"] = "Unknown"
+        upload.save(update_fields=["metadata"])
+
+        response = self.patch_chunk(url, self.data, 0)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("category", response.data["detail"])
+        self.assertFalse(Video.objects.exists())
+        with open(upload_path(upload), "rb") as part:
+            self.assertEqual(part.read(), self.data)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, "videos")))
+
+    def test_complete_upload_while_locked(self):
+        """
+        Test that completion is rejected with 409 while another request holds the upload.
+        """
+        url = self.create_upload()
+        upload = VideoUpload.objects.get()
+        with open(upload_path(upload), "rb") as part:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            response = self.patch_chunk(url, self.data, 0)
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+            with self.assertRaises(UploadError) as error:
+                complete_upload(upload)
+        self.assertEqual(error.exception.status, status.HTTP_409_CONFLICT)
+        self.assertTrue(os.path.exists(upload_path(upload)))
+        self.assertFalse(Video.objects.exists())
+
+    def test_complete_upload_already_moved(self):
+        """
+        Test that a final PATCH racing a finished completion gets 409 instead of an error.
+        """
+        url = self.create_upload()
+        upload = VideoUpload.objects.get()
+        upload.offset = upload.length
+        upload.save(update_fields=["offset"])
+        os.remove(upload_path(upload))
+
+        response = self.client.generic(
+            "PATCH", url, b"",
+            content_type="application/offset+octet-stream",
+            HTTP_TUS_RESUMABLE=TUS_VERSION,
+            HTTP_UPLOAD_OFFSET=str(upload.length),
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Video.objects.exists())
+
+    def test_upload_of_other_user(self):
+        """
+        Test that another staff user can neither see, continue nor cancel an upload.
+        """
+        url = self.create_upload()
+        self.client.force_authenticate(User.objects.create_user(username="other", password="testpassword", is_staff=True))
+        response = self.client.head(url, HTTP_TUS_RESUMABLE=TUS_VERSION)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.patch_chunk(url, self.data, 0)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.delete(url, HTTP_TUS_RESUMABLE=TUS_VERSION)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(VideoUpload.objects.get().offset, 0)
+
+    def test_offset_saved_under_lock(self):
+        """
+        Test that the offset of a chunk is saved while the partial file is still locked.
+        """
+        url = self.create_upload()
+        upload = VideoUpload.objects.get()
+        locked = []
+        save = VideoUpload.save
+
+        def save_under_lock(instance, *args, **kwargs):
+            with open(upload_path(upload), "rb") as part:
+                try:
+                    fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    locked.append(False)
+                except BlockingIOError:
+                    locked.append(True)
+            save(instance, *args, **kwargs)
+
+        with mock.patch.object(VideoUpload, "save", save_under_lock):
+            response = self.patch_chunk(url, self.data[:40], 0)
+        self.assertEqual(response["Upload-Offset"], "40")
+        self.assertEqual(locked, [True])
+        self.assertEqual(VideoUpload.objects.get().offset, 40)
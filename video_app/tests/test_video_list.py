@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.models import Video, VideoRendition
+
+class VideoListAPITestCase(APITestCase):
+    """
+    Test case for the video list endpoint with per-rendition readiness.
+
+    This suite verifies:
+    - Videos without a ready rendition are not listed
+    - Videos are listed as soon as their first rendition is ready
+    - Ready resolutions are reported lowest first
+    - Fully processed videos remain listed
+    - Videos wait for their shared audio rendition, which is not a resolution
+    """
+    def setUp(self):
+        """
+        Set up an authenticated user and a video with a pending ladder.
+        """
+        self.user = User.objects.create_user(username="viewer@example.com", email="viewer@example.com", password="securepassword123")
+        self.client.force_authenticate(self.user)
+        self.video = Video.objects.create(title="Test", description="Test video", category="Drama")
+        for label, height in (("480p", 480), ("720p", 720), ("1080p", 1080)):
+            VideoRendition.objects.create(video=self.video, label=label, width=height * 16 // 9, height=height)
+        self.url = reverse('video-list')
+
+    def test_pending_video_not_listed(self):
+        """
+        Test that a video whose renditions are all still pending is hidden.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_video_listed_after_first_rendition(self):
+        """
+        Test that a video is listed once its first rendition is ready.
+        """
+        self.video.renditions.filter(label="480p").update(state=VideoRendition.STATE_READY, segment_count=12)
+        self.video.renditions.filter(label="720p").update(state=VideoRendition.STATE_PROCESSING)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["id"], self.video.id)
+        self.assertEqual(response.data[0]["resolutions"], ["480p"])
+
+    def test_resolutions_ordered_and_not_duplicated(self):
+        """
+        Test that a video with several ready renditions is listed once, lowest resolution first.
+        """
+        self.video.renditions.update(state=VideoRendition.STATE_READY)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["resolutions"], ["480p", "720p", "1080p"])
+
+    def test_hls_ready_video_listed(self):
+        """
+        Test that a fully processed video is listed.
+        """
+        self.video.hls_ready = True
+        self.video.save()
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+
+    def test_video_waits_for_audio_rendition(self):
+        """
+        Test that a video is only listed once its audio rendition is ready, and audio is not reported as a resolution.
+        """
+        VideoRendition.objects.create(video=self.video, label="audio", state=VideoRendition.STATE_PROCESSING)
+        self.video.renditions.filter(label="480p").update(state=VideoRendition.STATE_READY, segment_count=12)
+        self.assertEqual(self.client.get(self.url).data, [])
+
+        self.video.renditions.filter(label="audio").update(state=VideoRendition.STATE_READY, segment_count=12)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["resolutions"], ["480p"])